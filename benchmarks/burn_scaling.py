@@ -0,0 +1,81 @@
+"""
+Wall-clock scaling of chunked subtitle burn-in with the number of parallel ranges.
+
+    python -m benchmarks.burn_scaling [--video in.mp4 --srt subs.srt] [--parts 1,2,4,8]
+
+Without ``--video`` a synthetic 1080p clip (FFmpeg lavfi test pattern + tone, keyframe
+every 2 s) and a matching SRT are generated in a temporary directory.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from src.pipeline.subtitles import save_srt
+from src.pipeline.video import burn_subtitles
+
+
+def make_sample(workdir: Path, seconds: int) -> tuple:
+    video = workdir / "sample.mp4"
+    subprocess.run(
+        [
+            "ffmpeg",
+            "-y",
+            "-v",
+            "error",
+            "-f",
+            "lavfi",
+            "-i",
+            f"testsrc2=size=1920x1080:rate=30:duration={seconds}",
+            "-f",
+            "lavfi",
+            "-i",
+            f"sine=frequency=440:sample_rate=48000:duration={seconds}",
+            "-c:v",
+            "libx264",
+            "-preset",
+            "veryfast",
+            "-g",
+            "60",
+            "-c:a",
+            "aac",
+            "-shortest",
+            str(video),
+        ],
+        check=True,
+    )
+    segments = [{"start": t + 0.2, "end": t + 1.8, "text": f"字幕测试 line {t // 2}"} for t in range(0, seconds, 2)]
+    srt_path = workdir / "sample.srt"
+    save_srt(segments, str(srt_path))
+    return str(video), str(srt_path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--video", default="")
+    parser.add_argument("--srt", default="")
+    parser.add_argument("--seconds", type=int, default=120)
+    parser.add_argument("--parts", default="1,2,4,8")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        video, srt_path = (args.video, args.srt) if args.video else make_sample(workdir, args.seconds)
+        print(f"cpus={os.cpu_count()} video={video}")
+        print(f"{'parts':>5} {'seconds':>9} {'speed-up':>9}")
+        baseline = 0.0
+        for parts in (int(p) for p in args.parts.split(",")):
+            t0 = time.perf_counter()
+            burn_subtitles(video, srt_path, str(workdir / f"out_{parts}.mp4"), parallel=parts)
+            elapsed = time.perf_counter() - t0
+            baseline = baseline or elapsed
+            print(f"{parts:>5} {elapsed:>9.1f} {baseline / elapsed:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Compare single-pass Whisper against silence-chunked parallel transcription.
+
+    python -m benchmarks.chunked_asr lecture.mp4 --model small --workers 1,2,4
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from src.pipeline.audio import SAMPLE_RATE, extract_audio
+from src.pipeline.chunking import find_chunks
+from src.pipeline.transcriber import transcribe_video
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video")
+    parser.add_argument("--model", default="small")
+    parser.add_argument("--language", default=None)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated; 1 = current single pass")
+    args = parser.parse_args()
+
+    audio = extract_audio(args.video)
+    duration = len(audio) / SAMPLE_RATE
+    print(f"audio={duration:.1f}s chunks={len(find_chunks(audio))}")
+    print(f"{'workers':>7} {'seconds':>9} {'RTF':>7} {'segments':>9}")
+    for workers in (int(w) for w in args.workers.split(",")):
+        t0 = time.perf_counter()
+        result = transcribe_video(
+            audio,
+            model_size=args.model,
+            language=args.language,
+            device=args.device,
+            parallel_workers=workers,
+        )
+        elapsed = time.perf_counter() - t0
+        print(f"{workers:>7} {elapsed:>9.1f} {elapsed / duration:>7.3f} {len(result['segments']):>9}")
+
+
+if __name__ == "__main__":
+    main()
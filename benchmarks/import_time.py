@@ -0,0 +1,75 @@
+"""
+Startup import guard: the GUI and CLI entry points must not pull in the ML stack.
+
+    python -m benchmarks.import_time                      # src.app and src.cli
+    python -m benchmarks.import_time src.ui.main_window --top 15 --budget-ms 800
+
+Each module is imported in a fresh interpreter with ``-X importtime``. The slowest
+imports (cumulative) are listed, and the exit status is 1 when a forbidden heavy module
+(torch, whisper, transformers, numpy, requests, ...) is imported or the total import time
+exceeds ``--budget-ms``. Those modules belong inside the functions that use them.
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+from typing import Dict, List, Optional, Tuple
+
+FORBIDDEN = ("torch", "whisper", "transformers", "tiktoken", "numpy", "requests")
+
+
+def profile_import(module: str) -> Tuple[Dict[str, int], str]:
+    """``{module: cumulative microseconds}`` for every import logged, plus stderr on failure."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}" if module else "pass"],
+        capture_output=True,
+        text=True,
+    )
+    times: Dict[str, int] = {}
+    errors: List[str] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            errors.append(line)
+            continue
+        parts = line[len("import time:") :].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue  # header row
+        times[parts[2].strip()] = int(parts[1])
+    return times, "\n".join(errors) if proc.returncode else ""
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=["src.app", "src.cli"])
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    parser.add_argument("--budget-ms", type=float, default=1500.0, help="max total import time per module")
+    args = parser.parse_args(argv)
+
+    # Interpreter startup (site, .pth hooks) is the same for every entry point; leave it out.
+    startup = set(profile_import("")[0])
+    status = 0
+    for module in args.modules:
+        times, error = profile_import(module)
+        if error:
+            print(f"{module}: import failed\n{error}", file=sys.stderr)
+            status = 1
+            continue
+        times = {name: us for name, us in times.items() if name not in startup}
+        total_ms = times.get(module, 0) / 1000
+        print(f"{module}: {total_ms:.0f} ms, {len(times)} modules beyond interpreter startup")
+        for name, us in sorted(times.items(), key=lambda item: -item[1])[1 : args.top + 1]:
+            print(f"  {us / 1000:8.1f} ms  {name}")
+        heavy = sorted({name.split(".")[0] for name in times} & set(FORBIDDEN))
+        if heavy:
+            print(f"FAIL {module} imports {', '.join(heavy)}", file=sys.stderr)
+            status = 1
+        if total_ms > args.budget_ms:
+            print(f"FAIL {module} took {total_ms:.0f} ms > budget {args.budget_ms:.0f} ms", file=sys.stderr)
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+Local mock of an OpenAI-compatible chat completions server for LM Studio tests/benchmarks.
+
+    python -m benchmarks.mock_lmstudio --port 1234 --latency 0.5 --fail-rate 0.2
+
+Every ``index|text`` line of the user message is answered as ``index|[tr] text``.
+``fail_rate`` answers that fraction of requests with HTTP 503 to exercise retries and
+``drop_rate`` silently omits that fraction of lines to exercise missing-line repair.
+Requests with ``"stream": true`` get server-sent events unless ``stream`` is off, in
+which case the plain JSON body is returned (a server that ignores streaming).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+class MockLmStudio:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        fail_rate: float = 0.0,
+        drop_rate: float = 0.0,
+        stream: bool = True,
+        chunk_delay: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.drop_rate = drop_rate
+        self.stream = stream
+        self.chunk_delay = chunk_delay
+        self.requests = 0
+        self.failures = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def translate_content(self, prompt: str) -> str:
+        lines: List[str] = []
+        for line in prompt.splitlines():
+            idx, sep, text = line.partition("|")
+            if sep and idx.strip().isdigit():
+                with self._lock:
+                    if self._rng.random() < self.drop_rate:
+                        continue
+                lines.append(f"{idx.strip()}|[tr] {text.strip()}")
+        return "\n".join(lines)
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            fail = self._rng.random() < self.fail_rate
+            if fail:
+                self.failures += 1
+            return fail
+
+    def _handler(self) -> type:
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+            def do_POST(self) -> None:  # noqa: N802 - http.server naming
+                length = int(self.headers.get("Content-Length", 0))
+                body: Dict = json.loads(self.rfile.read(length) or b"{}")
+                if mock.latency:
+                    time.sleep(mock.latency)
+                if mock._should_fail():
+                    self.send_response(503)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                prompt = body.get("messages", [{}])[-1].get("content", "")
+                content = mock.translate_content(prompt)
+                if body.get("stream") and mock.stream:
+                    self._send_events(content)
+                    return
+                self._send_json({"choices": [{"message": {"role": "assistant", "content": content}}]})
+
+            def _send_json(self, payload: Dict) -> None:
+                raw = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def _send_events(self, content: str) -> None:
+                # Chunked like LM Studio's own server, one chunk per event.
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i in range(0, len(content), 7):
+                    delta = {"choices": [{"delta": {"content": content[i : i + 7]}}]}
+                    self._send_chunk(f"data: {json.dumps(delta, ensure_ascii=False)}\n\n".encode("utf-8"))
+                    if mock.chunk_delay:
+                        time.sleep(mock.chunk_delay)
+                self._send_chunk(b"data: [DONE]\n\n")
+                self._send_chunk(b"")
+
+            def _send_chunk(self, data: bytes) -> None:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+        return Handler
+
+    def start(self) -> "MockLmStudio":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockLmStudio":
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1234)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--no-stream", action="store_true", help="ignore stream: true requests")
+    args = parser.parse_args()
+    mock = MockLmStudio(
+        args.host,
+        args.port,
+        latency=args.latency,
+        fail_rate=args.fail_rate,
+        drop_rate=args.drop_rate,
+        stream=not args.no_stream,
+    )
+    print(f"mock LM Studio listening on {mock.endpoint}")
+    mock._server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
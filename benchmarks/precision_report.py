@@ -0,0 +1,90 @@
+"""
+Quality-vs-speed report for the M2M100 precision modes.
+
+    python -m benchmarks.precision_report [--threads 8] [--out report.json]
+
+Each mode translates the same fixed sample; quality is chrF against the output of the
+first mode listed (fp32 by default), so that row is 100 by definition.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from collections import Counter
+from typing import Dict, List
+
+from src.config import DEFAULT_TRANSLATION_MODEL
+from src.pipeline.translator import Translator
+from benchmarks.translate_batching import _SAMPLE_LINES
+
+
+def _char_ngrams(text: str, n: int) -> Counter:
+    text = text.replace(" ", "")
+    return Counter(text[i : i + n] for i in range(len(text) - n + 1))
+
+
+def chrf(hypotheses: List[str], references: List[str], max_n: int = 6, beta: float = 2.0) -> float:
+    """Corpus-level chrF (character n-gram F-beta, averaged over n = 1..max_n), in 0..100."""
+    precisions: List[float] = []
+    recalls: List[float] = []
+    for n in range(1, max_n + 1):
+        match = hyp_total = ref_total = 0
+        for hyp, ref in zip(hypotheses, references):
+            h, r = _char_ngrams(hyp, n), _char_ngrams(ref, n)
+            match += sum((h & r).values())
+            hyp_total += sum(h.values())
+            ref_total += sum(r.values())
+        if hyp_total and ref_total:
+            precisions.append(match / hyp_total)
+            recalls.append(match / ref_total)
+    if not precisions:
+        return 0.0
+    p = sum(precisions) / len(precisions)
+    r = sum(recalls) / len(recalls)
+    if p + r == 0:
+        return 0.0
+    return 100 * (1 + beta**2) * p * r / (beta**2 * p + r)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=DEFAULT_TRANSLATION_MODEL)
+    parser.add_argument("--source", default="en")
+    parser.add_argument("--target", default="zh")
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--modes", default="fp32,bf16,int8")
+    parser.add_argument("--out", default="", help="optional JSON output path")
+    args = parser.parse_args()
+
+    texts = list(_SAMPLE_LINES)
+    rows: List[Dict[str, object]] = []
+    reference: List[str] = []
+    for mode in args.modes.split(","):
+        translator = Translator(model_name=args.model, device="cpu", precision=mode, num_threads=args.threads)
+        translator.translate_texts(texts[:2], args.source, args.target)  # load + warm-up
+        t0 = time.perf_counter()
+        outputs = translator.translate_texts(texts, args.source, args.target)
+        elapsed = time.perf_counter() - t0
+        if not reference:
+            reference = outputs
+        rows.append(
+            {
+                "mode": mode,
+                "seconds": round(elapsed, 3),
+                "lines_per_s": round(len(texts) / elapsed, 2),
+                "chrf_vs_first": round(chrf(outputs, reference), 2),
+            }
+        )
+
+    print(f"{'mode':<6} {'seconds':>9} {'lines/s':>9} {'chrF':>7}")
+    for row in rows:
+        print(f"{row['mode']:<6} {row['seconds']:>9} {row['lines_per_s']:>9} {row['chrf_vs_first']:>7}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(rows, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""
+Offline benchmark suite for every pipeline stage, with baselines and a regression gate.
+
+    python -m benchmarks.suite                                  # run, print table
+    python -m benchmarks.suite --save-baseline benchmarks/baselines/my-box.json
+    python -m benchmarks.suite --baseline benchmarks/baselines/my-box.json --threshold 0.15
+
+Media is synthesised with FFmpeg lavfi: a ``testsrc2`` clip plus speech-like audio
+(pitch-modulated voiced bursts separated by pauses), so nothing is downloaded except the
+models themselves. Stages:
+
+    audio_decode   extract_audio (cold cache)
+    asr            transcribe_video, Whisper ``--whisper-model`` (default tiny), no cache
+    translate_m2m  Translator with ``--m2m-model`` on fixed sample lines, no memory
+    translate_lm   LmStudioTranslator against benchmarks.mock_lmstudio, no memory
+    srt_write      save_srt of ``--srt-segments`` segments
+    encode         burn_subtitles with the draft encoder profile
+
+Stages whose dependencies are missing (whisper, transformers, model weights) are
+recorded as skipped rather than failing the run. Models are loaded before a stage's
+timing starts, then each stage runs ``--repeat`` times and the median is kept. With
+``--baseline`` the exit status is 1 when any stage is slower than baseline by more than
+``--threshold`` (and by more than ``--min-delta`` seconds), and 2 without running
+anything when the baseline was recorded with another suite version or workload.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.mock_lmstudio import MockLmStudio
+from src.pipeline.metrics import StageEvent
+from src.pipeline.subtitles import save_srt
+
+# Bump when stage definitions change so old baselines are not compared against new runs.
+SUITE_VERSION = 1
+
+# Options that define the measured work; a baseline is only comparable when they match.
+_WORKLOAD_PARAMS = (
+    "seconds",
+    "repeat",
+    "whisper_model",
+    "m2m_model",
+    "translate_segments",
+    "srt_segments",
+    "lm_latency",
+)
+
+# Owned by the suite (not shared with translate_batching, which needs torch at import);
+# editing these changes every translate/srt timing, so bump SUITE_VERSION with them.
+_SAMPLE_LINES = [
+    "Hi everyone, and welcome back to the channel.",
+    "Okay.",
+    "So today we're going to look at how the quarterly revenue numbers were put together "
+    "and why the margin changed so much compared to last year.",
+    "Thank you for watching.",
+    "Let's take a closer look at the second chart, the one that shows operating expenses.",
+    "Exactly.",
+    "The key point here is that depreciation is a non-cash expense, so it doesn't affect "
+    "the cash flow statement in the same way.",
+    "If you found this useful, please like and subscribe so you don't miss the next episode.",
+]
+
+# Voiced bursts (~3 per second, gated by a slow square wave) with a wandering pitch.
+_SPEECH_LIKE = (
+    "0.4*sin(2*PI*(140+40*sin(2*PI*0.7*t))*t)"
+    "*(0.6+0.4*sin(2*PI*5*t))"
+    "*gt(sin(2*PI*0.35*t)+0.3,0)"
+    "*gt(sin(2*PI*3.1*t),-0.2)"
+)
+
+
+def make_media(workdir: Path, seconds: int, size: str = "1280x720") -> Path:
+    """Synthetic H.264/AAC clip with a keyframe every 2 s."""
+    video = workdir / "bench.mp4"
+    subprocess.run(
+        [
+            "ffmpeg",
+            "-y",
+            "-v",
+            "error",
+            "-f",
+            "lavfi",
+            "-i",
+            f"testsrc2=size={size}:rate=25:duration={seconds}",
+            "-f",
+            "lavfi",
+            "-i",
+            f"aevalsrc='{_SPEECH_LIKE}':s=16000:d={seconds}",
+            "-c:v",
+            "libx264",
+            "-preset",
+            "veryfast",
+            "-g",
+            "50",
+            "-c:a",
+            "aac",
+            "-shortest",
+            str(video),
+        ],
+        check=True,
+    )
+    return video
+
+
+def _segments(count: int, seconds: float) -> List[dict]:
+    step = seconds / max(1, count)
+    return [
+        {"start": i * step, "end": (i + 0.9) * step, "text": _SAMPLE_LINES[i % len(_SAMPLE_LINES)]}
+        for i in range(count)
+    ]
+
+
+class Suite:
+    def __init__(self, args: argparse.Namespace, workdir: Path) -> None:
+        self.args = args
+        self.workdir = workdir
+        self.video = make_media(workdir, args.seconds)
+        self._audio = None
+        self._m2m = None
+
+    def audio(self):  # type: ignore[no-untyped-def]
+        if self._audio is None:
+            from src.pipeline.audio import extract_audio
+
+            self._audio = extract_audio(self.video, cache_dir=self.workdir / "audio-warm")
+        return self._audio
+
+    # ``prepare_<stage>`` runs once before the stage is timed (model loads, warm inputs).
+
+    def prepare_asr(self) -> None:
+        from src.pipeline.transcriber import preload_whisper
+
+        self.audio()
+        preload_whisper(self.args.whisper_model, "cpu")
+
+    def prepare_translate_m2m(self) -> None:
+        from src.pipeline.translator import Translator
+
+        self._m2m = Translator(model_name=self.args.m2m_model, device="cpu")
+        self._m2m.warm_up()
+
+    # Each stage fills and returns a StageEvent; ``seconds`` is measured by the caller.
+
+    def audio_decode(self, event: StageEvent) -> None:
+        from src.pipeline.audio import SAMPLE_RATE, extract_audio
+
+        cold = tempfile.mkdtemp(dir=self.workdir)
+        event.audio_seconds = len(extract_audio(self.video, cache_dir=cold)) / SAMPLE_RATE
+
+    def asr(self, event: StageEvent) -> None:
+        from src.pipeline.audio import SAMPLE_RATE
+        from src.pipeline.transcriber import transcribe_video
+
+        audio = self.audio()
+        result = transcribe_video(audio, model_size=self.args.whisper_model, language="en", device="cpu")
+        event.audio_seconds = len(audio) / SAMPLE_RATE
+        event.segments = len(result["segments"])  # type: ignore[arg-type]
+
+    def translate_m2m(self, event: StageEvent) -> None:
+        segments = _segments(self.args.translate_segments, self.args.seconds)
+        self._m2m.translate_segments(segments, source_lang="en", target_lang="zh")
+        event.segments = len(segments)
+
+    def translate_lm(self, event: StageEvent) -> None:
+        from src.pipeline.lmstudio import LmStudioTranslator
+
+        segments = _segments(self.args.translate_segments, self.args.seconds)
+        with MockLmStudio(latency=self.args.lm_latency, seed=0) as server:
+            translator = LmStudioTranslator(endpoint=server.endpoint, model="mock", backoff=0.0)
+            try:
+                translator.translate_segments(segments, source_lang="en", target_lang="zh")
+            finally:
+                translator.close()
+        event.segments = len(segments)
+        event.tokens = translator.completion_tokens
+
+    def srt_write(self, event: StageEvent) -> None:
+        segments = _segments(self.args.srt_segments, self.args.seconds)
+        save_srt(segments, str(self.workdir / "write.srt"))
+        event.segments = len(segments)
+
+    def encode(self, event: StageEvent) -> None:
+        from src.pipeline.video import burn_subtitles
+
+        srt = self.workdir / "burn.srt"
+        save_srt(_segments(self.args.seconds // 2, self.args.seconds), str(srt))
+        stats: Dict[str, float] = {}
+        burn_subtitles(str(self.video), str(srt), str(self.workdir / "burn.mp4"), encoder_profile="draft", stats=stats)
+        event.frames = stats.get("frames", 0.0)
+
+
+# Benchmark name -> metrics stage name used to derive rtf / fps / segments per second.
+_STAGE_OF = {
+    "audio_decode": "audio_decode",
+    "asr": "asr",
+    "translate_m2m": "translate",
+    "translate_lm": "translate",
+    "srt_write": "srt_write",
+    "encode": "encode",
+}
+
+
+def run_stage(
+    name: str,
+    fn: Callable[[StageEvent], None],
+    repeat: int,
+    prepare: Optional[Callable[[], None]] = None,
+) -> Dict[str, object]:
+    runs: List[StageEvent] = []
+    try:
+        if prepare is not None:
+            prepare()
+        for _ in range(repeat):
+            event = StageEvent(stage=_STAGE_OF[name])
+            started = time.perf_counter()
+            fn(event)
+            event.seconds = time.perf_counter() - started
+            event.derive()
+            runs.append(event)
+    except ImportError as exc:
+        return {"skipped": f"missing dependency: {exc.name or exc}"}
+    except OSError as exc:  # e.g. model weights not downloadable offline
+        return {"skipped": f"{type(exc).__name__}: {exc}"}
+    median = statistics.median(e.seconds for e in runs)
+    best = min(runs, key=lambda e: abs(e.seconds - median))
+    return {
+        "seconds": round(median, 4),
+        "runs": [round(e.seconds, 4) for e in runs],
+        "metrics": {k: round(v, 4) for k, v in best.metrics.items()},
+    }
+
+
+def incompatible(baseline: Dict[str, object], params: Dict[str, object]) -> List[str]:
+    """Why ``baseline`` cannot be compared with a run of ``params`` (empty when it can)."""
+    if baseline.get("suite_version") != SUITE_VERSION:
+        return [f"baseline suite_version {baseline.get('suite_version')} != {SUITE_VERSION}; re-record it"]
+    recorded: Dict[str, object] = baseline.get("params", {})  # type: ignore[assignment]
+    return [
+        f"baseline --{key.replace('_', '-')} {recorded.get(key)} != {params[key]}; re-record it or pass the same value"
+        for key in _WORKLOAD_PARAMS
+        if recorded.get(key) != params[key]
+    ]
+
+
+def compare(results: Dict[str, Dict[str, object]], baseline: Dict[str, object], threshold: float, min_delta: float) -> List[str]:
+    """Regression messages for stages slower than baseline beyond both tolerances."""
+    problems: List[str] = []
+    for name, base in baseline.get("stages", {}).items():  # type: ignore[union-attr]
+        current = results.get(name, {})
+        if "seconds" not in base or "seconds" not in current:
+            continue
+        old, new = float(base["seconds"]), float(current["seconds"])  # type: ignore[arg-type]
+        if new - old > min_delta and new > old * (1 + threshold):
+            problems.append(f"{name}: {new:.3f}s vs baseline {old:.3f}s (+{(new / old - 1) * 100:.0f}%)")
+    return problems
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", default=",".join(_STAGE_OF), help="comma-separated subset")
+    parser.add_argument("--seconds", type=int, default=30, help="synthetic clip length")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--whisper-model", default="tiny")
+    parser.add_argument("--m2m-model", default="facebook/m2m100_418M")
+    parser.add_argument("--translate-segments", type=int, default=120)
+    parser.add_argument("--srt-segments", type=int, default=20000)
+    parser.add_argument("--lm-latency", type=float, default=0.05, help="mock server latency per request")
+    parser.add_argument("--output", type=Path, help="write results JSON here")
+    parser.add_argument("--save-baseline", type=Path, help="write results as a baseline")
+    parser.add_argument("--baseline", type=Path, help="compare against this baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative slowdown")
+    parser.add_argument("--min-delta", type=float, default=0.05, help="ignore slowdowns below this many seconds")
+    args = parser.parse_args(argv)
+
+    names = [n.strip() for n in args.stages.split(",") if n.strip()]
+    unknown = set(names) - set(_STAGE_OF)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    params = {k: v for k, v in vars(args).items() if k not in ("output", "save_baseline", "baseline")}
+    baseline: Dict[str, object] = {}
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        mismatches = incompatible(baseline, params)
+        for mismatch in mismatches:
+            print(f"INCOMPATIBLE BASELINE {mismatch}", file=sys.stderr)
+        if mismatches:
+            return 2
+
+    results: Dict[str, Dict[str, object]] = {}
+    with tempfile.TemporaryDirectory(prefix="vtp-bench-") as tmp:
+        suite = Suite(args, Path(tmp))
+        for name in names:
+            prepare = getattr(suite, f"prepare_{name}", None)
+            results[name] = run_stage(name, getattr(suite, name), max(1, args.repeat), prepare)
+
+    print(f"{'stage':<14} {'seconds':>9}  metrics")
+    for name, result in results.items():
+        if "skipped" in result:
+            print(f"{name:<14} {'-':>9}  skipped ({result['skipped']})")
+            continue
+        metrics = ", ".join(f"{k}={v}" for k, v in result["metrics"].items())  # type: ignore[union-attr]
+        print(f"{name:<14} {result['seconds']:>9.3f}  {metrics}")
+
+    report = {
+        "suite_version": SUITE_VERSION,
+        "recorded": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {"platform": platform.platform(), "python": platform.python_version(), "cpu": platform.processor()},
+        "params": params,
+        "stages": results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(report, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+            print(f"wrote {path}")
+
+    if args.baseline:
+        problems = compare(results, baseline, args.threshold, args.min_delta)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        if problems:
+            return 1
+        print(f"no regressions beyond {args.threshold:.0%} of {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
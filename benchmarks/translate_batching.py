@@ -0,0 +1,94 @@
+"""
+Compare M2M100 throughput: legacy fixed 6-line batches vs. token-budget batching.
+
+    python -m benchmarks.translate_batching [--srt subs.srt] [--budget 2048]
+
+Without ``--srt`` a built-in subtitle-like sample (short interjections mixed with
+long explanatory lines and recurring intro/outro phrases) is used.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import List
+
+import srt
+import torch
+
+from src.config import DEFAULT_TRANSLATION_MODEL, TRANSLATION_TOKEN_BUDGET
+from src.pipeline.translator import Translator
+
+_SAMPLE_LINES = [
+    "Hi everyone, and welcome back to the channel.",
+    "Okay.",
+    "Right.",
+    "So today we're going to look at how the quarterly revenue numbers were put together "
+    "and why the margin changed so much compared to last year.",
+    "Thank you for watching.",
+    "Yes.",
+    "Let's take a closer look at the second chart, the one that shows operating expenses.",
+    "That's it for today.",
+    "If you found this useful, please like and subscribe so you don't miss the next episode.",
+    "Exactly.",
+    "The key point here is that depreciation is a non-cash expense, so it doesn't affect "
+    "the cash flow statement in the same way.",
+    "Hmm.",
+]
+
+
+def _load_texts(srt_path: str, count: int) -> List[str]:
+    if srt_path:
+        with open(srt_path, "r", encoding="utf-8") as fh:
+            return [sub.content.replace("\n", " ") for sub in srt.parse(fh.read())][:count]
+    rng = random.Random(0)
+    return [rng.choice(_SAMPLE_LINES) for _ in range(count)]
+
+
+def _legacy_translate(translator: Translator, texts: List[str], source: str, target: str) -> List[str]:
+    """The pre-budget algorithm: input order, fixed batches of 6, tokenizer padding."""
+    tok, model = translator._tokenizer, translator._model
+    tok.src_lang = source
+    outputs: List[str] = []
+    for i in range(0, len(texts), 6):
+        inputs = tok(texts[i : i + 6], return_tensors="pt", padding=True, truncation=True, max_length=512)
+        inputs = inputs.to(torch.device(translator.device))
+        generated = model.generate(**inputs, forced_bos_token_id=tok.get_lang_id(target), max_length=512)
+        outputs.extend(tok.batch_decode(generated, skip_special_tokens=True))
+    return outputs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--srt", default="", help="subtitle file to use as the text set")
+    parser.add_argument("--count", type=int, default=300)
+    parser.add_argument("--model", default=DEFAULT_TRANSLATION_MODEL)
+    parser.add_argument("--source", default="en")
+    parser.add_argument("--target", default="zh")
+    parser.add_argument("--budget", type=int, default=TRANSLATION_TOKEN_BUDGET)
+    args = parser.parse_args()
+
+    texts = _load_texts(args.srt, args.count)
+    translator = Translator(model_name=args.model, token_budget=args.budget)
+    translator._ensure_model()
+    translator.translate_texts(texts[:4], args.source, args.target)  # warm-up
+
+    with torch.inference_mode():
+        t0 = time.perf_counter()
+        _legacy_translate(translator, texts, args.source, args.target)
+        legacy = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        translator.translate_texts(texts, args.source, args.target)
+        budgeted = time.perf_counter() - t0
+
+    n = len(texts)
+    print(f"lines={n} unique={len(set(texts))} device={translator.device}")
+    print(f"legacy  fixed-6      : {legacy:8.2f}s  {n / legacy:7.2f} lines/s")
+    print(f"budget  {args.budget:<5d} tokens: {budgeted:8.2f}s  {n / budgeted:7.2f} lines/s")
+    print(f"speed-up: x{legacy / budgeted:.2f}")
+
+
+if __name__ == "__main__":
+    main()
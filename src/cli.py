@@ -0,0 +1,373 @@
+"""
+Headless batch entry point (no Qt).
+
+    python -m src.cli a.mp4 b.mkv --target-lang en ja --output-dir out
+    python -m src.cli --manifest jobs.csv --jobs 2 --no-burn-subtitles
+    python -m src.cli /shared/in/*.mp4 --target-lang en --output-dir /shared/out --broker host:8765 --wait
+
+Every ``JobOptions`` field is a flag (``--field-name``; booleans also take ``--no-...``).
+A manifest is a JSON list of paths or objects, or a CSV with a ``file`` column; any other
+key/column overrides that option for its row (CSV lists are separated by ``;``). Inputs
+are probed once up front (``--no-preflight`` skips it) and shared across ``--jobs``
+longest-first by total duration. Progress (with an ``eta`` in seconds) is written to
+stdout as one JSON object per line. Exit status: 0 when every file
+succeeded, 1 when any failed, 2 on bad arguments, 130 when interrupted. With
+``--broker`` the files are queued on a job broker (``src.pipeline.broker``) instead of run
+here; ``--wait`` follows the queue until they finish.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import multiprocessing
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import MISSING, asdict, fields
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config import DEFAULT_WHISPER_MODEL
+from src.pipeline.preflight import longest_first, probe_files
+from src.pipeline.runner import JobOptions, PipelineRunner
+from src.pipeline.video import MediaInfo
+
+# CLI defaults for JobOptions fields that have none in the dataclass.
+_CLI_DEFAULTS: Dict[str, Any] = {
+    "source_lang": None,
+    "model_size": DEFAULT_WHISPER_MODEL,
+    "output_dir": Path.home() / "VideoTransOutputs",
+}
+
+_EXIT_OK, _EXIT_FAILED, _EXIT_USAGE, _EXIT_INTERRUPTED = 0, 1, 2, 130
+
+
+class ManifestError(ValueError):
+    pass
+
+
+def _field_types() -> Dict[str, str]:
+    # ``from __future__ import annotations`` leaves dataclass field types as strings.
+    return {f.name: str(f.type) for f in fields(JobOptions)}
+
+
+def _coerce(name: str, value: Any) -> Any:
+    """Convert a manifest value (CSV cells are always strings) to the field's type."""
+    kind = _field_types()[name]
+    if kind == "List[str]":
+        if isinstance(value, str):
+            return [part.strip() for part in value.replace(",", ";").split(";") if part.strip()]
+        return [str(part) for part in value]
+    if not isinstance(value, str):
+        return value
+    if kind == "bool":
+        lowered = value.strip().lower()
+        if lowered in ("1", "true", "yes", "y", "on"):
+            return True
+        if lowered in ("0", "false", "no", "n", "off"):
+            return False
+        raise ManifestError(f"{name}: not a boolean: {value!r}")
+    if kind == "int":
+        return int(value)
+    if kind == "Path":
+        return Path(value)
+    if kind == "Optional[str]":
+        return value or None
+    return value
+
+
+def load_manifest(path: Path) -> List[Tuple[str, Dict[str, Any]]]:
+    """Read ``(file, option overrides)`` rows; relative paths are taken from the manifest's folder."""
+    known = _field_types()
+    if path.suffix.lower() == ".csv":
+        with path.open(newline="", encoding="utf-8-sig") as fh:
+            raw: List[Any] = [{k: v for k, v in row.items() if v not in (None, "")} for row in csv.DictReader(fh)]
+    else:
+        raw = json.loads(path.read_text(encoding="utf-8"))
+        if isinstance(raw, dict):
+            raw = raw.get("files", [])
+    rows: List[Tuple[str, Dict[str, Any]]] = []
+    for i, item in enumerate(raw):
+        entry = {"file": item} if isinstance(item, str) else dict(item)
+        file_value = entry.pop("file", None) or entry.pop("path", None)
+        if not file_value:
+            raise ManifestError(f"{path.name} 第 {i + 1} 行缺少 file")
+        unknown = set(entry) - set(known)
+        if unknown:
+            raise ManifestError(f"{path.name} 第 {i + 1} 行有未知选项：{', '.join(sorted(unknown))}")
+        file_path = Path(file_value)
+        if not file_path.is_absolute():
+            file_path = path.parent / file_path
+        rows.append((str(file_path), {k: _coerce(k, v) for k, v in entry.items()}))
+    return rows
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.cli",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("files", nargs="*", help="video files")
+    parser.add_argument("--manifest", type=Path, help="JSON or CSV manifest")
+    parser.add_argument("--jobs", type=int, default=1, help="parallel pipeline processes (default 1)")
+    parser.add_argument("--broker", metavar="HOST:PORT", help="submit to a job broker instead of running locally")
+    parser.add_argument("--wait", action="store_true", help="with --broker: follow the jobs until they finish")
+    options = parser.add_argument_group("job options (JobOptions)")
+    for f in fields(JobOptions):
+        flag = "--" + f.name.replace("_", "-")
+        kind = str(f.type)
+        default = _CLI_DEFAULTS.get(f.name, f.default)
+        assert default is not MISSING or f.name == "target_lang", f.name
+        if kind == "bool":
+            options.add_argument(flag, action=argparse.BooleanOptionalAction, default=default)
+        elif kind == "List[str]":
+            options.add_argument(flag, nargs="+", default=None, metavar="LANG")
+        elif kind == "int":
+            options.add_argument(flag, type=int, default=default, help=f"default {default}")
+        elif kind == "Path":
+            options.add_argument(flag, type=Path, default=default, help=f"default {default}")
+        else:
+            options.add_argument(flag, default=default, help=f"default {default}" if default else None)
+    return parser
+
+
+class _Reporter:
+    """Writes one JSON object per line; in child processes the lines go through a queue."""
+
+    def __init__(self, sink: Any = None, batch: Optional[int] = None) -> None:
+        self._sink = sink
+        self._batch = batch
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, **data: Any) -> None:
+        record: Dict[str, Any] = {"ts": round(time.time(), 3), "event": event}
+        if self._batch is not None:
+            record["batch"] = self._batch
+        record.update(data)
+        if self._sink is not None:
+            self._sink.put(record)
+            return
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            sys.stdout.write(line + "\n")
+            sys.stdout.flush()
+
+    def runner(
+        self, files: List[str], options: JobOptions, cancel_event: Any, media: Optional[Dict[str, MediaInfo]] = None
+    ) -> PipelineRunner:
+        def on_progress(path: str, percent: int) -> None:
+            eta = runner.eta_seconds()
+            self.emit("progress", file=path, percent=percent, eta=None if eta is None else round(eta))
+
+        runner = PipelineRunner(
+            files,
+            options,
+            progress_cb=lambda text: self.emit("log", message=text),
+            file_progress_cb=on_progress,
+            error_cb=lambda message: self.emit("error", message=message),
+            cancel_event=cancel_event,
+            stage_cb=lambda event: self.emit("stage", **asdict(event)),
+            media=media,
+        )
+        return runner
+
+
+# Set in each pool process by _init_child.
+_child_queue: Any = None
+_child_cancel: Any = None
+
+
+def _init_child(events: Any, cancel_event: Any) -> None:
+    global _child_queue, _child_cancel
+    _child_queue, _child_cancel = events, cancel_event
+    # The parent owns Ctrl-C and relays it through cancel_event.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _batch_failed(runner: PipelineRunner, files: List[str], ok: bool, cancel_event: Any) -> List[str]:
+    """Failed files of one batch; a run that aborted without naming any counts all of them."""
+    if ok or runner.failed or cancel_event.is_set():
+        return runner.failed
+    return list(files)
+
+
+def _run_batch(batch: int, files: List[str], options: JobOptions, media: Dict[str, MediaInfo]) -> List[str]:
+    runner = _Reporter(_child_queue, batch).runner(files, options, _child_cancel, media)
+    return _batch_failed(runner, files, runner.run(), _child_cancel)
+
+
+def _plan_batches(
+    rows: List[Tuple[str, Dict[str, Any]]],
+    base: Dict[str, Any],
+    jobs: int,
+    media: Optional[Dict[str, MediaInfo]] = None,
+) -> List[Tuple[List[str], JobOptions]]:
+    """
+    Group files by their effective options, then shard each group across ``jobs``. With
+    probed durations in ``media`` (keyed by resolved path) each file, longest first, goes
+    to the shard with the least media so far; otherwise files are dealt round-robin.
+    """
+    groups: Dict[str, Tuple[Dict[str, Any], List[str]]] = {}
+    for file_path, overrides in rows:
+        merged = {**base, **overrides}
+        key = json.dumps(merged, sort_keys=True, default=str)
+        groups.setdefault(key, (merged, []))[1].append(file_path)
+    batches: List[Tuple[List[str], JobOptions]] = []
+    for merged, files in groups.values():
+        if not merged.get("target_lang"):
+            raise ManifestError("缺少目标语言：请使用 --target-lang 或在清单中指定 target_lang")
+        options = JobOptions(**merged)
+        shards = max(1, min(jobs, len(files)))
+        if not media:
+            batches += [(files[i::shards], options) for i in range(shards)]
+            continue
+        resolved = {str(Path(path).resolve()): path for path in files}
+        ordered = [resolved[path] for path in longest_first(list(resolved), media)]
+        load = [0.0] * shards
+        planned: List[List[str]] = [[] for _ in range(shards)]
+        for path in ordered:
+            info = media.get(str(Path(path).resolve()))
+            shard = load.index(min(load))
+            planned[shard].append(path)
+            load[shard] += info.duration if info and info.duration > 0 else 1.0
+        batches += [(shard_files, options) for shard_files in planned if shard_files]
+    return batches
+
+
+def _subset(media: Optional[Dict[str, MediaInfo]], files: List[str]) -> Dict[str, MediaInfo]:
+    if not media:
+        return {}
+    paths = {str(Path(path).resolve()) for path in files}
+    return {path: info for path, info in media.items() if path in paths}
+
+
+def _submit_to_broker(
+    address: str, batches: List[Tuple[List[str], JobOptions]], wait: bool, reporter: _Reporter
+) -> int:
+    from src.pipeline.broker import FINISHED, BrokerClient, BrokerError
+
+    client = BrokerClient(address)
+    ids: List[int] = []
+    try:
+        for files, options in batches:
+            ids += client.submit(files, options)
+        reporter.emit("submitted", broker=address, ids=ids)
+        if not wait:
+            return _EXIT_OK
+        seen: Dict[int, str] = {}
+        while True:
+            jobs = client.status(ids)["jobs"]
+            for job in jobs:
+                if job["status"] != seen.get(job["id"]):
+                    seen[job["id"]] = job["status"]
+                    reporter.emit(
+                        "job",
+                        id=job["id"],
+                        file=job["file"],
+                        status=job["status"],
+                        worker=job["worker"],
+                        error=job["error"],
+                        outputs=job["outputs"],
+                    )
+            if all(job["status"] in FINISHED for job in jobs):
+                break
+            time.sleep(2)
+    except (OSError, BrokerError) as exc:
+        reporter.emit("error", message=f"broker {address}: {exc}")
+        return _EXIT_FAILED
+    except KeyboardInterrupt:
+        # Stop following; the jobs stay queued on the broker.
+        return _EXIT_INTERRUPTED
+    failed = [job["file"] for job in jobs if job["status"] != "done"]
+    reporter.emit("summary", files=len(jobs), failed=failed, ok=len(jobs) - len(failed), cancelled=False)
+    return _EXIT_FAILED if failed else _EXIT_OK
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    base = {f.name: getattr(args, f.name) for f in fields(JobOptions)}
+    if base["target_lang"] is None:
+        del base["target_lang"]
+    try:
+        rows = [(path, {}) for path in args.files]
+        if args.manifest:
+            rows += load_manifest(args.manifest)
+        if not rows:
+            parser.error("no input files (pass paths or --manifest)")
+        # Probed once here and handed to every runner (broker jobs are queued longest first;
+        # their workers probe again on their own machines).
+        media = None
+        if base["preflight"]:
+            media = probe_files(list(dict.fromkeys(str(Path(path).resolve()) for path, _ in rows)))
+        # Workers take one file at a time from a broker, so there is nothing to shard.
+        batches = _plan_batches(rows, base, 1 if args.broker else max(1, args.jobs), media)
+    except (ManifestError, ValueError, OSError) as exc:
+        print(f"{parser.prog}: error: {exc}", file=sys.stderr)
+        return _EXIT_USAGE
+
+    reporter = _Reporter()
+    if args.broker:
+        return _submit_to_broker(args.broker, batches, args.wait, reporter)
+    total = sum(len(files) for files, _ in batches)
+    reporter.emit("start", files=total, batches=len(batches), jobs=args.jobs)
+    failed: List[str] = []
+
+    if args.jobs <= 1:
+        cancel_event = threading.Event()
+        previous = signal.signal(signal.SIGINT, lambda *_: cancel_event.set())
+        try:
+            for batch, (files, options) in enumerate(batches):
+                if cancel_event.is_set():
+                    break
+                runner = _Reporter(batch=batch).runner(files, options, cancel_event, media)
+                failed += _batch_failed(runner, files, runner.run(), cancel_event)
+        finally:
+            signal.signal(signal.SIGINT, previous)
+        cancelled = cancel_event.is_set()
+    else:
+        # spawn: no forked torch/CUDA state, and each process keeps its own model registry.
+        ctx = multiprocessing.get_context("spawn")
+        events = ctx.Queue()
+        cancel_event = ctx.Event()
+        previous = signal.signal(signal.SIGINT, lambda *_: cancel_event.set())
+        try:
+            with ProcessPoolExecutor(
+                max_workers=args.jobs,
+                mp_context=ctx,
+                initializer=_init_child,
+                initargs=(events, cancel_event),
+            ) as pool:
+                futures = [
+                    pool.submit(_run_batch, batch, files, options, _subset(media, files))
+                    for batch, (files, options) in enumerate(batches)
+                ]
+                while not all(f.done() for f in futures) or not events.empty():
+                    try:
+                        record = events.get(timeout=0.2)
+                    except Exception:  # queue.Empty
+                        continue
+                    print(json.dumps(record, ensure_ascii=False), flush=True)
+                for future, (files, _) in zip(futures, batches):
+                    try:
+                        failed += future.result()
+                    except Exception as exc:  # crashed pool process
+                        reporter.emit("error", message=f"{type(exc).__name__}: {exc}")
+                        failed += files
+        finally:
+            signal.signal(signal.SIGINT, previous)
+        cancelled = cancel_event.is_set()
+
+    reporter.emit("summary", files=total, failed=failed, ok=total - len(failed), cancelled=cancelled)
+    if cancelled:
+        return _EXIT_INTERRUPTED
+    return _EXIT_FAILED if failed else _EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
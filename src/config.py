@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import os
+from pathlib import Path
 from typing import Dict, List
 
 # Friendly language list for UI and translation backends (M2M100 codes).
@@ -19,6 +21,34 @@ LANG_OPTIONS: List[Dict[str, str]] = [
     {"label": "阿拉伯语", "code": "ar"},
 ]
 
+# ISO 639-2 tags written into soft-subtitle stream metadata.
+LANG_ISO639_2: Dict[str, str] = {
+    "zh": "chi",
+    "en": "eng",
+    "ja": "jpn",
+    "ko": "kor",
+    "fr": "fre",
+    "de": "ger",
+    "es": "spa",
+    "ru": "rus",
+    "pt": "por",
+    "it": "ita",
+    "ar": "ara",
+}
+
+# How translated subtitles are attached to the video: burned into pixels or muxed as tracks.
+SUBTITLE_MODES: List[Dict[str, str]] = [
+    {"label": "烧录（重编码）", "code": "hard"},
+    {"label": "软字幕（不重编码）", "code": "soft"},
+]
+
+# Encoder profiles for subtitle burn-in (libx264 CRF/preset pairs).
+ENCODER_PROFILES: List[Dict[str, str]] = [
+    {"label": "快速草稿", "code": "draft", "codec": "libx264", "preset": "veryfast", "crf": "28"},
+    {"label": "均衡（默认）", "code": "balanced", "codec": "libx264", "preset": "medium", "crf": "23"},
+    {"label": "归档高质量", "code": "archival", "codec": "libx264", "preset": "slow", "crf": "18"},
+]
+
 # Default fonts for subtitle burn-in.
 DEFAULT_FONT = "Microsoft YaHei UI"
 DEFAULT_FONT_SIZE = 32
@@ -32,3 +62,71 @@ DEFAULT_TRANSLATION_MODEL = "facebook/m2m100_418M"
 # LM Studio API defaults (OpenAI-compatible).
 DEFAULT_LMSTUDIO_ENDPOINT = "http://127.0.0.1:1234/v1/chat/completions"
 DEFAULT_LMSTUDIO_MODEL = "lmstudio-community/Meta-Llama-3-8B-Instruct-GGUF"
+
+# Local cache directory for transcriptions and other reusable artifacts.
+CACHE_DIR = os.path.join(str(Path.home()), ".cache", "video-trans-plot")
+
+# Size cap for the on-disk transcription cache (least recently used entries go first).
+TRANSCRIPTION_CACHE_MAX_MB = 512
+
+# Segment-level translation memory (SQLite) shared by all translation backends.
+TRANSLATION_MEMORY_PATH = os.path.join(CACHE_DIR, "translation_memory.sqlite3")
+TRANSLATION_MEMORY_MAX_ENTRIES = 200_000
+
+# Padded-token budget per M2M100 generate() call (texts are length-sorted before packing).
+TRANSLATION_TOKEN_BUDGET = 2048
+
+# M2M100 inference precision modes: label -> mode passed to Translator.
+TRANSLATION_PRECISIONS: List[Dict[str, str]] = [
+    {"label": "fp32（默认）", "code": "fp32"},
+    {"label": "bf16", "code": "bf16"},
+    {"label": "int8 动态量化（CPU）", "code": "int8"},
+]
+
+# LM Studio request tuning: parallel in-flight batches, retries with exponential backoff.
+LMSTUDIO_CONCURRENCY = 2
+LMSTUDIO_MAX_RETRIES = 3
+LMSTUDIO_TIMEOUT = 300
+# Prompt + expected completion tokens per LM Studio request (lines are packed up to this).
+LMSTUDIO_TOKEN_BUDGET = 3000
+
+# Decoded 16 kHz mono float32 PCM cache (about 230 MB per hour of audio).
+AUDIO_CACHE_MAX_MB = 4096
+
+# Process-wide model registry: resident weights beyond this are unloaded LRU-first.
+MODEL_MEMORY_BUDGET_MB = 8192
+
+# Load the selected Whisper/translation models in the background once the window is shown.
+WARMUP_MODELS_ON_START = True
+
+# Optional long-lived model daemon (Unix socket; Linux/macOS).
+DAEMON_SOCKET = os.path.join(CACHE_DIR, "models.sock")
+
+# GUI log: worker lines are buffered and flushed to the view on a timer; the view keeps the
+# newest LOG_VIEW_MAX_BLOCKS lines and the full log goes to a rotating file.
+LOG_FLUSH_INTERVAL_MS = 100
+LOG_VIEW_MAX_BLOCKS = 5000
+LOG_PENDING_MAX_LINES = 20000
+LOG_DIR = os.path.join(CACHE_DIR, "logs")
+LOG_FILE_MAX_MB = 10
+LOG_FILE_BACKUPS = 5
+
+# Multi-machine job queue (python -m src.pipeline.broker). Workers must see the same
+# input and output paths (shared filesystem).
+BROKER_DB = os.path.join(CACHE_DIR, "broker.sqlite3")
+BROKER_HOST = "127.0.0.1"
+BROKER_PORT = 8765
+# Shared secret sent with every broker request; set the same value on the broker, the
+# workers and the submitting machines. Without one the broker only listens on localhost.
+BROKER_TOKEN = os.environ.get("VIDEO_TRANS_BROKER_TOKEN", "")
+# A leased job returns to the queue when its worker misses heartbeats for this long.
+BROKER_LEASE_SECONDS = 60
+# Leases (crashes or failures) per job before it is marked failed.
+BROKER_MAX_ATTEMPTS = 3
+
+# Pre-flight: every input is probed with ffprobe (this many at once) before a batch starts.
+PREFLIGHT_WORKERS = 8
+PREFLIGHT_TIMEOUT = 60
+# Starting guesses for processing seconds per second of media in each pipeline thread,
+# used to weight progress and the ETA until the batch's own stage timings replace them.
+PROGRESS_STAGE_RATES = {"transcribe": 0.3, "translate": 0.05, "encode": 0.5, "mux": 0.02, "subtitles": 0.002}
@@ -0,0 +1,105 @@
+"""Decode each input's audio once into a cached 16 kHz mono PCM file exposed as a memmap."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import subprocess
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+import numpy as np
+
+from src.config import AUDIO_CACHE_MAX_MB, CACHE_DIR
+
+SAMPLE_RATE = 16000
+
+ProgressFn = Optional[Callable[[str], None]]
+
+
+def _log(message: str, cb: ProgressFn) -> None:
+    if cb:
+        cb(message)
+
+
+def _cache_name(video: Path) -> str:
+    stat = video.stat()
+    material = f"{video}|{stat.st_size}|{stat.st_mtime_ns}"
+    return hashlib.blake2b(material.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _evict(cache_dir: Path, max_bytes: int, keep: Path) -> None:
+    entries = []
+    total = 0
+    for path in cache_dir.glob("*.f32"):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            path.unlink()
+        except OSError:
+            continue
+        total -= size
+
+
+def extract_audio(
+    video_path: Union[str, Path],
+    cache_dir: Union[str, Path, None] = None,
+    max_bytes: int = AUDIO_CACHE_MAX_MB * 1024 * 1024,
+    progress_cb: ProgressFn = None,
+) -> np.ndarray:
+    """
+    Run FFmpeg once per input to produce 16 kHz mono float32 PCM and return it as a
+    read-only ``numpy.memmap`` (the format Whisper consumes directly).
+
+    The PCM file is keyed by path, size and mtime, so later stages and re-runs reuse it
+    instead of demuxing/decoding again; RAM stays bounded because pages are loaded on
+    demand. Least recently used files are evicted past ``max_bytes``.
+    """
+    video = Path(video_path).resolve()
+    root = Path(cache_dir or os.path.join(CACHE_DIR, "audio"))
+    root.mkdir(parents=True, exist_ok=True)
+    pcm = root / f"{_cache_name(video)}.f32"
+
+    if pcm.exists():
+        os.utime(pcm)
+    else:
+        _log("解码音频...", progress_cb)
+        tmp = pcm.with_suffix(f".{os.getpid()}.part")
+        cmd = [
+            "ffmpeg",
+            "-nostdin",
+            "-v",
+            "error",
+            "-y",
+            "-i",
+            str(video),
+            "-vn",
+            "-ac",
+            "1",
+            "-ar",
+            str(SAMPLE_RATE),
+            "-f",
+            "f32le",
+            str(tmp),
+        ]
+        try:
+            subprocess.run(cmd, check=True)
+            os.replace(tmp, pcm)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        _evict(root, max_bytes, keep=pcm)
+
+    if pcm.stat().st_size == 0:
+        return np.zeros(0, dtype=np.float32)
+    return np.memmap(pcm, dtype=np.float32, mode="r")
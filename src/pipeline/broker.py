@@ -0,0 +1,544 @@
+"""
+Multi-machine job queue: a broker keeps file jobs in SQLite, stateless workers lease them.
+
+    python -m src.pipeline.broker serve [--host 127.0.0.1] [--port 8765] [--db PATH]
+    python -m src.pipeline.broker worker --broker HOST:PORT [--once]
+    python -m src.pipeline.broker status --broker HOST:PORT [--json]
+    python -m src.pipeline.broker cancel --broker HOST:PORT [JOB_ID ...]
+
+Jobs are submitted from the GUI or with ``python -m src.cli ... --broker HOST:PORT``.
+A worker leases one file at a time and renews the lease every third of
+``BROKER_LEASE_SECONDS``. It writes results straight to the job's ``output_dir``, so
+inputs and outputs must sit on a filesystem every worker sees under the same paths.
+If a worker is killed or its host goes down, the lease is not renewed and expires. The
+job then returns to the queue, up to ``BROKER_MAX_ATTEMPTS`` leases. With ``resume`` the
+next worker continues from the checkpoints the previous one left. A failure that the
+pipeline reports is final.
+
+Every request carries the shared ``BROKER_TOKEN`` (environment variable
+``VIDEO_TRANS_BROKER_TOKEN``), which the broker checks before doing anything; a worker
+reads and writes whatever paths a job names, so an open broker would let anyone on the
+network do the same. The broker listens on localhost by default and refuses any other
+address unless a token is set (or ``--allow-no-token`` is given for a trusted network).
+
+Wire format: one JSON request line and one JSON reply line per TCP connection.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hmac
+import ipaddress
+import json
+import os
+import signal
+import socket
+import socketserver
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, fields
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from src.config import (
+    BROKER_DB,
+    BROKER_HOST,
+    BROKER_LEASE_SECONDS,
+    BROKER_MAX_ATTEMPTS,
+    BROKER_PORT,
+    BROKER_TOKEN,
+)
+from src.pipeline.runner import JobOptions, PipelineRunner
+
+# Terminal states; "queued" and "leased" are the live ones.
+FINISHED = ("done", "failed", "cancelled")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file TEXT NOT NULL,
+    options TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    submitted REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    error TEXT,
+    outputs TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+"""
+
+
+class BrokerError(RuntimeError):
+    pass
+
+
+def options_to_payload(options: JobOptions) -> Dict[str, Any]:
+    payload = asdict(options)
+    payload["output_dir"] = str(options.output_dir)
+    return payload
+
+
+def options_from_payload(payload: Dict[str, Any]) -> JobOptions:
+    # Ignore fields from a newer submitter so older workers keep leasing.
+    known = {f.name for f in fields(JobOptions)}
+    return JobOptions(**{k: v for k, v in payload.items() if k in known})
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    host, _, port = address.strip().rpartition(":")
+    if not host:
+        return port or "127.0.0.1", BROKER_PORT
+    return host, int(port)
+
+
+class JobQueue:
+    """
+    SQLite-backed job table. The broker process is its only user, so one connection
+    behind a lock is enough; expired leases are swept on every lease and status call.
+    """
+
+    def __init__(
+        self,
+        path: str = BROKER_DB,
+        lease_seconds: float = BROKER_LEASE_SECONDS,
+        max_attempts: int = BROKER_MAX_ATTEMPTS,
+    ) -> None:
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def submit(self, files: Iterable[str], options: Dict[str, Any]) -> List[int]:
+        blob = json.dumps(options, ensure_ascii=False, sort_keys=True)
+        now = time.time()
+        ids: List[int] = []
+        with self._lock:
+            for path in files:
+                cur = self._db.execute(
+                    "INSERT INTO jobs (file, options, submitted) VALUES (?, ?, ?)", (str(path), blob, now)
+                )
+                ids.append(int(cur.lastrowid))
+        return ids
+
+    def lease(self, worker: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            row = self._db.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE jobs SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1, "
+                "started = ?, error = NULL WHERE id = ?",
+                (worker, now + self.lease_seconds, now, row["id"]),
+            )
+        return {
+            "id": row["id"],
+            "file": row["file"],
+            "options": json.loads(row["options"]),
+            "attempt": row["attempts"] + 1,
+            "lease_seconds": self.lease_seconds,
+        }
+
+    def heartbeat(self, job_id: int, worker: str) -> bool:
+        """Extend the lease; False when the job is no longer this worker's (expired or cancelled)."""
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (time.time() + self.lease_seconds, job_id, worker),
+            )
+        return cur.rowcount == 1
+
+    def complete(self, job_id: int, worker: str, ok: bool, error: str = "", outputs: Optional[List[str]] = None) -> bool:
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE jobs SET status = ?, finished = ?, error = ?, outputs = ?, lease_expires = NULL "
+                "WHERE id = ? AND worker = ? AND status = 'leased'",
+                ("done" if ok else "failed", time.time(), error or None, json.dumps(outputs or []), job_id, worker),
+            )
+        return cur.rowcount == 1
+
+    def release(self, job_id: int, worker: str) -> bool:
+        """Return a job unfinished (worker shutting down) without using up an attempt."""
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL, lease_expires = NULL, attempts = attempts - 1 "
+                "WHERE id = ? AND worker = ? AND status = 'leased'",
+                (job_id, worker),
+            )
+        return cur.rowcount == 1
+
+    def cancel(self, job_ids: Optional[List[int]] = None) -> int:
+        """Cancel queued and running jobs (all of them without ``job_ids``); workers stop at their next heartbeat."""
+        where = "status IN ('queued', 'leased')"
+        params: List[Any] = []
+        if job_ids:
+            where += f" AND id IN ({', '.join('?' * len(job_ids))})"
+            params = list(job_ids)
+        with self._lock:
+            cur = self._db.execute(
+                f"UPDATE jobs SET status = 'cancelled', finished = ?, lease_expires = NULL WHERE {where}",
+                [time.time(), *params],
+            )
+        return cur.rowcount
+
+    def status(self, job_ids: Optional[List[int]] = None, limit: int = 200) -> Dict[str, Any]:
+        with self._lock:
+            self._expire(time.time())
+            counts = {
+                row["status"]: row["n"]
+                for row in self._db.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")
+            }
+            if job_ids:
+                rows = self._db.execute(
+                    f"SELECT * FROM jobs WHERE id IN ({', '.join('?' * len(job_ids))}) ORDER BY id", list(job_ids)
+                ).fetchall()
+            else:
+                rows = self._db.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()[::-1]
+        jobs = []
+        for row in rows:
+            job = {k: row[k] for k in row.keys() if k != "options"}
+            job["outputs"] = json.loads(row["outputs"]) if row["outputs"] else []
+            jobs.append(job)
+        workers = sorted({job["worker"] for job in jobs if job["status"] == "leased" and job["worker"]})
+        return {"counts": counts, "jobs": jobs, "workers": workers}
+
+    def _expire(self, now: float) -> None:
+        expired = self._db.execute(
+            "SELECT id, worker, attempts FROM jobs WHERE status = 'leased' AND lease_expires < ?", (now,)
+        ).fetchall()
+        for row in expired:
+            if row["attempts"] >= self.max_attempts:
+                self._db.execute(
+                    "UPDATE jobs SET status = 'failed', finished = ?, lease_expires = NULL, error = ? WHERE id = ?",
+                    (now, f"租约已过期 {row['attempts']} 次（最后的工作进程：{row['worker']}）", row["id"]),
+                )
+            else:
+                self._db.execute(
+                    "UPDATE jobs SET status = 'queued', worker = NULL, lease_expires = NULL WHERE id = ?",
+                    (row["id"],),
+                )
+
+    def close(self) -> None:
+        self._db.close()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "BrokerServer"
+
+    def handle(self) -> None:
+        try:
+            request = json.loads(self.rfile.readline())
+            reply = self.server.dispatch(request)
+            reply["ok"] = True
+        except Exception as exc:  # reported to the client, broker keeps serving
+            reply = {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+        self.wfile.write(json.dumps(reply, ensure_ascii=False).encode("utf-8") + b"\n")
+
+
+class BrokerServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, queue: JobQueue, address: Tuple[str, int], token: str = BROKER_TOKEN) -> None:
+        super().__init__(address, _Handler)
+        self.queue = queue
+        self.token = token
+
+    def dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        if self.token and not hmac.compare_digest(str(request.get("token", "")).encode(), self.token.encode()):
+            raise PermissionError("missing or wrong broker token (VIDEO_TRANS_BROKER_TOKEN)")
+        op = request.get("op")
+        q = self.queue
+        if op == "ping":
+            return {}
+        if op == "submit":
+            return {"ids": q.submit(request["files"], request["options"])}
+        if op == "lease":
+            return {"job": q.lease(request["worker"])}
+        if op == "heartbeat":
+            return {"held": q.heartbeat(request["id"], request["worker"])}
+        if op == "complete":
+            return {
+                "held": q.complete(
+                    request["id"], request["worker"], request["success"], request.get("error", ""), request.get("outputs")
+                )
+            }
+        if op == "release":
+            return {"held": q.release(request["id"], request["worker"])}
+        if op == "cancel":
+            return {"cancelled": q.cancel(request.get("ids"))}
+        if op == "status":
+            return q.status(request.get("ids"))
+        raise ValueError(f"unknown op: {op}")
+
+
+class BrokerClient:
+    """Talks to a broker; one short-lived TCP connection per request."""
+
+    def __init__(self, address: str, timeout: float = 10.0, token: str = BROKER_TOKEN) -> None:
+        self.address = parse_address(address)
+        self.timeout = timeout
+        self.token = token
+
+    def _call(self, op: str, **args: Any) -> Dict[str, Any]:
+        request = {"op": op, "token": self.token, **args}
+        with socket.create_connection(self.address, timeout=self.timeout) as sock:
+            sock.sendall(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+            with sock.makefile("rb") as fh:
+                line = fh.readline()
+        if not line:
+            raise BrokerError("broker closed the connection")
+        reply = json.loads(line)
+        if not reply.get("ok"):
+            raise BrokerError(reply.get("error", "unknown broker error"))
+        return reply
+
+    def available(self) -> bool:
+        try:
+            self._call("ping")
+        except (OSError, BrokerError):
+            return False
+        return True
+
+    def submit(self, files: List[str], options: JobOptions) -> List[int]:
+        # Workers on other hosts resolve these paths themselves; send them absolute.
+        paths = [os.path.abspath(path) for path in files]
+        payload = options_to_payload(options)
+        payload["output_dir"] = os.path.abspath(payload["output_dir"])
+        return self._call("submit", files=paths, options=payload)["ids"]
+
+    def lease(self, worker: str) -> Optional[Dict[str, Any]]:
+        return self._call("lease", worker=worker)["job"]
+
+    def heartbeat(self, job_id: int, worker: str) -> bool:
+        return bool(self._call("heartbeat", id=job_id, worker=worker)["held"])
+
+    def complete(self, job_id: int, worker: str, success: bool, error: str = "", outputs: Optional[List[str]] = None) -> bool:
+        return bool(
+            self._call("complete", id=job_id, worker=worker, success=success, error=error, outputs=outputs or [])["held"]
+        )
+
+    def release(self, job_id: int, worker: str) -> bool:
+        return bool(self._call("release", id=job_id, worker=worker)["held"])
+
+    def cancel(self, job_ids: Optional[List[int]] = None) -> int:
+        return int(self._call("cancel", ids=job_ids)["cancelled"])
+
+    def status(self, job_ids: Optional[List[int]] = None) -> Dict[str, Any]:
+        return self._call("status", ids=job_ids)
+
+
+class BrokerWorker:
+    """
+    Lease -> run ``PipelineRunner`` on one file -> report, until stopped. A heartbeat
+    thread renews the lease while the file runs and cancels the run when the lease is
+    lost (cancelled, or expired and handed to another worker). Models stay loaded in
+    this process between jobs.
+    """
+
+    def __init__(
+        self,
+        client: BrokerClient,
+        worker_id: Optional[str] = None,
+        poll_seconds: float = 2.0,
+        log: Callable[[str], None] = print,
+    ) -> None:
+        self.client = client
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.poll_seconds = poll_seconds
+        self._log = log
+        self._stop = threading.Event()
+        self._current: Optional[threading.Event] = None
+
+    def stop(self) -> None:
+        """Lease nothing further; the running file is cancelled and its job released."""
+        self._stop.set()
+        current = self._current
+        if current is not None:
+            current.set()
+
+    def run(self, once: bool = False) -> int:
+        """Process jobs; with ``once`` return when the queue is empty. Returns the number of jobs run."""
+        done = 0
+        unreachable = False
+        while not self._stop.is_set():
+            try:
+                job = self.client.lease(self.worker_id)
+                unreachable = False
+            except (OSError, BrokerError) as exc:
+                if not unreachable:
+                    self._log(f"[{self.worker_id}] broker unreachable ({exc}); retrying")
+                unreachable = True
+                self._stop.wait(self.poll_seconds)
+                continue
+            if job is None:
+                if once:
+                    break
+                self._stop.wait(self.poll_seconds)
+                continue
+            self._run_job(job)
+            done += 1
+        return done
+
+    def _run_job(self, job: Dict[str, Any]) -> None:
+        job_id = job["id"]
+        prefix = f"[{self.worker_id} job {job_id}]"
+        self._log(f"{prefix} {job['file']} (attempt {job['attempt']})")
+        tail: Deque[str] = deque(maxlen=20)
+        cancel = self._current = threading.Event()
+        if self._stop.is_set():
+            cancel.set()
+        lost = threading.Event()
+
+        def on_log(text: str) -> None:
+            self._log(f"{prefix} {text}")
+
+        def on_error(text: str) -> None:
+            tail.append(text)
+            on_log(text)
+
+        runner = PipelineRunner(
+            [job["file"]],
+            options_from_payload(job["options"]),
+            progress_cb=on_log,
+            error_cb=on_error,
+            cancel_event=cancel,
+        )
+        finished = threading.Event()
+
+        def heartbeat() -> None:
+            interval = max(1.0, float(job["lease_seconds"]) / 3)
+            while not finished.wait(interval):
+                try:
+                    held = self.client.heartbeat(job_id, self.worker_id)
+                except (OSError, BrokerError):
+                    continue  # broker restarting; the lease may still be renewed in time
+                if not held:
+                    on_log("lease lost (cancelled or expired); stopping")
+                    lost.set()
+                    cancel.set()
+                    return
+
+        beat = threading.Thread(target=heartbeat, name=f"heartbeat-{job_id}", daemon=True)
+        beat.start()
+        ok = False
+        try:
+            ok = runner.run()
+        finally:
+            finished.set()
+            beat.join()
+            self._current = None
+        if lost.is_set():
+            return
+        try:
+            if cancel.is_set():
+                self.client.release(job_id, self.worker_id)
+                on_log("released unfinished job")
+                return
+            outputs = [path for paths in runner.outputs.values() for path in paths]
+            # run() is False when the whole run aborted (e.g. a model failed to load), even
+            # if no file was named as failed; the error text says why.
+            ok = ok and not runner.failed
+            self.client.complete(job_id, self.worker_id, ok, "\n".join(tail), outputs)
+            on_log("done" if ok else "failed")
+        except (OSError, BrokerError) as exc:
+            # The lease will expire and the job re-run; its checkpoints make that cheap.
+            on_log(f"could not report to broker: {exc}")
+
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:  # a host name other than localhost may resolve to anything
+        return False
+
+
+def _print_status(status: Dict[str, Any]) -> None:
+    counts = status["counts"]
+    print("  ".join(f"{name}={counts.get(name, 0)}" for name in ("queued", "leased", *FINISHED)))
+    for job in status["jobs"]:
+        who = f" {job['worker']}" if job["status"] == "leased" else ""
+        error = f"  {job['error'].splitlines()[0]}" if job.get("error") else ""
+        print(f"{job['id']:>6} {job['status']:<9} a{job['attempts']}{who}  {job['file']}{error}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="run the broker")
+    serve.add_argument("--host", default=BROKER_HOST, help="use 0.0.0.0 to accept other machines (needs a token)")
+    serve.add_argument("--port", type=int, default=BROKER_PORT)
+    serve.add_argument("--db", default=BROKER_DB)
+    serve.add_argument("--lease-seconds", type=float, default=BROKER_LEASE_SECONDS)
+    serve.add_argument("--max-attempts", type=int, default=BROKER_MAX_ATTEMPTS)
+    serve.add_argument(
+        "--allow-no-token", action="store_true", help="listen beyond localhost without VIDEO_TRANS_BROKER_TOKEN"
+    )
+    worker = sub.add_parser("worker", help="lease and process jobs")
+    worker.add_argument("--broker", required=True, metavar="HOST:PORT")
+    worker.add_argument("--id", help="worker name (default host-pid)")
+    worker.add_argument("--once", action="store_true", help="exit when the queue is empty")
+    status = sub.add_parser("status", help="show the queue")
+    status.add_argument("--broker", required=True, metavar="HOST:PORT")
+    status.add_argument("--json", action="store_true")
+    cancel = sub.add_parser("cancel", help="cancel jobs (all live jobs when no ids are given)")
+    cancel.add_argument("--broker", required=True, metavar="HOST:PORT")
+    cancel.add_argument("ids", nargs="*", type=int)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        if not BROKER_TOKEN and not _is_loopback(args.host) and not args.allow_no_token:
+            parser.error(
+                f"refusing to listen on {args.host} without a token: set VIDEO_TRANS_BROKER_TOKEN "
+                "(same value on every machine) or pass --allow-no-token on a trusted network"
+            )
+        queue = JobQueue(args.db, lease_seconds=args.lease_seconds, max_attempts=args.max_attempts)
+        server = BrokerServer(queue, (args.host, args.port))
+        print(f"job broker listening on {args.host}:{server.server_address[1]} (db {args.db})", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            queue.close()
+        return 0
+
+    client = BrokerClient(args.broker)
+    if args.command == "worker":
+        runner = BrokerWorker(client, args.id, log=lambda text: print(text, flush=True))
+        signal.signal(signal.SIGTERM, lambda *_: runner.stop())
+        signal.signal(signal.SIGINT, lambda *_: runner.stop())
+        print(f"worker {runner.worker_id} polling {args.broker}", flush=True)
+        runner.run(once=args.once)
+        return 0
+    try:
+        if args.command == "status":
+            result = client.status()
+            if args.json:
+                print(json.dumps(result, ensure_ascii=False, indent=2))
+            else:
+                _print_status(result)
+        else:
+            print(f"cancelled {client.cancel(args.ids or None)}")
+    except (OSError, BrokerError) as exc:
+        print(f"broker {args.broker}: {exc}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
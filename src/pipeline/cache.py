@@ -0,0 +1,117 @@
+"""Content-addressed on-disk cache for Whisper transcriptions."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional, Union
+
+from src.config import CACHE_DIR, TRANSCRIPTION_CACHE_MAX_MB
+
+if TYPE_CHECKING:  # numpy is only needed by array_digest; keep it off the GUI import path
+    import numpy as np
+
+# Bump when the stored payload layout or segment post-processing changes.
+_CACHE_VERSION = 1
+_CHUNK = 1 << 20
+
+
+def file_digest(path: Union[str, Path]) -> str:
+    """Hash the full file content so renamed or copied videos still hit the cache."""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def array_digest(samples: np.ndarray) -> str:
+    """Hash decoded PCM in bounded slices so memmapped audio is never loaded whole."""
+    import numpy as np
+
+    h = hashlib.blake2b(digest_size=20)
+    step = _CHUNK // max(1, samples.itemsize)
+    for i in range(0, len(samples), step):
+        h.update(np.ascontiguousarray(samples[i : i + step]).tobytes())
+    return h.hexdigest()
+
+
+class TranscriptionCache:
+    """
+    One JSON file per transcription under ``root``.
+
+    Entries are touched on every hit, so file mtime doubles as the LRU clock; once the
+    directory grows past ``max_bytes`` the least recently used entries are removed.
+    """
+
+    def __init__(
+        self,
+        root: Union[str, Path, None] = None,
+        max_bytes: int = TRANSCRIPTION_CACHE_MAX_MB * 1024 * 1024,
+    ) -> None:
+        self.root = Path(root or os.path.join(CACHE_DIR, "transcripts"))
+        self.max_bytes = max_bytes
+
+    def make_key(
+        self,
+        content_digest: str,
+        model_size: str,
+        language: Optional[str],
+        decode_options: Optional[Dict[str, object]] = None,
+    ) -> str:
+        material = json.dumps(
+            {
+                "v": _CACHE_VERSION,
+                "content": content_digest,
+                "model": model_size,
+                "language": language or "",
+                "options": decode_options or {},
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, object]]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                payload = json.load(fh)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return payload
+
+    def put(self, key: str, payload: Dict[str, object]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(payload, fh, ensure_ascii=False)
+        os.replace(tmp, path)
+        self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        total = 0
+        for path in self.root.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
@@ -0,0 +1,179 @@
+"""Per-file stage checkpoints so an interrupted batch resumes where it stopped."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Union
+
+from src.pipeline.cache import file_digest
+
+# Bump when the record layout changes; older records are ignored.
+_CHECKPOINT_VERSION = 1
+CHECKPOINT_DIRNAME = ".checkpoints"
+
+
+def fingerprint(**parts: object) -> str:
+    """Stable digest of the options (and upstream artifact hashes) a stage depends on."""
+    blob = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(blob.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def _write_json(path: Path, payload: object) -> None:
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(payload, fh, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _source_signature(path: Path) -> str:
+    st = path.stat()
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+class FileCheckpoint:
+    """
+    Stage records for one source file, stored as ``<dir>/state.json``.
+
+    A stage is ``begin``-ed with the paths it is about to write and ``complete``-d with
+    the artifacts it produced (path, blake2b, size, mtime). A stage left "running" by a
+    crash has its planned paths deleted on the next open, so half-written outputs are
+    never mistaken for results. Records reset when the source file changes.
+    """
+
+    def __init__(self, directory: Path, source: Union[str, Path]) -> None:
+        self.dir = directory
+        self.source = Path(source)
+        self._state_path = directory / "state.json"
+        self._lock = threading.Lock()
+        self.discarded: List[Path] = []
+        self.dir.mkdir(parents=True, exist_ok=True)
+        signature = _source_signature(self.source)
+        state: Dict[str, object] = {}
+        try:
+            state = json.loads(self._state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            pass
+        if state.get("version") != _CHECKPOINT_VERSION or state.get("source_sig") != signature:
+            state = {"version": _CHECKPOINT_VERSION, "source": str(self.source), "source_sig": signature, "stages": {}}
+        self._state = state
+        self._discard_incomplete()
+
+    @property
+    def _stages(self) -> Dict[str, Dict[str, object]]:
+        return self._state["stages"]  # type: ignore[return-value]
+
+    def _save(self) -> None:
+        _write_json(self._state_path, self._state)
+
+    def _discard_incomplete(self) -> None:
+        for name, record in list(self._stages.items()):
+            if record.get("status") == "done":
+                continue
+            for planned in record.get("planned", []):  # type: ignore[union-attr]
+                path = Path(planned)
+                if path.exists():
+                    try:
+                        path.unlink()
+                        self.discarded.append(path)
+                    except OSError:
+                        pass
+            del self._stages[name]
+        self._save()
+
+    def artifact_path(self, name: str) -> Path:
+        """Location for an intermediate artifact kept next to the checkpoint."""
+        return self.dir / name
+
+    def is_done(self, stage: str, stage_fingerprint: str) -> bool:
+        """True when ``stage`` completed with this fingerprint and its artifacts are intact."""
+        with self._lock:
+            record = self._stages.get(stage)
+            if not record or record.get("status") != "done" or record.get("fingerprint") != stage_fingerprint:
+                return False
+            artifacts: Dict[str, Dict[str, object]] = record.get("artifacts", {})  # type: ignore[assignment]
+            return all(self._verify(meta) for meta in artifacts.values())
+
+    @staticmethod
+    def _verify(meta: Dict[str, object]) -> bool:
+        path = Path(str(meta["path"]))
+        try:
+            st = path.stat()
+        except OSError:
+            return False
+        if st.st_size != meta["size"]:
+            return False
+        if st.st_mtime_ns == meta["mtime_ns"]:
+            return True
+        # Touched but maybe not changed (copied back, restored): fall back to the hash.
+        return file_digest(path) == meta["hash"]
+
+    def begin(self, stage: str, stage_fingerprint: str, planned: Iterable[Union[str, Path]]) -> None:
+        with self._lock:
+            self._stages[stage] = {
+                "status": "running",
+                "fingerprint": stage_fingerprint,
+                "planned": [str(Path(p).resolve()) for p in planned],
+            }
+            self._save()
+
+    def complete(
+        self,
+        stage: str,
+        stage_fingerprint: str,
+        artifacts: Dict[str, Union[str, Path]],
+        **extra: object,
+    ) -> None:
+        metas: Dict[str, Dict[str, object]] = {}
+        for name, artifact in artifacts.items():
+            path = Path(artifact).resolve()
+            st = path.stat()
+            metas[name] = {
+                "path": str(path),
+                "hash": file_digest(path),
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+            }
+        with self._lock:
+            self._stages[stage] = {
+                "status": "done",
+                "fingerprint": stage_fingerprint,
+                "artifacts": metas,
+                "extra": extra,
+            }
+            self._save()
+
+    def artifact_hash(self, stage: str, name: str) -> str:
+        record = self._stages.get(stage, {})
+        return str(record.get("artifacts", {}).get(name, {}).get("hash", ""))  # type: ignore[union-attr]
+
+    def artifact_paths(self, stage: str) -> List[Path]:
+        record = self._stages.get(stage, {})
+        return [Path(str(meta["path"])) for meta in record.get("artifacts", {}).values()]  # type: ignore[union-attr]
+
+    def extra(self, stage: str) -> Dict[str, object]:
+        return dict(self._stages.get(stage, {}).get("extra", {}))  # type: ignore[arg-type]
+
+    def save_segments(self, name: str, segments: List[dict]) -> Path:
+        path = self.artifact_path(name)
+        _write_json(path, segments)
+        return path
+
+    def load_segments(self, stage: str, name: str) -> List[dict]:
+        path = Path(str(self._stages[stage]["artifacts"][name]["path"]))  # type: ignore[index]
+        return json.loads(path.read_text(encoding="utf-8"))
+
+
+class CheckpointStore:
+    """Checkpoints for one job, kept under ``<output_dir>/.checkpoints/<stem>-<path hash>/``."""
+
+    def __init__(self, output_dir: Union[str, Path]) -> None:
+        self.root = Path(output_dir) / CHECKPOINT_DIRNAME
+
+    def open(self, source: Union[str, Path]) -> FileCheckpoint:
+        path = Path(source).resolve()
+        key = hashlib.blake2b(str(path).encode("utf-8"), digest_size=5).hexdigest()
+        return FileCheckpoint(self.root / f"{path.stem}-{key}", path)
@@ -0,0 +1,199 @@
+"""Silence-based audio chunking and parallel Whisper transcription of the chunks."""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from src.pipeline.audio import SAMPLE_RATE
+
+
+@dataclass(frozen=True)
+class AudioChunk:
+    """
+    Sample range ``[start, end)`` to decode, which includes ``overlap`` on both sides of
+    the range ``[own_start, own_end)`` the chunk is responsible for when stitching.
+    """
+
+    start: int
+    end: int
+    own_start: int
+    own_end: int
+
+
+def _frame_energy_db(audio: np.ndarray, frame: int) -> np.ndarray:
+    usable = len(audio) // frame * frame
+    frames = np.asarray(audio[:usable], dtype=np.float32).reshape(-1, frame)
+    rms = np.sqrt(np.mean(frames * frames, axis=1) + 1e-12)
+    return 20 * np.log10(rms)
+
+
+def find_chunks(
+    audio: np.ndarray,
+    target_seconds: float = 240.0,
+    search_seconds: float = 30.0,
+    min_silence: float = 0.3,
+    overlap: float = 1.0,
+    frame_ms: int = 30,
+) -> List[AudioChunk]:
+    """
+    Split 16 kHz mono PCM into roughly ``target_seconds`` chunks, cutting at the quietest
+    ``min_silence``-long stretch within ``search_seconds`` of each nominal boundary
+    (a plain energy VAD, which is enough for speech over background noise).
+    """
+    total = len(audio)
+    target = int(target_seconds * SAMPLE_RATE)
+    if total <= target * 1.5:
+        return [AudioChunk(0, total, 0, total)]
+
+    frame = SAMPLE_RATE * frame_ms // 1000
+    energy = _frame_energy_db(audio, frame)
+    width = max(1, int(min_silence * 1000 / frame_ms))
+    # Mean energy of the window starting at each frame; the cut goes in its middle.
+    smoothed = np.convolve(energy, np.ones(width) / width, mode="valid")
+    search = int(search_seconds * 1000 / frame_ms)
+
+    cuts = [0]
+    nominal = target
+    while nominal < total - target // 2:
+        centre = nominal // frame
+        lo = max(cuts[-1] // frame + 1, centre - search)
+        hi = min(len(smoothed), centre + search)
+        if hi > lo:
+            best = lo + int(np.argmin(smoothed[lo:hi]))
+            cut = (best + width // 2) * frame
+        else:
+            cut = nominal
+        cuts.append(cut)
+        nominal = cut + target
+    cuts.append(total)
+
+    pad = int(overlap * SAMPLE_RATE)
+    return [
+        AudioChunk(max(0, a - pad), min(total, b + pad), a, b)
+        for a, b in zip(cuts[:-1], cuts[1:])
+    ]
+
+
+_worker_model = None
+
+
+def _init_worker(model_size: str, device: str, threads: int) -> None:
+    import torch
+
+    from src.pipeline.models import load_whisper
+
+    global _worker_model
+    torch.set_num_threads(max(1, threads))
+    _worker_model = load_whisper(model_size, device)
+
+
+def _transcribe_chunk(
+    source: Union[np.ndarray, str],
+    start: int,
+    end: int,
+    language: Optional[str],
+    decode_options: Dict[str, object],
+) -> Tuple[Optional[str], List[dict]]:
+    """``source`` is either the chunk's samples or the path of the cached PCM file."""
+    assert _worker_model is not None
+    if isinstance(source, str):
+        pcm = np.memmap(source, dtype=np.float32, mode="r")
+        samples = np.array(pcm[start:end])
+    else:
+        samples = source
+    result = _worker_model.transcribe(samples, language=language, verbose=None, **decode_options)
+    segments = [
+        {"start": float(seg["start"]), "end": float(seg["end"]), "text": str(seg["text"]).strip()}
+        for seg in result.get("segments", [])
+    ]
+    return result.get("language", language), segments
+
+
+def owned_segments(chunk: AudioChunk, segments: List[dict], is_last: bool = False) -> List[dict]:
+    """
+    Shift chunk-relative timestamps to absolute time and keep only segments whose
+    midpoint falls in the chunk's owned range (the overlap belongs to the neighbour).
+    """
+    offset = chunk.start / SAMPLE_RATE
+    own_start = chunk.own_start / SAMPLE_RATE
+    own_end = chunk.own_end / SAMPLE_RATE
+    kept: List[dict] = []
+    for seg in segments:
+        start = seg["start"] + offset
+        end = seg["end"] + offset
+        mid = (start + end) / 2
+        if own_start <= mid < own_end or (is_last and mid >= own_end):
+            kept.append({"start": round(start, 3), "end": round(end, 3), "text": seg["text"]})
+    return kept
+
+
+def stitch_segments(chunks: List[AudioChunk], results: List[List[dict]]) -> List[dict]:
+    """Merge per-chunk results into one absolute, non-overlapping segment list."""
+    stitched: List[dict] = []
+    for i, (chunk, segments) in enumerate(zip(chunks, results)):
+        stitched.extend(owned_segments(chunk, segments, is_last=i == len(chunks) - 1))
+    stitched.sort(key=lambda seg: seg["start"])
+    for prev, cur in zip(stitched, stitched[1:]):
+        if cur["start"] < prev["end"]:
+            prev["end"] = cur["start"]
+    return stitched
+
+
+def transcribe_parallel(
+    audio: np.ndarray,
+    model_size: str,
+    language: Optional[str],
+    device: str,
+    workers: int,
+    decode_options: Optional[Dict[str, object]] = None,
+    chunks: Optional[List[AudioChunk]] = None,
+) -> Dict[str, object]:
+    """
+    Transcribe ``audio`` chunk by chunk in ``workers`` processes, each pinned to an even
+    share of the CPU threads, and stitch the result into one transcription.
+    """
+    chunks = chunks or find_chunks(audio)
+    workers = max(1, min(workers, len(chunks)))
+    threads = max(1, (os.cpu_count() or workers) // workers)
+    # Workers re-open a memmapped PCM file by path rather than receiving pickled samples.
+    pcm_path = None
+    if isinstance(audio, np.memmap) and audio.filename:
+        if os.path.getsize(audio.filename) == audio.nbytes:  # whole file, not a view into it
+            pcm_path = audio.filename
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(model_size, device, threads),
+    ) as pool:
+        futures = [
+            pool.submit(
+                _transcribe_chunk,
+                pcm_path or np.ascontiguousarray(audio[c.start : c.end], dtype=np.float32),
+                c.start,
+                c.end,
+                language,
+                dict(decode_options or {}),
+            )
+            for c in chunks
+        ]
+        outputs = [f.result() for f in futures]
+
+    # Duration-weighted vote when the language was auto-detected per chunk.
+    votes: Counter = Counter()
+    for chunk, (lang, _) in zip(chunks, outputs):
+        if lang:
+            votes[lang] += chunk.own_end - chunk.own_start
+    detected = language or (votes.most_common(1)[0][0] if votes else None)
+    return {
+        "language": detected,
+        "segments": stitch_segments(chunks, [segs for _, segs in outputs]),
+    }
@@ -0,0 +1,268 @@
+"""
+Optional long-lived model daemon on a Unix socket.
+
+    python -m src.pipeline.daemon [--socket PATH] [--budget-mb 8192]
+
+Models stay resident in the daemon's ``ModelRegistry`` across GUI sessions and CLI
+runs; workers send audio (or the path of a cached PCM file) and text instead of
+loading weights themselves.
+
+Wire format, both directions: 4-byte big-endian header length, a UTF-8 JSON header,
+then ``header["payload_bytes"]`` bytes of raw float32 samples when present.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.config import DAEMON_SOCKET
+
+_HEADER = struct.Struct(">I")
+
+
+class DaemonError(RuntimeError):
+    """The daemon reported a failure for a request."""
+
+
+class DaemonRunningError(RuntimeError):
+    """Another daemon is already listening on the socket."""
+
+
+def _clear_stale_socket(socket_path: str) -> None:
+    """Remove a socket file left behind by a daemon that died; refuse if one still answers."""
+    if not os.path.exists(socket_path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except ConnectionRefusedError:
+            os.unlink(socket_path)
+            return
+    raise DaemonRunningError(f"model daemon already running on {socket_path}")
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks: List[bytes] = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(min(remaining, 1 << 20))
+        if not chunk:
+            raise ConnectionError("model daemon closed the connection")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def _send_frame(sock: socket.socket, header: Dict[str, Any], payload: bytes = b"") -> None:
+    header = dict(header, payload_bytes=len(payload))
+    raw = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(raw)) + raw)
+    if payload:
+        sock.sendall(payload)
+
+
+def _recv_frame(sock: socket.socket) -> Tuple[Dict[str, Any], bytes]:
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    header = json.loads(_recv_exact(sock, size).decode("utf-8"))
+    payload = _recv_exact(sock, header.get("payload_bytes", 0)) if header.get("payload_bytes") else b""
+    return header, payload
+
+
+class DaemonClient:
+    """Talks to a running daemon; one short-lived connection per request."""
+
+    def __init__(self, socket_path: str = DAEMON_SOCKET, timeout: Optional[float] = None) -> None:
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def _call(self, header: Dict[str, Any], payload: bytes = b"") -> Dict[str, Any]:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            _send_frame(sock, header, payload)
+            reply, _ = _recv_frame(sock)
+        if not reply.get("ok"):
+            raise DaemonError(reply.get("error", "unknown daemon error"))
+        return reply
+
+    def available(self) -> bool:
+        if not hasattr(socket, "AF_UNIX") or not os.path.exists(self.socket_path):
+            return False
+        try:
+            self._call({"op": "ping"})
+        except (OSError, DaemonError):
+            return False
+        return True
+
+    def transcribe(
+        self,
+        audio: np.ndarray,
+        model_size: str,
+        language: Optional[str] = None,
+        decode_options: Optional[Dict[str, object]] = None,
+    ) -> Dict[str, object]:
+        header: Dict[str, Any] = {
+            "op": "transcribe",
+            "model_size": model_size,
+            "language": language,
+            "decode_options": decode_options or {},
+        }
+        payload = b""
+        filename = getattr(audio, "filename", None)
+        if isinstance(audio, np.memmap) and filename and os.path.getsize(filename) == audio.nbytes:
+            header["pcm_path"] = filename  # same host: let the daemon map the cached PCM itself
+        else:
+            payload = np.ascontiguousarray(audio, dtype=np.float32).tobytes()
+        reply = self._call(header, payload)
+        return {"language": reply["language"], "segments": reply["segments"]}
+
+    def translate_texts(
+        self,
+        texts: List[str],
+        source_lang: str,
+        target_lang: str,
+        model_name: str,
+        precision: str = "fp32",
+        token_budget: Optional[int] = None,
+    ) -> List[str]:
+        reply = self._call(
+            {
+                "op": "translate",
+                "texts": list(texts),
+                "source_lang": source_lang,
+                "target_lang": target_lang,
+                "model_name": model_name,
+                "precision": precision,
+                "token_budget": token_budget,
+            }
+        )
+        return reply["texts"]
+
+    def status(self) -> List[Dict[str, object]]:
+        return self._call({"op": "status"})["models"]
+
+    def unload(self) -> int:
+        return self._call({"op": "unload"})["unloaded"]
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    server: "ModelDaemon"
+
+    def handle(self) -> None:
+        try:
+            header, payload = _recv_frame(self.request)
+            reply = self.server.dispatch(header, payload)
+            reply["ok"] = True
+        except Exception as exc:  # reported to the client, daemon keeps serving
+            reply = {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+        _send_frame(self.request, reply)
+
+
+class ModelDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str = DAEMON_SOCKET) -> None:
+        _clear_stale_socket(socket_path)
+        os.makedirs(os.path.dirname(os.path.abspath(socket_path)), exist_ok=True)
+        super().__init__(socket_path, _Handler)
+        self.socket_path = socket_path
+        # One inference at a time per model family; loads are already de-duplicated.
+        self._asr_lock = threading.Lock()
+        self._mt_lock = threading.Lock()
+
+    def dispatch(self, header: Dict[str, Any], payload: bytes) -> Dict[str, Any]:
+        from src.pipeline.models import registry
+
+        op = header.get("op")
+        if op == "ping":
+            return {}
+        if op == "status":
+            return {
+                "models": [
+                    {"kind": k[0], "name": k[1], "device": k[2], "precision": k[3], "bytes": n}
+                    for k, n in registry.loaded()
+                ]
+            }
+        if op == "unload":
+            return {"unloaded": registry.unload()}
+        if op == "transcribe":
+            return self._transcribe(header, payload)
+        if op == "translate":
+            return self._translate(header)
+        raise ValueError(f"unknown op: {op}")
+
+    def _transcribe(self, header: Dict[str, Any], payload: bytes) -> Dict[str, Any]:
+        from src.pipeline.transcriber import transcribe_video
+
+        if header.get("pcm_path"):
+            audio = np.memmap(header["pcm_path"], dtype=np.float32, mode="r")
+        else:
+            audio = np.frombuffer(payload, dtype=np.float32)
+        with self._asr_lock:
+            result = transcribe_video(
+                audio,
+                model_size=header["model_size"],
+                language=header.get("language"),
+                decode_options=header.get("decode_options"),
+            )
+        return {"language": result["language"], "segments": result["segments"]}
+
+    def _translate(self, header: Dict[str, Any]) -> Dict[str, Any]:
+        from src.pipeline.translator import Translator
+
+        translator = Translator(model_name=header["model_name"], precision=header.get("precision", "fp32"))
+        with self._mt_lock:
+            texts = translator.translate_texts(
+                header["texts"],
+                header["source_lang"],
+                header["target_lang"],
+                token_budget=header.get("token_budget"),
+            )
+        return {"texts": texts}
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=DAEMON_SOCKET)
+    parser.add_argument("--budget-mb", type=int, default=0, help="override MODEL_MEMORY_BUDGET_MB")
+    parser.add_argument("--preload-whisper", default="", help="Whisper model size to load at startup")
+    args = parser.parse_args()
+
+    try:
+        server = ModelDaemon(args.socket)
+    except DaemonRunningError as exc:
+        parser.exit(1, f"{exc}\n")
+
+    from src.pipeline.models import load_whisper, registry
+
+    try:
+        if args.budget_mb:
+            registry.memory_budget = args.budget_mb * 1024 * 1024
+        if args.preload_whisper:
+            import torch
+
+            load_whisper(args.preload_whisper, "cuda" if torch.cuda.is_available() else "cpu")
+
+        print(f"model daemon listening on {args.socket}", flush=True)
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
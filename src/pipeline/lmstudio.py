@@ -3,11 +3,60 @@
 from __future__ import annotations
 
 import json
-from typing import Callable, List, Optional
+import queue
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from src.config import (
+    LMSTUDIO_CONCURRENCY,
+    LMSTUDIO_MAX_RETRIES,
+    LMSTUDIO_TIMEOUT,
+    LMSTUDIO_TOKEN_BUDGET,
+)
+from src.pipeline.memory import SegmentCallback, TranslationMemory
+from src.pipeline.segments import Segments, SegmentTable
+from src.pipeline.streaming import micro_batches
 
 ProgressFn = Optional[Callable[[str], None]]
+LineCallback = Optional[Callable[[str], None]]
+
+# "12|text", tolerating spaces and the full-width pipe some models emit for CJK output.
+_INDEXED_LINE = re.compile(r"^\s*(\d+)\s*[|｜]\s*(.*)$")
+
+_encoding_lock = threading.Lock()
+_encoding: Any = None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Approximate prompt/completion token count.
+
+    Uses tiktoken's cl100k_base when its BPE file is available; offline it falls back to
+    a UTF-8 byte heuristic (about one token per CJK character or per 3 Latin characters).
+    """
+    global _encoding
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                import tiktoken
+
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception:  # pragma: no cover - depends on network/cache
+                _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return len(text.encode("utf-8")) // 3 + 1
+
+
+class _RetryableStatus(requests.HTTPError):
+    """5xx / 429 responses that are worth another attempt."""
 
 
 class LmStudioTranslator:
@@ -17,45 +66,295 @@ class LmStudioTranslator:
         model: str,
         progress_cb: ProgressFn = None,
         temperature: float = 0.2,
-        batch_size: int = 12,
+        batch_size: int = 40,
+        token_budget: int = LMSTUDIO_TOKEN_BUDGET,
+        completion_ratio: float = 1.5,
+        repair_rounds: int = 2,
+        memory: Optional[TranslationMemory] = None,
+        concurrency: int = LMSTUDIO_CONCURRENCY,
+        max_retries: int = LMSTUDIO_MAX_RETRIES,
+        timeout: float = LMSTUDIO_TIMEOUT,
+        backoff: float = 1.0,
+        stream: bool = True,
     ) -> None:
         self.endpoint = endpoint
         self.model = model
         self.progress_cb = progress_cb
         self.temperature = temperature
         self.batch_size = batch_size
+        self.token_budget = token_budget
+        self.completion_ratio = completion_ratio
+        self.repair_rounds = repair_rounds
+        self.memory = memory
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self.stream = stream
+        # One keep-alive pool sized for the in-flight batches instead of a new connection per post.
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        # Completion tokens received so far (tiktoken count of the returned text).
+        self.completion_tokens = 0
+        self._stats_lock = threading.Lock()
 
     def _log(self, text: str) -> None:
         if self.progress_cb:
             self.progress_cb(text)
 
+    def close(self) -> None:
+        self._session.close()
+
     def translate_segments(
+        self,
+        segments: Segments,
+        source_lang: str,
+        target_lang: str,
+        domain: str = "",
+        on_segment: SegmentCallback = None,
+    ) -> Segments:
+        """
+        Translate ``segments`` and return them in order (a ``SegmentTable`` stays a table).
+
+        ``on_segment(position, translated)`` fires as soon as each line is known; with a
+        streaming server that is while the completion is still being generated.
+        """
+        if self.memory is None:
+            out = self._translate_segments(segments, source_lang, target_lang, domain, on_segment)
+            if isinstance(segments, SegmentTable):
+                return segments.with_texts(seg["text"] for seg in out)
+            return out
+        return self.memory.translate_segments(
+            segments,
+            lambda misses, relay: self._translate_segments(misses, source_lang, target_lang, domain, relay),
+            source_lang=source_lang,
+            target_lang=target_lang,
+            backend=f"lmstudio:{self.model}",
+            domain=domain,
+            progress_cb=self.progress_cb,
+            on_segment=on_segment,
+        )
+
+    def translate_stream(
+        self,
+        segments: Iterable[dict],
+        source_lang: str,
+        target_lang: str,
+        domain: str = "",
+        micro_batch: int = 24,
+    ) -> Iterator[dict]:
+        """Translate a segment stream (e.g. ``TranscriptStream``) in micro-batches, in order."""
+        for batch in micro_batches(segments, micro_batch):
+            yield from self.translate_segments(batch, source_lang, target_lang, domain)
+
+    def iter_translate_segments(
         self,
         segments: List[dict],
         source_lang: str,
         target_lang: str,
         domain: str = "",
+    ) -> Iterator[Tuple[int, dict]]:
+        """Yield ``(position, translated_segment)`` in completion order as lines arrive."""
+        events: "queue.Queue[object]" = queue.Queue()
+        done = object()
+        failure: List[BaseException] = []
+
+        def produce() -> None:
+            try:
+                self.translate_segments(
+                    segments,
+                    source_lang,
+                    target_lang,
+                    domain,
+                    on_segment=lambda i, seg: events.put((i, seg)),
+                )
+            except BaseException as exc:  # re-raised in the consumer
+                failure.append(exc)
+            finally:
+                events.put(done)
+
+        threading.Thread(target=produce, name="lmstudio-iter", daemon=True).start()
+        while True:
+            item = events.get()
+            if item is done:
+                break
+            yield item  # type: ignore[misc]
+        if failure:
+            raise failure[0]
+
+    def _translate_segments(
+        self,
+        segments: List[dict],
+        source_lang: str,
+        target_lang: str,
+        domain: str,
+        on_segment: SegmentCallback = None,
     ) -> List[dict]:
+        batches = self._make_batches(segments, source_lang, target_lang, domain)
+        offsets: List[int] = []
+        offset = 0
+        for batch in batches:
+            offsets.append(offset)
+            offset += len(batch)
+
+        def run(numbered: Tuple[int, List[dict]]) -> List[dict]:
+            start, batch = numbered
+            emit: SegmentCallback = None
+            if on_segment is not None:
+                emit = lambda i, seg: on_segment(start + i, seg)  # noqa: E731
+            return self._translate_batch(batch, source_lang, target_lang, domain, emit)
+
+        jobs = list(zip(offsets, batches))
+        if self.concurrency == 1 or len(batches) <= 1:
+            results = [run(job) for job in jobs]
+        else:
+            # map() yields in submission order, so segments reassemble in place.
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="lmstudio") as pool:
+                results = list(pool.map(run, jobs))
+
         out: List[dict] = []
-        for i in range(0, len(segments), self.batch_size):
-            batch = segments[i : i + self.batch_size]
-            translated = self._translate_batch(batch, source_lang, target_lang, domain)
+        for translated in results:
             out.extend(translated)
         return out
 
+    def _complete(self, payload: Dict[str, Any], on_line: LineCallback = None) -> str:
+        """
+        Run one chat completion and return its text, retrying only this request on
+        5xx/429, timeouts and dropped connections.
+
+        With ``self.stream`` the request asks for server-sent events and ``on_line`` gets
+        each completed output line as it arrives; servers that answer with a plain JSON
+        body are handled the same way as the non-streaming path.
+        """
+        payload = dict(payload, stream=self.stream)
+        attempt = 0
+        while True:
+            try:
+                with self._session.post(
+                    self.endpoint,
+                    json=payload,
+                    timeout=(10, self.timeout),
+                    stream=self.stream,
+                ) as resp:
+                    if resp.status_code >= 500 or resp.status_code == 429:
+                        raise _RetryableStatus(f"HTTP {resp.status_code}", response=resp)
+                    resp.raise_for_status()
+                    if self.stream and resp.headers.get("Content-Type", "").startswith("text/event-stream"):
+                        content = _read_event_stream(resp, on_line)
+                    else:
+                        content = resp.json()["choices"][0]["message"]["content"]
+                with self._stats_lock:
+                    self.completion_tokens += count_tokens(content)
+                return content
+            except (
+                requests.Timeout,
+                requests.ConnectionError,
+                requests.exceptions.ChunkedEncodingError,
+                _RetryableStatus,
+            ) as exc:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff * (2**attempt) + random.uniform(0, self.backoff)
+                attempt += 1
+                self._log(f"LM Studio 请求失败（{exc}），{delay:.1f}s 后第 {attempt} 次重试...")
+                time.sleep(delay)
+
+    @staticmethod
+    def _instructions(source_lang: str, target_lang: str, domain: str) -> str:
+        return (
+            f"You are a professional translator for {domain or 'general'} domain content. "
+            f"Translate from {source_lang} to {target_lang}. "
+            "Keep meaning precise and concise; no explanations; output only translated lines."
+        )
+
+    def _make_batches(
+        self,
+        segments: List[dict],
+        source_lang: str,
+        target_lang: str,
+        domain: str,
+    ) -> List[List[dict]]:
+        """
+        Pack consecutive segments while prompt + expected completion stays within
+        ``token_budget``; ``batch_size`` remains a hard cap on lines per request.
+        """
+        overhead = count_tokens(self._instructions(source_lang, target_lang, domain)) + 64
+        batches: List[List[dict]] = []
+        current: List[dict] = []
+        used = overhead
+        for seg in segments:
+            source = count_tokens(seg["text"]) + 3  # index, pipe, newline
+            cost = source + int(source * self.completion_ratio)
+            if current and (used + cost > self.token_budget or len(current) >= self.batch_size):
+                batches.append(current)
+                current, used = [], overhead
+            current.append(seg)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+
     def _translate_batch(
         self,
         batch: List[dict],
         source_lang: str,
         target_lang: str,
         domain: str,
+        on_segment: SegmentCallback = None,
     ) -> List[dict]:
-        instructions = (
-            f"You are a professional translator for {domain or 'general'} domain content. "
-            f"Translate from {source_lang} to {target_lang}. "
-            "Keep meaning precise and concise; no explanations; output only translated lines."
-        )
-        numbered = [f"{idx+1}|{seg['text']}" for idx, seg in enumerate(batch)]
+        self._log(f"LM Studio 翻译 {len(batch)} 条...")
+        texts = [seg["text"] for seg in batch]
+
+        def emit(i: int, text: str) -> None:
+            if on_segment is not None:
+                seg = batch[i]
+                on_segment(i, {"start": seg["start"], "end": seg["end"], "text": text.strip()})
+
+        found = self._request_lines(texts, source_lang, target_lang, domain, emit)
+
+        # Re-ask only for lines the model dropped, merged or mangled.
+        missing = [i for i in range(len(batch)) if not found.get(i)]
+        for _ in range(self.repair_rounds):
+            if not missing:
+                break
+            self._log(f"LM Studio 返回缺少 {len(missing)} 行，补译中...")
+            repaired = self._request_lines(
+                [texts[i] for i in missing],
+                source_lang,
+                target_lang,
+                domain,
+                lambda pos, text, _missing=missing: emit(_missing[pos], text),
+            )
+            for pos, i in enumerate(missing):
+                if repaired.get(pos):
+                    found[i] = repaired[pos]
+            missing = [i for i in missing if not found.get(i)]
+        if missing:
+            self._log(f"警告：{len(missing)} 行未取得译文，已留空")
+            for i in missing:
+                emit(i, "")
+
+        return [
+            {"start": seg["start"], "end": seg["end"], "text": found.get(i, "").strip()}
+            for i, seg in enumerate(batch)
+        ]
+
+    def _request_lines(
+        self,
+        texts: Sequence[str],
+        source_lang: str,
+        target_lang: str,
+        domain: str,
+        on_found: Optional[Callable[[int, str], None]] = None,
+    ) -> Dict[int, str]:
+        """
+        Send one numbered request; return translations keyed by 0-based line position.
+
+        ``on_found`` is called once per position, as early as the response allows.
+        """
+        numbered = [f"{idx+1}|{text}" for idx, text in enumerate(texts)]
         user_prompt = (
             "Translate each line after the pipe and return the translations in the same order, "
             "one per line as 'index|translated'.\n"
@@ -65,31 +364,71 @@ class LmStudioTranslator:
             "model": self.model,
             "temperature": self.temperature,
             "messages": [
-                {"role": "system", "content": instructions},
+                {"role": "system", "content": self._instructions(source_lang, target_lang, domain)},
                 {"role": "user", "content": user_prompt},
             ],
         }
-        self._log(f"LM Studio 翻译 {len(batch)} 条...")
-        resp = requests.post(self.endpoint, json=payload, timeout=300)
-        resp.raise_for_status()
-        data = resp.json()
-        content = data["choices"][0]["message"]["content"]
-        lines = [line.strip() for line in content.splitlines() if line.strip()]
-
-        translated: List[str] = []
-        for line in lines:
-            if "|" in line:
-                translated.append(line.split("|", 1)[1].strip())
-            else:
-                translated.append(line.strip())
-
-        # Fallback if the model returned fewer lines
-        while len(translated) < len(batch):
-            translated.append("")
-
-        merged: List[dict] = []
-        for seg, new_text in zip(batch, translated):
-            merged.append(
-                {"start": seg["start"], "end": seg["end"], "text": new_text.strip()}
-            )
-        return merged
+        reported: Dict[int, str] = {}
+
+        def report(idx: int, text: str) -> None:
+            if on_found is not None and idx not in reported:
+                reported[idx] = text
+                on_found(idx, text)
+
+        def on_line(line: str) -> None:
+            for idx, text in _parse_indexed(line, len(texts), positional=False).items():
+                report(idx, text)
+
+        content = self._complete(payload, on_line)
+        found = _parse_indexed(content, len(texts))
+        for idx, text in sorted(found.items()):
+            report(idx, text)
+        return found
+
+
+def _read_event_stream(resp: requests.Response, on_line: LineCallback) -> str:
+    """Accumulate SSE ``delta.content`` chunks, handing each finished line to ``on_line``."""
+    parts: List[str] = []
+    pending = ""
+    # SSE is UTF-8 by spec; servers often omit the charset and requests would assume Latin-1.
+    for raw_bytes in resp.iter_lines():
+        raw = raw_bytes.decode("utf-8", errors="replace")
+        if not raw.startswith("data:"):
+            continue
+        data = raw[len("data:") :].strip()
+        if data == "[DONE]":
+            break
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            continue
+        choices = chunk.get("choices") or [{}]
+        delta = (choices[0].get("delta") or {}).get("content") or ""
+        if not delta:
+            continue
+        parts.append(delta)
+        pending += delta
+        while "\n" in pending:
+            line, pending = pending.split("\n", 1)
+            if on_line and line.strip():
+                on_line(line)
+    if on_line and pending.strip():
+        on_line(pending)
+    return "".join(parts)
+
+
+def _parse_indexed(content: str, expected: int, positional: bool = True) -> Dict[int, str]:
+    lines = [line.strip() for line in content.splitlines() if line.strip()]
+    found: Dict[int, str] = {}
+    for line in lines:
+        match = _INDEXED_LINE.match(line)
+        if not match:
+            continue
+        idx = int(match.group(1)) - 1
+        text = match.group(2).strip()
+        if 0 <= idx < expected and text and idx not in found:
+            found[idx] = text
+    # Models that drop the numbering but keep one line per input are still usable.
+    if positional and not found and len(lines) == expected:
+        found = {i: line for i, line in enumerate(lines)}
+    return found
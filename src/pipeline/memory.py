@@ -0,0 +1,235 @@
+"""Segment-level translation memory backed by a local SQLite file."""
+
+from __future__ import annotations
+
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.config import TRANSLATION_MEMORY_MAX_ENTRIES, TRANSLATION_MEMORY_PATH
+
+if TYPE_CHECKING:
+    from src.pipeline.segments import Segments
+
+ProgressFn = Optional[Callable[[str], None]]
+SegmentCallback = Optional[Callable[[int, dict], None]]
+SegmentTranslateFn = Callable[[List[dict], SegmentCallback], List[dict]]
+
+_WS = re.compile(r"\s+")
+# Pruning goes down to this share of ``max_entries``, so the next one is many stores away.
+_PRUNE_TO = 0.9
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tm (
+    source TEXT NOT NULL,
+    source_lang TEXT NOT NULL,
+    target_lang TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    target TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (source, source_lang, target_lang, backend, domain)
+);
+CREATE INDEX IF NOT EXISTS tm_last_used ON tm (last_used);
+"""
+
+
+def normalize_text(text: str) -> str:
+    """Fold width/compatibility forms and whitespace so trivially different lines share an entry."""
+    return _WS.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+class TranslationMemory:
+    """
+    Persistent source -> translation lookup keyed by normalized text, language pair,
+    backend/model and domain.
+
+    Each thread gets its own connection; the database runs in WAL mode so readers never
+    block each other or the writer. When the table grows past ``max_entries`` the least
+    recently used rows are pruned. Rows are counted once on open and then estimated from
+    what ``store`` writes (replacements count as new), so the hot path never scans the
+    table; the real count is taken only when the estimate passes the limit.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: int = TRANSLATION_MEMORY_MAX_ENTRIES,
+    ) -> None:
+        self.path = path or TRANSLATION_MEMORY_PATH
+        self.max_entries = max_entries
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+        self._count_lock = threading.Lock()
+        self._approx_rows = 0
+        self.prune()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def lookup(
+        self,
+        sources: Iterable[str],
+        source_lang: str,
+        target_lang: str,
+        backend: str,
+        domain: str = "",
+    ) -> Dict[str, str]:
+        """Return stored translations for the given normalized sources and bump their LRU stamp."""
+        keys = list(dict.fromkeys(sources))
+        if not keys:
+            return {}
+        conn = self._conn()
+        found: Dict[str, str] = {}
+        # Stay well under SQLite's bound-parameter limit.
+        for i in range(0, len(keys), 500):
+            chunk = keys[i : i + 500]
+            marks = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT source, target FROM tm WHERE source_lang=? AND target_lang=? "
+                f"AND backend=? AND domain=? AND source IN ({marks})",
+                (source_lang, target_lang, backend, domain, *chunk),
+            ).fetchall()
+            found.update(rows)
+        if found:
+            now = time.time()
+            with conn:
+                conn.executemany(
+                    "UPDATE tm SET hits=hits+1, last_used=? WHERE source=? AND source_lang=? "
+                    "AND target_lang=? AND backend=? AND domain=?",
+                    [(now, src, source_lang, target_lang, backend, domain) for src in found],
+                )
+        return found
+
+    def store(
+        self,
+        pairs: Iterable[Tuple[str, str]],
+        source_lang: str,
+        target_lang: str,
+        backend: str,
+        domain: str = "",
+    ) -> None:
+        now = time.time()
+        rows = [
+            (src, source_lang, target_lang, backend, domain, tgt, now)
+            for src, tgt in pairs
+            if src and tgt
+        ]
+        if not rows:
+            return
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO tm (source, source_lang, target_lang, backend, domain, "
+                "target, last_used) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        with self._count_lock:
+            self._approx_rows += len(rows)
+            over = self._approx_rows > self.max_entries
+        if over:
+            self.prune()
+
+    def prune(self) -> int:
+        """
+        When the table holds more than ``max_entries`` rows, drop the least recently used
+        down to 90% of it; returns the number removed.
+        """
+        conn = self._conn()
+        (count,) = conn.execute("SELECT COUNT(*) FROM tm").fetchone()
+        excess = count - int(self.max_entries * _PRUNE_TO) if count > self.max_entries else 0
+        if excess > 0:
+            with conn:
+                conn.execute(
+                    "DELETE FROM tm WHERE rowid IN (SELECT rowid FROM tm ORDER BY last_used LIMIT ?)",
+                    (excess,),
+                )
+        with self._count_lock:
+            self._approx_rows = count - excess
+        return excess
+
+    def translate_segments(
+        self,
+        segments: "Segments",
+        translate_fn: SegmentTranslateFn,
+        source_lang: str,
+        target_lang: str,
+        backend: str,
+        domain: str = "",
+        progress_cb: ProgressFn = None,
+        on_segment: SegmentCallback = None,
+        known: Optional[Dict[str, str]] = None,
+    ) -> "Segments":
+        """
+        Serve segments from memory and send only the misses (deduplicated) to ``translate_fn``.
+
+        ``translate_fn`` receives and returns segment dicts in the same order, plus a
+        callback it may invoke early with ``(position, translated_segment)``. When
+        ``on_segment`` is given it sees every input position as soon as its text is known:
+        hits right away, misses as the backend reports them. A ``SegmentTable`` comes back
+        as a table sharing the input's timings. ``known`` passes in the result of an
+        earlier ``lookup`` for these segments, which is then not repeated.
+        """
+        from src.pipeline.segments import SegmentTable, segment_texts
+
+        keys = [normalize_text(text) for text in segment_texts(segments)]
+        if known is None:
+            known = self.lookup((k for k in keys if k), source_lang, target_lang, backend, domain)
+        else:
+            known = dict(known)
+
+        pending: Dict[str, dict] = {}
+        for i, key in enumerate(keys):
+            if key and key not in known and key not in pending:
+                seg = segments[i]
+                pending[key] = {"start": seg["start"], "end": seg["end"], "text": seg["text"]}
+
+        hits = sum(1 for k in keys if k in known)
+        if progress_cb:
+            progress_cb(f"翻译记忆：命中 {hits} 条，需翻译 {len(pending)} 条")
+
+        def emit(i: int, text: str) -> None:
+            seg = segments[i]
+            on_segment(i, {"start": seg["start"], "end": seg["end"], "text": text.strip()})  # type: ignore[misc]
+
+        relay: SegmentCallback = None
+        if on_segment is not None:
+            for i, key in enumerate(keys):
+                if key in known or not key:
+                    emit(i, known.get(key, ""))
+            owners: Dict[str, List[int]] = {}
+            for i, key in enumerate(keys):
+                if key in pending:
+                    owners.setdefault(key, []).append(i)
+            pending_keys = list(pending)
+
+            def _relay(pos: int, out: dict) -> None:
+                for i in owners[pending_keys[pos]]:
+                    emit(i, out["text"])
+
+            relay = _relay
+
+        if pending:
+            fresh = translate_fn(list(pending.values()), relay)
+            learned = {key: out["text"] for key, out in zip(pending, fresh)}
+            self.store(learned.items(), source_lang, target_lang, backend, domain)
+            known.update(learned)
+
+        if isinstance(segments, SegmentTable):
+            return segments.with_texts(known.get(key, "") for key in keys)
+        return [
+            {"start": seg["start"], "end": seg["end"], "text": known.get(key, "").strip()}
+            for key, seg in zip(keys, segments)
+        ]
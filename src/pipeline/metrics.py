@@ -0,0 +1,237 @@
+"""Per-stage timing events, derived throughput metrics and the end-of-batch run report."""
+
+from __future__ import annotations
+
+import csv
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+# Stage names in pipeline order, with the label used in the summary table.
+STAGES: Dict[str, str] = {
+    "model_load": "模型加载",
+    "audio_decode": "音频解码",
+    "asr": "语音识别",
+    "translate": "翻译",
+    "srt_write": "字幕写入",
+    "encode": "视频编码",
+}
+
+
+def _maxrss_mb(who: int) -> float:
+    import resource
+
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(who).ru_maxrss * scale / (1024 * 1024)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process alone, in MB."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+
+            info = psutil.Process().memory_info()
+            return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+        except ImportError:
+            return 0.0
+    return _maxrss_mb(resource.RUSAGE_SELF)
+
+
+def peak_child_rss_mb() -> float:
+    """
+    Peak resident set size of the largest single reaped child (FFmpeg), in MB. Not a sum:
+    the kernel keeps one maximum over all children. 0 where unavailable (Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    return _maxrss_mb(resource.RUSAGE_CHILDREN)
+
+
+@dataclass
+class StageEvent:
+    """One timed stage for one file; counters are filled in by the stage as it runs."""
+
+    stage: str
+    file: str = ""
+    started: float = 0.0
+    seconds: float = 0.0
+    audio_seconds: float = 0.0
+    segments: int = 0
+    tokens: int = 0
+    frames: float = 0.0
+    detail: str = ""
+    ok: bool = True
+    # Number of events summed into this one (``RunMetrics.totals``).
+    count: int = 1
+    metrics: Dict[str, float] = field(default_factory=dict)
+
+    def derive(self) -> None:
+        """Fill ``metrics`` from the counters (real-time factor, segments/s, tokens/s, fps)."""
+        if self.seconds <= 0:
+            return
+        if self.stage == "asr" and self.audio_seconds:
+            self.metrics["rtf"] = self.seconds / self.audio_seconds
+        if self.stage == "audio_decode" and self.audio_seconds:
+            self.metrics["speed"] = self.audio_seconds / self.seconds
+        if self.stage == "translate" and self.segments:
+            self.metrics["segments_per_s"] = self.segments / self.seconds
+        if self.stage == "translate" and self.tokens:
+            self.metrics["tokens_per_s"] = self.tokens / self.seconds
+        if self.stage == "encode" and self.frames:
+            self.metrics["fps"] = self.frames / self.seconds
+
+
+class RunMetrics:
+    """
+    Thread-safe collector for one batch. ``stage()`` times a block and hands the event to
+    the block so it can record counters; every finished event also goes to ``on_event``.
+    """
+
+    def __init__(self, on_event: Optional[Callable[[StageEvent], None]] = None) -> None:
+        self.events: List[StageEvent] = []
+        self.started = time.time()
+        self.finished = 0.0
+        self._on_event = on_event
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, stage: str, file: str = "", **counters: object) -> Iterator[StageEvent]:
+        event = StageEvent(stage=stage, file=file, started=time.time(), **counters)  # type: ignore[arg-type]
+        clock = time.perf_counter()
+        try:
+            yield event
+        except BaseException:
+            event.ok = False
+            raise
+        finally:
+            event.seconds = time.perf_counter() - clock
+            self.record(event)
+
+    def record(self, event: StageEvent) -> None:
+        event.derive()
+        with self._lock:
+            self.events.append(event)
+        if self._on_event:
+            self._on_event(event)
+
+    def model_loaded(self, key: tuple, seconds: float) -> None:
+        """``ModelRegistry`` load listener."""
+        self.record(StageEvent(stage="model_load", started=time.time() - seconds, seconds=seconds, detail="/".join(key)))
+
+    def totals(self) -> Dict[str, StageEvent]:
+        """Per-stage sums over successful events, with metrics derived from the sums."""
+        out: Dict[str, StageEvent] = {}
+        with self._lock:
+            events = list(self.events)
+        for event in events:
+            if not event.ok:
+                continue
+            total = out.setdefault(event.stage, StageEvent(stage=event.stage, count=0))
+            total.seconds += event.seconds
+            total.audio_seconds += event.audio_seconds
+            total.segments += event.segments
+            total.tokens += event.tokens
+            total.frames += event.frames
+            total.count += 1
+        for total in out.values():
+            total.derive()
+        return out
+
+    def summary_lines(self) -> List[str]:
+        """Fixed-width summary table for the log view."""
+        totals = self.totals()
+        wall = (self.finished or time.time()) - self.started
+        lines = ["性能汇总：", _row("阶段", "次数", "耗时(s)", "占比", "指标")]
+        for stage, label in STAGES.items():
+            total = totals.get(stage)
+            if total is None:
+                continue
+            share = total.seconds / wall * 100 if wall > 0 else 0.0
+            lines.append(
+                _row(label, str(total.count), f"{total.seconds:.1f}", f"{share:.0f}%", _format_metrics(total))
+            )
+        memory = f"峰值内存 {peak_rss_mb():.0f} MB"
+        child = peak_child_rss_mb()
+        if child > 0:
+            memory += f"（单个子进程峰值 {child:.0f} MB）"
+        lines.append(f"总耗时 {wall:.1f}s，{memory}")
+        return lines
+
+    def write_report(self, directory: Path) -> Dict[str, Path]:
+        """
+        Write ``run-<timestamp>-<pid>-<random>.json`` (events + totals) and ``.csv``
+        (events) to ``directory``. The suffix keeps runners that start in the same second
+        (``--jobs`` children, broker workers sharing an output dir) from overwriting each
+        other; both files are written to a temp name and renamed into place.
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.fromtimestamp(self.started).strftime("%Y%m%d-%H%M%S")
+        name = f"run-{stamp}-{os.getpid()}-{secrets.token_hex(3)}"
+        json_path = directory / f"{name}.json"
+        csv_path = directory / f"{name}.csv"
+        with self._lock:
+            events = [asdict(e) for e in self.events]
+        report = {
+            "started": self.started,
+            "finished": self.finished or time.time(),
+            "wall_seconds": (self.finished or time.time()) - self.started,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "peak_child_rss_mb": round(peak_child_rss_mb(), 1),
+            "totals": {stage: asdict(total) for stage, total in self.totals().items()},
+            "events": events,
+        }
+        tmp = json_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, json_path)
+        columns = ["file", "stage", "started", "seconds", "audio_seconds", "segments", "tokens", "frames", "ok", "detail"]
+        metric_names = sorted({name for e in events for name in e["metrics"]})
+        tmp = csv_path.with_suffix(".csv.tmp")
+        with tmp.open("w", newline="", encoding="utf-8") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(columns + metric_names)
+            for e in events:
+                writer.writerow([e[c] for c in columns] + [round(e["metrics"].get(m, 0.0), 4) for m in metric_names])
+        os.replace(tmp, csv_path)
+        return {"json": json_path, "csv": csv_path}
+
+
+def _pad(text: str, width: int, left: bool = True) -> str:
+    """Pad by display width, counting CJK characters as two columns."""
+    used = sum(2 if unicodedata.east_asian_width(ch) in "WF" else 1 for ch in text)
+    fill = " " * max(0, width - used)
+    return text + fill if left else fill + text
+
+
+def _row(stage: str, count: str, seconds: str, share: str, metrics: str) -> str:
+    return f"{_pad(stage, 10)}{_pad(count, 6, False)}{_pad(seconds, 10, False)}{_pad(share, 7, False)}  {metrics}"
+
+
+def _format_metrics(event: StageEvent) -> str:
+    m = event.metrics
+    parts: List[str] = []
+    if "rtf" in m:
+        parts.append(f"RTF {m['rtf']:.2f}")
+    if "speed" in m:
+        parts.append(f"{m['speed']:.0f}x 实时")
+    if "segments_per_s" in m:
+        parts.append(f"{m['segments_per_s']:.1f} 段/s")
+    if "tokens_per_s" in m:
+        parts.append(f"{m['tokens_per_s']:.1f} tokens/s")
+    if "fps" in m:
+        parts.append(f"{m['fps']:.1f} fps")
+    return "，".join(parts)
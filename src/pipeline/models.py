@@ -0,0 +1,140 @@
+"""Process-wide registry that keeps loaded Whisper/translation models warm between jobs."""
+
+from __future__ import annotations
+
+import gc
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.config import MODEL_MEMORY_BUDGET_MB
+
+ModelKey = Tuple[str, str, str, str]  # (kind, name, device, precision)
+
+
+@dataclass
+class _Entry:
+    value: Any
+    nbytes: int
+
+
+def _estimate_bytes(value: Any) -> int:
+    """Parameter + buffer bytes of a torch module (or a tuple of them); 0 if unknown."""
+    if isinstance(value, (tuple, list)):
+        return sum(_estimate_bytes(item) for item in value)
+    total = 0
+    for attr in ("parameters", "buffers"):
+        getter = getattr(value, attr, None)
+        if callable(getter):
+            try:
+                total += sum(t.numel() * t.element_size() for t in getter())
+            except Exception:  # pragma: no cover - defensive for non-torch objects
+                pass
+    return total
+
+
+class ModelRegistry:
+    """
+    Loaded models keyed by ``(kind, name, device, precision)``.
+
+    ``get`` loads on first use and returns the same object afterwards, so a batch (or a
+    new job in the same GUI session) does not pay the load again. Concurrent callers for
+    one key wait for a single load. When resident weights exceed ``memory_budget_mb`` the
+    least recently used models are unloaded.
+    """
+
+    def __init__(self, memory_budget_mb: int = MODEL_MEMORY_BUDGET_MB) -> None:
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self._entries: "OrderedDict[ModelKey, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[ModelKey, threading.Lock] = {}
+        self._load_listeners: List[Callable[[ModelKey, float], None]] = []
+
+    def add_load_listener(self, listener: Callable[[ModelKey, float], None]) -> None:
+        """Call ``listener(key, seconds)`` after every actual (non-cached) load."""
+        with self._lock:
+            self._load_listeners.append(listener)
+
+    def remove_load_listener(self, listener: Callable[[ModelKey, float], None]) -> None:
+        with self._lock:
+            if listener in self._load_listeners:
+                self._load_listeners.remove(listener)
+
+    def get(self, key: ModelKey, loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry.value
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    return entry.value
+            started = time.perf_counter()
+            value = loader()
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._entries[key] = _Entry(value, _estimate_bytes(value))
+                self._evict_over_budget(keep=key)
+                listeners = list(self._load_listeners)
+            for listener in listeners:
+                listener(key, elapsed)
+            return value
+
+    def is_loaded(self, key: ModelKey) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def loaded(self) -> List[Tuple[ModelKey, int]]:
+        """Resident models, least recently used first, with their estimated bytes."""
+        with self._lock:
+            return [(key, entry.nbytes) for key, entry in self._entries.items()]
+
+    def unload(self, key: Optional[ModelKey] = None) -> int:
+        """Drop one model, or every model when ``key`` is None; returns how many were dropped."""
+        with self._lock:
+            keys = [key] if key is not None else list(self._entries)
+            dropped = sum(1 for k in keys if self._entries.pop(k, None) is not None)
+        if dropped:
+            _release_memory()
+        return dropped
+
+    def _evict_over_budget(self, keep: ModelKey) -> None:
+        total = sum(entry.nbytes for entry in self._entries.values())
+        evicted = False
+        for key in list(self._entries):
+            if total <= self.memory_budget:
+                break
+            if key == keep:
+                continue
+            total -= self._entries.pop(key).nbytes
+            evicted = True
+        if evicted:
+            _release_memory()
+
+
+def _release_memory() -> None:
+    gc.collect()
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+registry = ModelRegistry()
+
+
+def load_whisper(model_size: str, device: str) -> Any:
+    """Whisper model from the shared registry."""
+    import whisper
+
+    return registry.get(
+        ("whisper", model_size, device, "fp32"),
+        lambda: whisper.load_model(model_size, device=device),
+    )
@@ -0,0 +1,169 @@
+"""Pre-flight for a batch: probe every input, reject unusable files, weight progress by duration."""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.config import PREFLIGHT_TIMEOUT, PREFLIGHT_WORKERS
+from src.pipeline.metrics import StageEvent
+from src.pipeline.video import MediaInfo, probe_media
+
+# Pipeline threads in order; every file passes through each of them once.
+GROUPS = ("transcribe", "translate", "output")
+_GROUP_OF = {
+    "audio_decode": "transcribe",
+    "asr": "transcribe",
+    "translate": "translate",
+    "srt_write": "output",
+    "encode": "output",
+}
+# Stages whose end means the file is through its group (only then is its time counted, so a
+# quick srt_write does not stand in for the encode that follows it).
+_GROUP_ENDS = {"asr", "translate", "encode"}
+
+
+def probe_files(files: List[str], workers: int = PREFLIGHT_WORKERS) -> Dict[str, MediaInfo]:
+    """``probe_media`` for every file, ``workers`` ffprobe processes at a time; keyed like ``files``."""
+    if not files:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(files))), thread_name_prefix="preflight") as pool:
+        infos = pool.map(lambda path: probe_media(path, timeout=PREFLIGHT_TIMEOUT), files)
+        return dict(zip(files, infos))
+
+
+def reject_reason(info: MediaInfo, require_video: bool) -> str:
+    """Why the pipeline cannot process this file, or "" when it can."""
+    if info.error:
+        return info.error
+    if not info.probed:
+        return ""
+    if not info.has_audio:
+        return "没有音频流，无法识别"
+    if require_video and not info.has_video:
+        return "没有视频流，无法压制字幕"
+    return ""
+
+
+def media_warnings(info: MediaInfo) -> List[str]:
+    """Problems worth a log line that do not stop the file from being processed."""
+    if not info.probed or info.error:
+        return []
+    warnings = []
+    if info.duration <= 0:
+        warnings.append("无法获取时长，进度按平均时长估算")
+    if "unknown" in info.audio_codecs or "unknown" in info.video_codecs:
+        warnings.append("包含 FFmpeg 无法识别的编码，解码可能失败")
+    if len(info.audio_codecs) > 1:
+        warnings.append(f"有 {len(info.audio_codecs)} 条音轨，只识别第一条")
+    return warnings
+
+
+def longest_first(files: List[str], infos: Dict[str, MediaInfo]) -> List[str]:
+    """Longest media first (unknown durations last), so the long tail does not start at the end."""
+    return sorted(files, key=lambda path: -infos[path].duration if path in infos else 0.0)
+
+
+class BatchProgress:
+    """
+    Batch progress weighted by media duration instead of file count. A file's share of a
+    pipeline thread (``GROUPS``) is its duration times that thread's cost per media
+    second: the default from ``rates`` until the thread has timed some files of this
+    batch, then the measured seconds per media second. Files of unknown duration count as
+    the batch average. The reported fraction never goes down, even when a new measurement
+    shifts the weights. Thread-safe.
+    """
+
+    def __init__(self, durations: Dict[str, float], rates: Dict[str, float]) -> None:
+        known = [d for d in durations.values() if d > 0]
+        average = sum(known) / len(known) if known else 1.0
+        # Processing order (the pipeline takes files in this order).
+        self.files = list(durations)
+        self._duration = {path: d if d > 0 else average for path, d in durations.items()}
+        self._default = dict(rates)
+        self._done: Dict[str, Dict[str, float]] = {path: dict.fromkeys(GROUPS, 0.0) for path in self.files}
+        self._spent = dict.fromkeys(GROUPS, 0.0)
+        self._pending: Dict[Tuple[str, str], float] = {}
+        self._timed: Dict[str, Set[str]] = {group: set() for group in GROUPS}
+        self._lock = threading.Lock()
+        self._changed = time.monotonic()
+        self._reported = 0.0
+
+    def _rate(self, group: str) -> float:
+        media = sum(self._duration[path] for path in self._timed[group])
+        return self._spent[group] / media if media > 0 else self._default[group]
+
+    def _set(self, path: str, group: str, fraction: float) -> None:
+        done = self._done.get(path)
+        if done is None:
+            return
+        # Reaching a thread means every earlier one is finished with the file.
+        for earlier in GROUPS[: GROUPS.index(group)]:
+            done[earlier] = 1.0
+        done[group] = max(done[group], min(1.0, fraction))
+        self._changed = time.monotonic()
+
+    def record(self, event: StageEvent) -> None:
+        """Count a finished stage towards its thread's measured throughput."""
+        group = _GROUP_OF.get(event.stage)
+        if group is None or not event.ok or event.file not in self._done:
+            return
+        with self._lock:
+            key = (group, event.file)
+            self._pending[key] = self._pending.get(key, 0.0) + event.seconds
+            if event.stage in _GROUP_ENDS:
+                self._spent[group] += self._pending.pop(key)
+                self._timed[group].add(event.file)
+                self._set(event.file, group, 1.0)
+
+    def advance(self, path: str, group: str, fraction: float) -> None:
+        with self._lock:
+            self._set(path, group, fraction)
+
+    def advance_media(self, path: str, group: str, seconds: float) -> None:
+        """Progress through ``group`` as a position in the media, e.g. the end of the last ASR segment."""
+        with self._lock:
+            if path in self._duration:
+                self._set(path, group, seconds / self._duration[path])
+
+    def complete(self, path: str) -> None:
+        """The file left the pipeline (finished, skipped, failed or cancelled)."""
+        with self._lock:
+            self._set(path, GROUPS[-1], 1.0)
+
+    def fraction(self) -> float:
+        with self._lock:
+            rates = {group: self._rate(group) for group in GROUPS}
+            total = done = 0.0
+            for path, groups in self._done.items():
+                for group, part in groups.items():
+                    cost = self._duration[path] * rates[group]
+                    total += cost
+                    done += cost * part
+            self._reported = max(self._reported, done / total if total > 0 else 1.0)
+            return self._reported
+
+    def eta(self) -> Optional[float]:
+        """
+        Seconds until the batch finishes, or None before any stage has been timed. The
+        three threads run concurrently, so this is the busiest thread's remaining work
+        plus what the last file still needs downstream of it, counted down between updates.
+        """
+        with self._lock:
+            if not any(self._timed.values()):
+                return None
+            rates = {group: self._rate(group) for group in GROUPS}
+            remaining = dict.fromkeys(GROUPS, 0.0)
+            last: Optional[str] = None
+            for path in self.files:
+                for group, part in self._done[path].items():
+                    remaining[group] += (1.0 - part) * self._duration[path] * rates[group]
+                if self._done[path][GROUPS[-1]] < 1.0:
+                    last = path
+            if last is None:
+                return 0.0
+            tail = [(1.0 - self._done[last][g]) * self._duration[last] * rates[g] for g in GROUPS]
+            estimate = max(remaining[group] + sum(tail[i + 1 :]) for i, group in enumerate(GROUPS))
+            return max(0.0, estimate - (time.monotonic() - self._changed))
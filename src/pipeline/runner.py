@@ -0,0 +1,748 @@
+"""Qt-free pipeline core: transcribe -> translate -> save/burn, one thread per stage."""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+import traceback
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Set
+
+from src.config import (
+    DEFAULT_FONT,
+    DEFAULT_FONT_SIZE,
+    DEFAULT_TRANSLATION_MODEL,
+    DAEMON_SOCKET,
+    LMSTUDIO_CONCURRENCY,
+    PROGRESS_STAGE_RATES,
+)
+from src.pipeline.cache import TranscriptionCache
+from src.pipeline.checkpoint import CheckpointStore, FileCheckpoint, fingerprint
+from src.pipeline.memory import TranslationMemory
+from src.pipeline.metrics import RunMetrics, StageEvent
+from src.pipeline.models import registry
+from src.pipeline.preflight import BatchProgress, longest_first, media_warnings, probe_files, reject_reason
+from src.pipeline.streaming import SegmentFeed
+from src.pipeline.subtitles import save_srt
+from src.pipeline.video import (
+    CancelledError,
+    MediaInfo,
+    burn_subtitles_multi,
+    mux_subtitles,
+    soft_subtitle_suffix,
+)
+
+# numpy, torch, whisper, transformers and requests are imported where they are first
+# used, so the GUI and CLI start without them (see benchmarks/import_time.py).
+if TYPE_CHECKING:
+    from src.pipeline.daemon import DaemonClient
+    from src.pipeline.lmstudio import LmStudioTranslator
+    from src.pipeline.segments import Segments
+    from src.pipeline.translator import Translator
+
+
+@dataclass
+class JobOptions:
+    # One or more target languages; the source is transcribed once for all of them.
+    target_lang: List[str]
+    source_lang: Optional[str]
+    model_size: str
+    output_dir: Path
+    burn_subtitles: bool = True
+    export_srt: bool = True
+    keep_source_srt: bool = True
+    font: str = DEFAULT_FONT
+    font_size: int = DEFAULT_FONT_SIZE
+    translation_model: str = DEFAULT_TRANSLATION_MODEL
+    translation_backend: str = "m2m"
+    lm_endpoint: str = ""
+    lm_model: str = ""
+    domain: str = ""
+    lm_concurrency: int = LMSTUDIO_CONCURRENCY
+    lm_stream: bool = True
+    stage_queue_size: int = 1
+    use_cache: bool = True
+    use_translation_memory: bool = True
+    translation_precision: str = "fp32"
+    asr_workers: int = 0
+    stream_asr: bool = False
+    subtitle_mode: str = "hard"
+    burn_workers: int = 1
+    encoder_profile: str = "balanced"
+    encoder_threads: int = 0
+    use_daemon: bool = False
+    daemon_socket: str = DAEMON_SOCKET
+    cpu_threads: int = 0
+    # Skip stages whose checkpointed artifacts are intact (see ``CheckpointStore``).
+    resume: bool = True
+    # Write ``<output_dir>/reports/run-*.json|csv`` with per-stage timings.
+    write_report: bool = True
+    # Probe inputs first: reject unusable files, run the longest first, weight progress by duration.
+    preflight: bool = True
+
+    def __post_init__(self) -> None:
+        if isinstance(self.target_lang, str):  # single code, as before lists were accepted
+            self.target_lang = [self.target_lang]
+        self.target_lang = list(dict.fromkeys(self.target_lang))
+        if not self.target_lang:
+            raise ValueError("JobOptions.target_lang needs at least one language")
+        self.output_dir = Path(self.output_dir)
+
+
+@dataclass
+class _FileJob:
+    """State handed from one pipeline stage to the next for a single file."""
+
+    file_path: str
+    source_lang: str = ""
+    segments: List[dict] = field(default_factory=list)
+    # Target language -> translated segments.
+    translated_segments: Dict[str, "Segments"] = field(default_factory=dict)
+    # Streaming mode: the translate stage reads segments from ``feed`` while stage 1 runs.
+    feed: Optional[SegmentFeed] = None
+    handed_off: bool = False
+    checkpoint: Optional[FileCheckpoint] = None
+
+
+# Sentinel pushed through the stage queues once the last file has been queued.
+_STOP = object()
+
+
+ProgressFn = Optional[Callable[[str], None]]
+FileProgressFn = Optional[Callable[[str, int], None]]
+StageFn = Optional[Callable[[StageEvent], None]]
+
+
+class PipelineRunner:
+    """
+    Run a batch of files through the pipeline, reporting through plain callbacks.
+
+    ``progress_cb`` gets log lines, ``file_progress_cb`` gets ``(file_path, percent of
+    the batch)`` and ``error_cb`` gets one message per failed file; ``failed`` lists the
+    files that did not complete; ``cancel_event`` (or ``cancel()``) stops the run.
+    ``stage_cb`` receives a ``StageEvent`` as each timed stage finishes; the events are
+    also kept in ``metrics`` for the end-of-run summary and report. The GUI worker and the
+    CLI are thin wrappers over this.
+
+    With ``options.preflight`` every input is probed before the batch starts (``media``
+    passes in results probed earlier, keyed by resolved path); unusable files fail at once
+    and the rest run longest first. Batch percent is weighted by media duration and
+    ``eta_seconds()`` estimates the time left from this batch's measured stage throughput.
+    """
+
+    def __init__(
+        self,
+        files: List[str],
+        options: JobOptions,
+        progress_cb: ProgressFn = None,
+        file_progress_cb: FileProgressFn = None,
+        error_cb: ProgressFn = None,
+        cancel_event: Optional[threading.Event] = None,
+        stage_cb: StageFn = None,
+        media: Optional[Dict[str, MediaInfo]] = None,
+    ) -> None:
+        self.files = files
+        self.options = options
+        self.failed: List[str] = []
+        # Files written per source path (also filled from checkpoints for skipped files).
+        self.outputs: Dict[str, List[str]] = {}
+        self._progress_cb = progress_cb
+        self._file_progress_cb = file_progress_cb
+        self._error_cb = error_cb
+        self._stage_cb = stage_cb
+        self.metrics = RunMetrics(on_event=self._on_stage_event)
+        # Probe results per resolved path, including files probed by the caller.
+        self.media: Dict[str, MediaInfo] = dict(media or {})
+        self._translator: Optional[Translator] = None
+        self._lm_translator: Optional[LmStudioTranslator] = None
+        self._cache: Optional[TranscriptionCache] = TranscriptionCache() if options.use_cache else None
+        self._progress_lock = threading.Lock()
+        self._progress = BatchProgress({}, {})
+        # Files that have left the pipeline (finished, skipped, failed or cancelled).
+        self._left: Set[str] = set()
+        self._transcribed: "Optional[queue.Queue[object]]" = None
+        self._daemon: Optional[DaemonClient] = None
+        self._checkpoints: Optional[CheckpointStore] = (
+            CheckpointStore(options.output_dir) if options.resume else None
+        )
+        # May be shared (e.g. a multiprocessing.Event) so one signal stops several runners.
+        self._cancel = cancel_event if cancel_event is not None else threading.Event()
+
+    def cancel(self) -> None:
+        """Stop after the current step; a running FFmpeg encode is terminated. Thread-safe."""
+        self._cancel.set()
+
+    def _emit_progress(self, text: str) -> None:
+        if self._progress_cb:
+            self._progress_cb(text)
+
+    def _emit_file_progress(self, file_path: str, percent: int) -> None:
+        if self._file_progress_cb:
+            self._file_progress_cb(file_path, percent)
+
+    def _emit_error(self, message: str) -> None:
+        if self._error_cb:
+            self._error_cb(message)
+
+    def _on_stage_event(self, event: StageEvent) -> None:
+        self._progress.record(event)
+        if self._stage_cb:
+            self._stage_cb(event)
+
+    def eta_seconds(self) -> Optional[float]:
+        """Estimated seconds until the batch finishes; None until the first stage has been timed."""
+        return self._progress.eta()
+
+    def run(self) -> bool:
+        """Process every file; returns True when none failed and the run was not cancelled."""
+        registry.add_load_listener(self.metrics.model_loaded)
+        try:
+            files = self._preflight()
+            from src.pipeline.daemon import DaemonClient
+            from src.pipeline.lmstudio import LmStudioTranslator
+            from src.pipeline.translator import Translator
+
+            if self.options.use_daemon:
+                client = DaemonClient(self.options.daemon_socket)
+                if client.available():
+                    self._daemon = client
+                    self._emit_progress("已连接模型守护进程，模型不在本进程加载")
+                else:
+                    self._emit_progress("未连接到模型守护进程，改为本地加载模型")
+            memory = TranslationMemory() if self.options.use_translation_memory else None
+            if self.options.translation_backend == "m2m":
+                self._translator = Translator(
+                    model_name=self.options.translation_model,
+                    progress_cb=self._emit_progress,
+                    memory=memory,
+                    precision=self.options.translation_precision,
+                    num_threads=self.options.cpu_threads,
+                    daemon=self._daemon,
+                )
+            else:
+                self._lm_translator = LmStudioTranslator(
+                    endpoint=self.options.lm_endpoint,
+                    model=self.options.lm_model,
+                    progress_cb=self._emit_progress,
+                    memory=memory,
+                    concurrency=self.options.lm_concurrency,
+                    stream=self.options.lm_stream,
+                )
+
+            # transcribe -> translate -> save/burn, each stage on its own thread so
+            # file N+1 is recognised while file N translates and file N-1 encodes.
+            depth = max(1, self.options.stage_queue_size)
+            transcribed: "queue.Queue[object]" = queue.Queue(maxsize=depth)
+            translated: "queue.Queue[object]" = queue.Queue(maxsize=depth)
+            self._transcribed = transcribed
+            stages = [
+                threading.Thread(
+                    target=self._stage_loop,
+                    args=(self._translate_stage, transcribed, translated),
+                    name="pipeline-translate",
+                    daemon=True,
+                ),
+                threading.Thread(
+                    target=self._stage_loop,
+                    args=(self._output_stage, translated, None),
+                    name="pipeline-output",
+                    daemon=True,
+                ),
+            ]
+            for stage in stages:
+                stage.start()
+            try:
+                for file_path in files:
+                    if self._cancel.is_set():
+                        self._mark_done(file_path)
+                        continue
+                    job = self._run_stage(self._transcribe_stage, _FileJob(file_path))
+                    if job is None:
+                        self._mark_done(file_path)
+                    elif not job.handed_off:
+                        transcribed.put(job)
+            finally:
+                transcribed.put(_STOP)
+                for stage in stages:
+                    stage.join()
+
+        except Exception as exc:  # pragma: no cover - surfaced to caller
+            trace = traceback.format_exc()
+            # The whole run aborted (e.g. a model failed to load): nothing left unfinished was produced.
+            with self._progress_lock:
+                resolved = dict.fromkeys(str(Path(path).resolve()) for path in self.files)
+                self.failed += [path for path in resolved if path not in self._left and path not in self.failed]
+            self._emit_error(f"{exc}\n{trace}")
+            return False
+        finally:
+            registry.remove_load_listener(self.metrics.model_loaded)
+            self._finish_metrics()
+        return not self.failed and not self._cancel.is_set()
+
+    def _preflight(self) -> List[str]:
+        """Probe the inputs, fail the unusable ones and return the rest in processing order."""
+        files = list(dict.fromkeys(str(Path(path).resolve()) for path in self.files))
+        if self.options.preflight:
+            missing = [path for path in files if path not in self.media]
+            self.media.update(probe_files(missing))
+            if any(not info.probed for info in self.media.values()):
+                self._emit_progress("未找到 ffprobe，跳过输入预检，进度按文件数计算")
+            require_video = self.options.burn_subtitles
+            usable = []
+            for path in files:
+                info = self.media[path]
+                reason = reject_reason(info, require_video)
+                if reason:
+                    self.failed.append(path)
+                    self._emit_error(f"{Path(path).name}: {reason}")
+                    continue
+                for warning in media_warnings(info):
+                    self._emit_progress(f"{Path(path).name}：{warning}")
+                usable.append(path)
+            files = longest_first(usable, self.media)
+            total = sum(self.media[path].duration for path in files)
+            if files and total > 0:
+                self._emit_progress(
+                    f"预检完成：{len(files)} 个文件，共 {_format_duration(total)}，按时长从长到短处理"
+                )
+        durations = {path: self.media[path].duration if path in self.media else 0.0 for path in files}
+        self._progress = BatchProgress(durations, self._stage_rates())
+        return files
+
+    def _stage_rates(self) -> Dict[str, float]:
+        """Default cost per media second of each pipeline thread for these options."""
+        targets = len(self.options.target_lang)
+        if not self.options.burn_subtitles:
+            output = PROGRESS_STAGE_RATES["subtitles"]
+        elif self.options.subtitle_mode == "soft":
+            output = PROGRESS_STAGE_RATES["mux"]
+        else:
+            output = PROGRESS_STAGE_RATES["encode"] * targets / max(1, self.options.burn_workers)
+        return {
+            "transcribe": PROGRESS_STAGE_RATES["transcribe"],
+            "translate": PROGRESS_STAGE_RATES["translate"] * targets,
+            "output": output,
+        }
+
+    def _finish_metrics(self) -> None:
+        self.metrics.finished = time.time()
+        if not self.metrics.events:
+            return
+        for line in self.metrics.summary_lines():
+            self._emit_progress(line)
+        if self.options.write_report:
+            try:
+                paths = self.metrics.write_report(self.options.output_dir / "reports")
+            except OSError as exc:
+                self._emit_progress(f"运行报告写入失败：{exc}")
+            else:
+                self._emit_progress(f"运行报告：{paths['json']}")
+
+    def _stage_loop(
+        self,
+        stage: Callable[[_FileJob], Optional[_FileJob]],
+        inbox: "queue.Queue[object]",
+        outbox: "Optional[queue.Queue[object]]",
+    ) -> None:
+        while True:
+            job = inbox.get()
+            if job is _STOP:
+                if outbox is not None:
+                    outbox.put(_STOP)
+                return
+            assert isinstance(job, _FileJob)
+            result = self._run_stage(stage, job)
+            if result is None or outbox is None:
+                self._mark_done(job.file_path)
+            else:
+                outbox.put(result)
+
+    def _run_stage(self, stage: Callable[[_FileJob], Optional[_FileJob]], job: _FileJob) -> Optional[_FileJob]:
+        """Run one stage for one file; a failure drops only that file from the pipeline."""
+        if self._cancel.is_set():
+            return None
+        try:
+            return stage(job)
+        except CancelledError:
+            self._emit_progress(f"已取消：{Path(job.file_path).name}")
+            return None
+        except Exception as exc:  # pragma: no cover - surfaced to caller
+            trace = traceback.format_exc()
+            with self._progress_lock:
+                self.failed.append(job.file_path)
+            self._emit_error(f"{Path(job.file_path).name}: {exc}\n{trace}")
+            return None
+
+    def _mark_done(self, file_path: str) -> None:
+        with self._progress_lock:
+            self._left.add(file_path)
+        self._progress.complete(file_path)
+        self._emit_file_progress(file_path, int(self._progress.fraction() * 100))
+
+    def _report_partial(self, file_path: str, group: str, fraction: float) -> None:
+        """Fold progress within one stage (e.g. the running encode) into the batch percent."""
+        self._progress.advance(file_path, group, fraction)
+        self._emit_file_progress(file_path, int(self._progress.fraction() * 100))
+
+    def _transcribe_stage(self, job: _FileJob) -> Optional[_FileJob]:
+        self._emit_progress(f"开始处理：{Path(job.file_path).name}")
+        if self._checkpoints is not None:
+            ck = job.checkpoint = self._checkpoints.open(job.file_path)
+            if ck.discarded:
+                self._emit_progress(f"已清理上次未完成的输出：{'、'.join(p.name for p in ck.discarded)}")
+            if ck.is_done("output", self._output_fingerprint(ck)):
+                self._emit_progress(f"检查点显示已完成，跳过：{Path(job.file_path).name}")
+                self.outputs[job.file_path] = [str(path) for path in ck.artifact_paths("output")]
+                return None
+            if ck.is_done("transcribe", self._transcribe_fingerprint()):
+                job.segments = ck.load_segments("transcribe", "segments")
+                job.source_lang = str(ck.extra("transcribe").get("source_lang", "auto"))
+                self._emit_progress("从检查点恢复识别结果")
+                self._progress.advance(job.file_path, "transcribe", 1.0)
+                return job
+        from src.pipeline.audio import SAMPLE_RATE, extract_audio
+        from src.pipeline.transcriber import transcribe_video
+
+        with self.metrics.stage("audio_decode", job.file_path) as event:
+            audio = extract_audio(job.file_path, progress_cb=self._emit_progress)
+            event.audio_seconds = len(audio) / SAMPLE_RATE
+        audio_seconds = event.audio_seconds
+        if self.options.stream_asr and self.options.asr_workers <= 1 and self._daemon is None:
+            return self._transcribe_streaming(job, audio, audio_seconds)
+        with self.metrics.stage("asr", job.file_path, audio_seconds=audio_seconds) as event:
+            transcription = transcribe_video(
+                audio,
+                model_size=self.options.model_size,
+                language=self.options.source_lang,
+                progress_cb=self._emit_progress,
+                cache=self._cache,
+                parallel_workers=self.options.asr_workers,
+                daemon=self._daemon,
+            )
+            event.segments = len(transcription["segments"])  # type: ignore[arg-type]
+        job.source_lang = self.options.source_lang or transcription.get("language", "auto")
+        job.segments = transcription["segments"]  # type: ignore[assignment]
+        self._checkpoint_transcript(job)
+        return job
+
+    def _transcribe_streaming(self, job: _FileJob, audio: object, audio_seconds: float) -> _FileJob:
+        """Hand the job to the translate stage on the first segment, then keep feeding it."""
+        from src.pipeline.transcriber import TranscriptStream
+
+        stream = TranscriptStream(
+            audio,  # type: ignore[arg-type]
+            model_size=self.options.model_size,
+            language=self.options.source_lang,
+            progress_cb=self._emit_progress,
+            cache=self._cache,
+        )
+        feed = job.feed = SegmentFeed()
+
+        def hand_off() -> None:
+            job.source_lang = self.options.source_lang or stream.language or "auto"
+            job.handed_off = True
+            assert self._transcribed is not None
+            self._transcribed.put(job)
+
+        with self.metrics.stage("asr", job.file_path, audio_seconds=audio_seconds) as event:
+            try:
+                for seg in stream:
+                    if not job.handed_off:
+                        hand_off()
+                    feed.put(seg)
+                    event.segments += 1
+                    self._progress.advance_media(job.file_path, "transcribe", seg["end"])
+            except Exception as exc:
+                if not job.handed_off:
+                    raise
+                event.ok = False
+                feed.fail(exc)  # reported once, by the translate stage
+                return job
+        if not job.handed_off:
+            hand_off()
+        feed.close()
+        return job
+
+    def _translate_stage(self, job: _FileJob) -> _FileJob:
+        targets = self.options.target_lang
+        ck = job.checkpoint
+        if ck is not None and job.feed is None:
+            for lang in targets:
+                if ck.is_done(f"translate:{lang}", self._translate_fingerprint(ck, lang)):
+                    job.translated_segments[lang] = ck.load_segments(f"translate:{lang}", "segments")
+            if job.translated_segments:
+                self._emit_progress(f"从检查点恢复译文：{'、'.join(job.translated_segments)}")
+            targets = [lang for lang in targets if lang not in job.translated_segments]
+            if not targets:
+                self._progress.advance(job.file_path, "translate", 1.0)
+                return job
+        self._emit_progress(f"翻译到 {'、'.join(targets)} ：{Path(job.file_path).name}")
+        streamed = job.feed is not None
+        tokens_before = self._lm_translator.completion_tokens if self._lm_translator else 0
+        with self.metrics.stage("translate", job.file_path, detail=",".join(targets)) as event:
+            if streamed:
+                job = self._translate_streaming(job, targets)
+            else:
+                self._translate_targets(job, targets)
+            event.segments = len(job.segments) * len(targets)
+            if self._lm_translator is not None:
+                event.tokens = self._lm_translator.completion_tokens - tokens_before
+        if streamed:
+            self._checkpoint_transcript(job)
+        self._checkpoint_translations(job, targets)
+        return job
+
+    def _translate_targets(self, job: _FileJob, targets: List[str]) -> None:
+        from src.pipeline.segments import SegmentTable
+
+        # One columnar copy of the source timings, shared by every translation.
+        source = SegmentTable.from_dicts(job.segments)
+        if self.options.translation_backend == "m2m":
+            job.translated_segments.update(
+                self._translator.translate_segments_multi(  # type: ignore[union-attr]
+                    source, source_lang=job.source_lang, target_langs=targets
+                )
+            )
+        else:
+            total = len(source)
+            for n, target_lang in enumerate(targets):
+                prefix = f"{target_lang} " if len(targets) > 1 else ""
+
+                def on_segment(i: int, seg: dict, prefix: str = prefix, n: int = n) -> None:
+                    self._emit_progress(f"  {prefix}[{i + 1}/{total}] {seg['text']}")
+                    self._report_partial(job.file_path, "translate", (n + (i + 1) / total) / len(targets))
+
+                job.translated_segments[target_lang] = self._lm_translator.translate_segments(  # type: ignore[union-attr]
+                    source,
+                    source_lang=job.source_lang,
+                    target_lang=target_lang,
+                    domain=self.options.domain,
+                    on_segment=on_segment,
+                )
+
+    def _translate_streaming(self, job: _FileJob, targets: List[str]) -> _FileJob:
+        """Stream the first target as segments arrive; the rest follow once the feed ends."""
+        assert job.feed is not None
+        source: List[dict] = []
+        first, rest = targets[0], targets[1:]
+
+        def tee() -> Iterator[dict]:
+            for seg in job.feed:  # type: ignore[union-attr]
+                source.append(seg)
+                yield seg
+
+        if self.options.translation_backend == "m2m":
+            stream = self._translator.translate_stream(  # type: ignore[union-attr]
+                tee(), source_lang=job.source_lang, target_lang=first
+            )
+        else:
+            stream = self._lm_translator.translate_stream(  # type: ignore[union-attr]
+                tee(),
+                source_lang=job.source_lang,
+                target_lang=first,
+                domain=self.options.domain,
+            )
+        translated: List[dict] = []
+        for seg in stream:
+            translated.append(seg)
+            self._emit_progress(f"  [{len(translated)}] {seg['text']}")
+        job.segments = source
+        job.translated_segments = {first: translated}
+        if rest:
+            self._emit_progress(f"识别结束，继续翻译到 {'、'.join(rest)}")
+            if self.options.translation_backend == "m2m":
+                job.translated_segments.update(
+                    self._translator.translate_segments_multi(  # type: ignore[union-attr]
+                        source, source_lang=job.source_lang, target_langs=rest
+                    )
+                )
+            else:
+                for target_lang in rest:
+                    job.translated_segments[target_lang] = self._lm_translator.translate_segments(  # type: ignore[union-attr]
+                        source,
+                        source_lang=job.source_lang,
+                        target_lang=target_lang,
+                        domain=self.options.domain,
+                    )
+        return job
+
+    def _output_stage(self, job: _FileJob) -> _FileJob:
+        file_path = job.file_path
+        targets = self.options.target_lang
+        output_dir = self.options.output_dir
+        output_dir.mkdir(parents=True, exist_ok=True)
+        stem = Path(file_path).stem
+
+        translated_srts = {lang: output_dir / f"{stem}_{lang}.srt" for lang in targets}
+        original_srt: Optional[Path] = output_dir / f"{stem}_source.srt" if self.options.keep_source_srt else None
+        videos: List[Path] = []
+        if self.options.burn_subtitles and self.options.subtitle_mode == "soft":
+            # Soft subtitles are selectable, so all targets share one output file.
+            videos = [output_dir / f"{stem}_{'-'.join(targets)}_softsub{soft_subtitle_suffix(file_path)}"]
+        elif self.options.burn_subtitles:
+            videos = [output_dir / f"{stem}_{lang}_sub.mp4" for lang in targets]
+
+        ck = job.checkpoint
+        if ck is not None:
+            planned = [*translated_srts.values(), *videos] + ([original_srt] if original_srt else [])
+            ck.begin("output", self._output_fingerprint(ck), planned)
+
+        keep_translated = self.options.export_srt or not self.options.burn_subtitles
+        with self.metrics.stage("srt_write", file_path) as event:
+            for target_lang, translated_srt in translated_srts.items():
+                save_srt(job.translated_segments[target_lang], str(translated_srt))
+                event.segments += len(job.translated_segments[target_lang])
+                if keep_translated:
+                    self._emit_progress(f"已生成翻译字幕：{translated_srt.name}")
+
+            if original_srt is not None:
+                save_srt(job.segments, str(original_srt))
+                event.segments += len(job.segments)
+                self._emit_progress(f"已生成原文字幕：{original_srt.name}")
+
+        if self.options.burn_subtitles and self.options.subtitle_mode == "soft":
+            output_video = videos[0]
+            tracks = [(str(translated_srts[lang]), lang) for lang in targets]
+            if original_srt is not None:
+                tracks.append((str(original_srt), job.source_lang))
+            with self.metrics.stage("encode", file_path, detail="mux"):
+                mux_subtitles(
+                    file_path,
+                    tracks,
+                    str(output_video),
+                    progress_cb=self._emit_progress,
+                    cancel_event=self._cancel,
+                )
+            self._emit_progress(f"软字幕封装完成：{output_video.name}")
+        elif self.options.burn_subtitles:
+            outputs = [(str(translated_srts[lang]), str(video)) for lang, video in zip(targets, videos)]
+            encode_stats: Dict[str, float] = {}
+            with self.metrics.stage("encode", file_path, detail=self.options.encoder_profile) as event:
+                burn_subtitles_multi(
+                    file_path,
+                    outputs,
+                    font=self.options.font,
+                    font_size=self.options.font_size,
+                    progress_cb=self._emit_progress,
+                    parallel=self.options.burn_workers,
+                    encoder_profile=self.options.encoder_profile,
+                    threads=self.options.encoder_threads,
+                    percent_cb=lambda percent: self._report_partial(file_path, "output", percent / 100),
+                    cancel_event=self._cancel,
+                    stats=encode_stats,
+                    duration=self.media[file_path].duration if file_path in self.media else 0.0,
+                )
+                event.frames = encode_stats.get("frames", 0.0)
+            for output_video in videos:
+                self._emit_progress(f"压制完成：{output_video.name}")
+        else:
+            self._emit_progress("已跳过压制，仅输出字幕文件")
+            keep_translated = True
+
+        if not keep_translated:
+            for translated_srt in translated_srts.values():
+                if translated_srt.exists():
+                    try:
+                        translated_srt.unlink()
+                    except OSError:
+                        pass
+
+        artifacts: Dict[str, Path] = {video.name: video for video in videos}
+        if keep_translated:
+            artifacts.update({path.name: path for path in translated_srts.values()})
+        if original_srt is not None:
+            artifacts[original_srt.name] = original_srt
+        self.outputs[file_path] = [str(path) for path in artifacts.values()]
+        if ck is not None:
+            ck.complete("output", self._output_fingerprint(ck), artifacts)
+        return job
+
+    # Checkpoint fingerprints: each stage depends on its options and on the hashes of the
+    # artifacts it consumed, so redoing an upstream stage invalidates everything after it.
+
+    def _transcribe_fingerprint(self) -> str:
+        return fingerprint(model_size=self.options.model_size, source_lang=self.options.source_lang)
+
+    def _translate_fingerprint(self, ck: FileCheckpoint, lang: str) -> str:
+        m2m = self.options.translation_backend == "m2m"
+        return fingerprint(
+            segments=ck.artifact_hash("transcribe", "segments"),
+            backend=self.options.translation_backend,
+            model=self.options.translation_model if m2m else self.options.lm_model,
+            precision=self.options.translation_precision if m2m else "",
+            domain=self.options.domain,
+            target=lang,
+        )
+
+    def _output_fingerprint(self, ck: FileCheckpoint) -> str:
+        opts = self.options
+        return fingerprint(
+            segments=ck.artifact_hash("transcribe", "segments"),
+            translations={lang: ck.artifact_hash(f"translate:{lang}", "segments") for lang in opts.target_lang},
+            output_dir=str(opts.output_dir.resolve()),
+            burn=opts.burn_subtitles,
+            mode=opts.subtitle_mode,
+            export_srt=opts.export_srt,
+            keep_source_srt=opts.keep_source_srt,
+            font=opts.font,
+            font_size=opts.font_size,
+            encoder=opts.encoder_profile,
+        )
+
+    def _checkpoint_transcript(self, job: _FileJob) -> None:
+        ck = job.checkpoint
+        if ck is None:
+            return
+        path = ck.save_segments("segments.json", job.segments)
+        ck.complete("transcribe", self._transcribe_fingerprint(), {"segments": path}, source_lang=job.source_lang)
+
+    def _checkpoint_translations(self, job: _FileJob, targets: List[str]) -> None:
+        ck = job.checkpoint
+        if ck is None:
+            return
+        from src.pipeline.segments import segment_dicts
+
+        for lang in targets:
+            path = ck.save_segments(f"translated.{lang}.json", segment_dicts(job.translated_segments[lang]))
+            ck.complete(f"translate:{lang}", self._translate_fingerprint(ck, lang), {"segments": path})
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}"
+
+
+def warm_up_models(options: JobOptions, progress_cb: ProgressFn = None) -> None:
+    """
+    Import the ML stack and load the models ``options`` would use into the shared
+    registry, so the first run in this process skips the cold start. Meant for a
+    background thread; a run started meanwhile waits on the same load instead of
+    repeating it.
+    """
+    started = time.perf_counter()
+    if options.use_daemon:
+        from src.pipeline.daemon import DaemonClient
+
+        if DaemonClient(options.daemon_socket).available():
+            return
+    from src.pipeline.transcriber import preload_whisper
+
+    preload_whisper(options.model_size, progress_cb=progress_cb)
+    if options.translation_backend == "m2m":
+        from src.pipeline.translator import Translator
+
+        Translator(
+            model_name=options.translation_model,
+            progress_cb=progress_cb,
+            precision=options.translation_precision,
+            num_threads=options.cpu_threads,
+        ).warm_up()
+    else:
+        from src.pipeline.lmstudio import count_tokens
+
+        count_tokens("")  # imports requests and loads the BPE tables
+    if progress_cb:
+        progress_cb(f"模型预加载完成（{time.perf_counter() - started:.1f}s）")
@@ -0,0 +1,266 @@
+"""Columnar segment storage: NumPy start/end arrays plus texts, with vectorised re-timing."""
+
+from __future__ import annotations
+
+import re
+from typing import Iterable, Iterator, List, Sequence, Union, overload
+
+import numpy as np
+
+_BLANK_LINES = re.compile(r"\n\n+")
+_WORD_BREAK = re.compile(r"(?<=\s)")
+
+
+def _object_array(texts: Iterable[str]) -> np.ndarray:
+    items = list(texts)
+    # np.array(items) would build a fixed-width unicode array; keep the str objects instead.
+    out = np.empty(len(items), dtype=object)
+    out[:] = items
+    return out
+
+
+class SegmentTable:
+    """
+    Segments as three parallel columns: ``start`` / ``end`` (float64 seconds) and ``text``
+    (object array of str).
+
+    Slicing with ``table[a:b]`` returns views, not copies. Operations never modify a table
+    in place; they return a new one that may share columns with the old. Iterating or
+    indexing with an int yields ``{"start", "end", "text"}`` dicts, so a table can stand in
+    for the list-of-dicts form wherever segments are only read.
+    """
+
+    __slots__ = ("start", "end", "text")
+
+    def __init__(self, start: Sequence[float], end: Sequence[float], text: Iterable[str]) -> None:
+        self.start = np.asarray(start, dtype=np.float64)
+        self.end = np.asarray(end, dtype=np.float64)
+        self.text = text if isinstance(text, np.ndarray) and text.dtype == object else _object_array(text)
+        if not len(self.start) == len(self.end) == len(self.text):
+            raise ValueError("start, end and text must have the same length")
+
+    @classmethod
+    def from_dicts(cls, segments: "Segments") -> "SegmentTable":
+        if isinstance(segments, SegmentTable):
+            return segments
+        n = len(segments)
+        return cls(
+            np.fromiter((seg["start"] for seg in segments), dtype=np.float64, count=n),
+            np.fromiter((seg["end"] for seg in segments), dtype=np.float64, count=n),
+            _object_array(seg["text"] for seg in segments),
+        )
+
+    def to_dicts(self) -> List[dict]:
+        return [
+            {"start": s, "end": e, "text": t}
+            for s, e, t in zip(self.start.tolist(), self.end.tolist(), self.text.tolist())
+        ]
+
+    @property
+    def texts(self) -> List[str]:
+        return self.text.tolist()
+
+    @property
+    def duration(self) -> np.ndarray:
+        return self.end - self.start
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self.to_dicts())
+
+    @overload
+    def __getitem__(self, key: int) -> dict: ...
+
+    @overload
+    def __getitem__(self, key: Union[slice, np.ndarray, Sequence[int]]) -> "SegmentTable": ...
+
+    def __getitem__(self, key):  # type: ignore[no-untyped-def]
+        if isinstance(key, (int, np.integer)):
+            return {"start": float(self.start[key]), "end": float(self.end[key]), "text": self.text[key]}
+        return SegmentTable(self.start[key], self.end[key], self.text[key])
+
+    def __repr__(self) -> str:
+        return f"SegmentTable({len(self)} segments)"
+
+    def with_texts(self, texts: Iterable[str]) -> "SegmentTable":
+        """Same timings with new (stripped) texts, e.g. a translation."""
+        return SegmentTable(self.start, self.end, _object_array(t.strip() for t in texts))
+
+    # -- re-timing -------------------------------------------------------------------
+
+    def shift(self, seconds: float) -> "SegmentTable":
+        return SegmentTable(self.start + seconds, self.end + seconds, self.text)
+
+    def scale(self, factor: float, origin: float = 0.0) -> "SegmentTable":
+        """Stretch times around ``origin`` (e.g. 25/23.976 to retime for a frame-rate change)."""
+        return SegmentTable((self.start - origin) * factor + origin, (self.end - origin) * factor + origin, self.text)
+
+    def window(self, start: float, end: float) -> "SegmentTable":
+        """Segments overlapping ``[start, end)``, shifted so ``start`` becomes 0 and clamped to the range."""
+        keep = (self.end > start) & (self.start < end)
+        return SegmentTable(
+            np.maximum(self.start[keep] - start, 0.0),
+            np.minimum(self.end[keep] - start, end - start),
+            self.text[keep],
+        )
+
+    def clamp_overlaps(self, min_gap: float = 0.0) -> "SegmentTable":
+        """End each segment at least ``min_gap`` before the next one starts (segments in start order)."""
+        if len(self) < 2:
+            return self
+        end = self.end.copy()
+        end[:-1] = np.maximum(self.start[:-1], np.minimum(end[:-1], self.start[1:] - min_gap))
+        return SegmentTable(self.start, end, self.text)
+
+    def merge_gaps(self, max_gap_ms: float, joiner: str = " ") -> "SegmentTable":
+        """Join consecutive segments separated by less than ``max_gap_ms``."""
+        if len(self) < 2:
+            return self
+        first = np.ones(len(self), dtype=bool)
+        first[1:] = (self.start[1:] - self.end[:-1]) * 1000.0 >= max_gap_ms
+        heads = np.flatnonzero(first)
+        if len(heads) == len(self):
+            return self
+        bounds = np.append(heads, len(self)).tolist()
+        text = self.text
+        joined = [
+            text[a] if b - a == 1 else joiner.join(t.strip() for t in text[a:b]) for a, b in zip(bounds, bounds[1:])
+        ]
+        return SegmentTable(self.start[heads], np.maximum.reduceat(self.end, heads), joined)
+
+    def split_by_cps(self, max_cps: float) -> "SegmentTable":
+        """
+        Split segments read faster than ``max_cps`` characters per second into pieces at
+        word boundaries (or evenly, for text without spaces), each piece getting time in
+        proportion to its length.
+        """
+        lengths = np.fromiter((len(t) for t in self.text), dtype=np.float64, count=len(self))
+        duration = self.end - self.start
+        with np.errstate(divide="ignore", invalid="ignore"):
+            parts = np.ceil(lengths / (max_cps * duration))
+        parts = np.where(duration > 0, np.nan_to_num(parts, nan=1.0), 1.0).astype(np.int64)
+        targets = np.flatnonzero(parts > 1)
+        if not len(targets):
+            return self
+
+        pieces = {int(i): _split_text(self.text[i], int(parts[i])) for i in targets}
+        counts = np.ones(len(self), dtype=np.int64)
+        for i, chunks in pieces.items():
+            counts[i] = len(chunks)
+        rows = np.repeat(np.arange(len(self)), counts)
+        start = self.start[rows]
+        end = self.end[rows]
+        text = self.text[rows]
+        offsets = np.cumsum(counts) - counts
+        for i, chunks in pieces.items():
+            at = int(offsets[i])
+            sizes = np.array([len(c) for c in chunks], dtype=np.float64)
+            edges = self.start[i] + duration[i] * np.concatenate(([0.0], np.cumsum(sizes) / sizes.sum()))
+            start[at : at + len(chunks)] = edges[:-1]
+            end[at : at + len(chunks)] = edges[1:]
+            text[at : at + len(chunks)] = chunks
+        return SegmentTable(start, end, text)
+
+    # -- serialisation ---------------------------------------------------------------
+
+    def to_srt(self) -> str:
+        """
+        SRT text, identical to ``srt.compose`` on the equivalent subtitles: sorted by
+        start, and empty or non-positive-length entries dropped.
+        """
+        start_us = np.rint(self.start * 1e6).astype(np.int64)
+        end_us = np.rint(self.end * 1e6).astype(np.int64)
+        order = np.lexsort((end_us, start_us))
+        blank = np.fromiter((not t.strip() for t in self.text), dtype=bool, count=len(self))
+        order = order[~(blank[order] | (start_us[order] < 0) | (start_us[order] >= end_us[order]))]
+        starts = _timestamps(start_us[order] // 1000, ",", 3)
+        ends = _timestamps(end_us[order] // 1000, ",", 3)
+        texts = self.text[order].tolist()
+        return "".join(
+            f"{n}\n{s} --> {e}\n{_legal(t)}\n\n" for n, (s, e, t) in enumerate(zip(starts, ends, texts), start=1)
+        )
+
+    def to_ass(self, font: str, font_size: int, play_res: tuple = (1920, 1080)) -> str:
+        """ASS script with one bottom-centred ``Default`` style."""
+        keep = np.fromiter((bool(t.strip()) for t in self.text), dtype=bool, count=len(self)) & (self.end > self.start)
+        starts = _timestamps(np.floor(np.maximum(self.start[keep], 0) * 100).astype(np.int64), ".", 2, hour_width=1)
+        ends = _timestamps(np.floor(np.maximum(self.end[keep], 0) * 100).astype(np.int64), ".", 2, hour_width=1)
+        header = (
+            "[Script Info]\n"
+            "ScriptType: v4.00+\n"
+            f"PlayResX: {play_res[0]}\n"
+            f"PlayResY: {play_res[1]}\n"
+            "WrapStyle: 0\n"
+            "ScaledBorderAndShadow: yes\n\n"
+            "[V4+ Styles]\n"
+            "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+            "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+            "Alignment, MarginL, MarginR, MarginV, Encoding\n"
+            f"Style: Default,{font},{font_size},&H00FFFFFF,&H000000FF,&H00000000,&H64000000,"
+            "0,0,0,0,100,100,0,0,1,2,0,2,20,20,40,1\n\n"
+            "[Events]\n"
+            "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
+        )
+        events = "".join(
+            f"Dialogue: 0,{s},{e},Default,,0,0,0,,{_ass_text(t)}\n"
+            for s, e, t in zip(starts, ends, self.text[keep].tolist())
+        )
+        return header + events
+
+
+Segments = Union[List[dict], SegmentTable]
+
+
+def segment_texts(segments: Segments) -> List[str]:
+    """Texts of either segment form, without building per-segment dicts for a table."""
+    if isinstance(segments, SegmentTable):
+        return segments.texts
+    return [seg["text"] for seg in segments]
+
+
+def segment_dicts(segments: Segments) -> List[dict]:
+    return segments.to_dicts() if isinstance(segments, SegmentTable) else segments
+
+
+def _timestamps(units: np.ndarray, sep: str, digits: int, hour_width: int = 2) -> List[str]:
+    """``HH:MM:SS<sep>fff`` strings from integer milliseconds (digits=3) or centiseconds (digits=2)."""
+    per_second = 10**digits
+    seconds, frac = np.divmod(units, per_second)
+    minutes, secs = np.divmod(seconds, 60)
+    hours, mins = np.divmod(minutes, 60)
+    return [
+        f"{h:0{hour_width}d}:{m:02d}:{s:02d}{sep}{f:0{digits}d}"
+        for h, m, s, f in zip(hours.tolist(), mins.tolist(), secs.tolist(), frac.tolist())
+    ]
+
+
+def _legal(text: str) -> str:
+    # srt's strict mode: no blank lines inside a block, none leading or trailing.
+    if text and text[0] != "\n" and "\n\n" not in text:
+        return text
+    return _BLANK_LINES.sub("\n", text.strip("\n"))
+
+
+def _ass_text(text: str) -> str:
+    return text.strip().replace("{", "\\{").replace("}", "\\}").replace("\r", "").replace("\n", "\\N")
+
+
+def _split_text(text: str, parts: int) -> List[str]:
+    """Up to ``parts`` pieces of roughly equal length, breaking after whitespace when there is any."""
+    text = text.strip()
+    words = [w for w in _WORD_BREAK.split(text) if w]
+    if len(words) < 2:
+        step = -(-len(text) // parts)
+        return [text[i : i + step] for i in range(0, len(text), step)] or [text]
+    target = len(text) / parts
+    chunks: List[str] = []
+    current = ""
+    for word in words:
+        if current and len(current) + len(word) / 2 > target and len(chunks) < parts - 1:
+            chunks.append(current.strip())
+            current = ""
+        current += word
+    chunks.append(current.strip())
+    return chunks
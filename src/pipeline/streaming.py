@@ -0,0 +1,52 @@
+"""Helpers for passing segments between pipeline stages before a file is complete."""
+
+from __future__ import annotations
+
+import queue
+from typing import Iterable, Iterator, List, Optional
+
+
+class SegmentFeed:
+    """
+    Single-producer, single-consumer segment channel.
+
+    The producer calls ``put`` per finalized segment and ``close`` (or ``fail``) once;
+    iterating blocks until the next segment arrives and re-raises a producer failure.
+    """
+
+    _END = object()
+
+    def __init__(self) -> None:
+        self._queue: "queue.Queue[object]" = queue.Queue()
+        self._error: Optional[BaseException] = None
+
+    def put(self, segment: dict) -> None:
+        self._queue.put(segment)
+
+    def close(self) -> None:
+        self._queue.put(self._END)
+
+    def fail(self, exc: BaseException) -> None:
+        self._error = exc
+        self._queue.put(self._END)
+
+    def __iter__(self) -> Iterator[dict]:
+        while True:
+            item = self._queue.get()
+            if item is self._END:
+                if self._error is not None:
+                    raise self._error
+                return
+            yield item  # type: ignore[misc]
+
+
+def micro_batches(segments: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    """Group a (possibly still growing) segment stream into lists of at most ``size``."""
+    batch: List[dict] = []
+    for seg in segments:
+        batch.append(seg)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -1,30 +1,68 @@
-"""Subtitle helpers: build and save SRT files from segments."""
+"""Subtitle helpers: build and save SRT/ASS files from segments (dict lists or ``SegmentTable``)."""
 
 from __future__ import annotations
 
 import os
-from datetime import timedelta
-from typing import List
+from typing import TYPE_CHECKING, List
 
 import srt
 
+if TYPE_CHECKING:  # numpy-backed; imported on first use to keep it off the GUI import path
+    from src.pipeline.segments import Segments
 
-def segments_to_srt_text(segments: List[dict]) -> str:
-    subtitles = [
-        srt.Subtitle(
-            index=i + 1,
-            start=timedelta(seconds=seg["start"]),
-            end=timedelta(seconds=seg["end"]),
-            content=seg["text"],
-        )
-        for i, seg in enumerate(segments)
-    ]
-    return srt.compose(subtitles)
 
+def segments_to_srt_text(segments: "Segments") -> str:
+    """Same output as ``srt.compose``, written straight from the timing columns."""
+    from src.pipeline.segments import SegmentTable
+
+    return SegmentTable.from_dicts(segments).to_srt()
 
-def save_srt(segments: List[dict], output_path: str) -> str:
+
+def save_srt(segments: "Segments", output_path: str) -> str:
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     srt_text = segments_to_srt_text(segments)
     with open(output_path, "w", encoding="utf-8") as fh:
         fh.write(srt_text)
     return output_path
+
+
+def save_ass(segments: "Segments", output_path: str, font: str, font_size: int) -> str:
+    from src.pipeline.segments import SegmentTable
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as fh:
+        fh.write(SegmentTable.from_dicts(segments).to_ass(font, font_size))
+    return output_path
+
+
+def load_srt(path: str) -> List[dict]:
+    with open(path, "r", encoding="utf-8") as fh:
+        return [
+            {
+                "start": sub.start.total_seconds(),
+                "end": sub.end.total_seconds(),
+                "text": sub.content,
+            }
+            for sub in srt.parse(fh.read())
+        ]
+
+
+def slice_segments(segments: "Segments", start: float, end: float) -> "Segments":
+    """Segments overlapping ``[start, end)``, shifted so ``start`` becomes 0 and clamped to the range."""
+    from src.pipeline.segments import SegmentTable
+
+    if isinstance(segments, SegmentTable):
+        return segments.window(start, end)
+    length = end - start
+    sliced: List[dict] = []
+    for seg in segments:
+        if seg["end"] <= start or seg["start"] >= end:
+            continue
+        sliced.append(
+            {
+                "start": max(0.0, seg["start"] - start),
+                "end": min(length, seg["end"] - start),
+                "text": seg["text"],
+            }
+        )
+    return sliced
@@ -2,11 +2,16 @@
 
 from __future__ import annotations
 
-import os
-from typing import Callable, Dict, List, Optional
+from typing import Callable, Dict, Iterator, List, Optional, Union
 
+import numpy as np
 import torch
-import whisper
+
+from src.pipeline.audio import extract_audio
+from src.pipeline.cache import TranscriptionCache, array_digest
+from src.pipeline.chunking import find_chunks, owned_segments, transcribe_parallel
+from src.pipeline.daemon import DaemonClient
+from src.pipeline.models import load_whisper, registry
 
 
 ProgressFn = Optional[Callable[[str], None]]
@@ -17,27 +22,89 @@ def _log(message: str, cb: ProgressFn) -> None:
         cb(message)
 
 
+def preload_whisper(model_size: str, device: Optional[str] = None, progress_cb: ProgressFn = None) -> None:
+    """Load the Whisper model into the registry so the first transcription skips the cold start."""
+    device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+    if not registry.is_loaded(("whisper", model_size, device, "fp32")):
+        _log(f"加载 Whisper 模型 ({model_size})...", progress_cb)
+    load_whisper(model_size, device)
+
+
 def transcribe_video(
-    video_path: str,
+    audio: Union[np.ndarray, str],
     model_size: str = "medium",
     language: Optional[str] = None,
     device: Optional[str] = None,
     progress_cb: ProgressFn = None,
+    cache: Optional[TranscriptionCache] = None,
+    decode_options: Optional[Dict[str, object]] = None,
+    parallel_workers: int = 0,
+    daemon: Optional[DaemonClient] = None,
 ) -> Dict[str, object]:
     """
-    Run Whisper on a single video and return detected language plus segments.
+    Run Whisper on 16 kHz mono PCM and return detected language plus segments.
+
+    ``audio`` is normally the memmap from ``extract_audio``; a video path is still
+    accepted and decoded through the same cached extraction.
+
+    When ``cache`` is given, a previous result for the same decoded audio, model size,
+    language and decode options is returned without loading Whisper at all.
+
+    With ``parallel_workers`` > 1 the audio is split at silences and the chunks are
+    transcribed in that many worker processes (see ``src.pipeline.chunking``). With
+    ``daemon`` the audio is sent to the long-lived model daemon instead.
 
     Returns:
         {"language": "en", "segments": [{"start": 0.0, "end": 1.2, "text": "..."}]}
     """
-    resolved = os.path.abspath(video_path)
-    _log(f"加载 Whisper 模型 ({model_size})...", progress_cb)
+    if isinstance(audio, str):
+        audio = extract_audio(audio, progress_cb=progress_cb)
+    decode_options = dict(decode_options or {})
+
+    cache_key: Optional[str] = None
+    if cache is not None:
+        key_options = dict(decode_options, chunked=parallel_workers > 1)
+        cache_key = cache.make_key(array_digest(audio), model_size, language, key_options)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            _log("命中转写缓存，跳过语音识别", progress_cb)
+            return cached
+
+    if daemon is not None:
+        _log("交给模型守护进程识别...", progress_cb)
+        transcription = daemon.transcribe(audio, model_size, language, decode_options)
+        _log("识别完成", progress_cb)
+        if cache is not None and cache_key is not None:
+            cache.put(cache_key, transcription)
+        return transcription
+
     device = device or ("cuda" if torch.cuda.is_available() else "cpu")
-    model = whisper.load_model(model_size, device=device)
+    if parallel_workers > 1:
+        chunks = find_chunks(audio)
+        if len(chunks) > 1:
+            workers = min(parallel_workers, len(chunks))
+            _log(f"按静音切分为 {len(chunks)} 段，{workers} 个进程并行识别...", progress_cb)
+            transcription = transcribe_parallel(
+                audio,
+                model_size,
+                language,
+                device,
+                workers,
+                decode_options=decode_options,
+                chunks=chunks,
+            )
+            _log("识别完成", progress_cb)
+            if cache is not None and cache_key is not None:
+                cache.put(cache_key, transcription)
+            return transcription
+
+    if not registry.is_loaded(("whisper", model_size, device, "fp32")):
+        _log(f"加载 Whisper 模型 ({model_size})...", progress_cb)
+    model = load_whisper(model_size, device)
 
     _log("开始语音识别...", progress_cb)
-    result = model.transcribe(resolved, language=language, verbose=False)
-    segments = [
+    result = model.transcribe(audio, language=language, verbose=False, **decode_options)
+    segments: List[dict] = [
         {
             "start": float(seg["start"]),
             "end": float(seg["end"]),
@@ -47,4 +114,97 @@ def transcribe_video(
     ]
 
     _log("识别完成", progress_cb)
-    return {"language": result.get("language", language), "segments": segments}
+    transcription: Dict[str, object] = {
+        "language": result.get("language", language),
+        "segments": segments,
+    }
+    if cache is not None and cache_key is not None:
+        cache.put(cache_key, transcription)
+    return transcription
+
+
+class TranscriptStream:
+    """
+    Iterate finalized segments window by window instead of waiting for the whole file.
+
+    The audio is cut at silences into ``window_seconds`` windows that Whisper handles one
+    after another; each window's segments are yielded as soon as it is decoded, so the
+    translation stage can start after the first window. ``language`` is set before the
+    first segment is yielded (detected on the first window unless given).
+    """
+
+    def __init__(
+        self,
+        audio: Union[np.ndarray, str],
+        model_size: str = "medium",
+        language: Optional[str] = None,
+        device: Optional[str] = None,
+        progress_cb: ProgressFn = None,
+        cache: Optional[TranscriptionCache] = None,
+        decode_options: Optional[Dict[str, object]] = None,
+        window_seconds: float = 60.0,
+    ) -> None:
+        self.audio = audio
+        self.model_size = model_size
+        self.language = language
+        self.device = device
+        self.progress_cb = progress_cb
+        self.cache = cache
+        self.decode_options = dict(decode_options or {})
+        self.window_seconds = window_seconds
+
+    def __iter__(self) -> Iterator[dict]:
+        audio = self.audio
+        if isinstance(audio, str):
+            audio = extract_audio(audio, progress_cb=self.progress_cb)
+
+        cache_key: Optional[str] = None
+        if self.cache is not None:
+            key_options = dict(self.decode_options, streamed=self.window_seconds)
+            cache_key = self.cache.make_key(array_digest(audio), self.model_size, self.language, key_options)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                _log("命中转写缓存，跳过语音识别", self.progress_cb)
+                self.language = cached.get("language") or self.language  # type: ignore[assignment]
+                yield from cached["segments"]  # type: ignore[misc]
+                return
+
+        device = self.device or ("cuda" if torch.cuda.is_available() else "cpu")
+        if not registry.is_loaded(("whisper", self.model_size, device, "fp32")):
+            _log(f"加载 Whisper 模型 ({self.model_size})...", self.progress_cb)
+        model = load_whisper(self.model_size, device)
+
+        chunks = find_chunks(
+            audio,
+            target_seconds=self.window_seconds,
+            search_seconds=self.window_seconds / 4,
+            overlap=0.5,
+        )
+        _log(f"开始语音识别（流式，{len(chunks)} 个窗口）...", self.progress_cb)
+        collected: List[dict] = []
+        for i, chunk in enumerate(chunks):
+            options = dict(self.decode_options)
+            if collected and "initial_prompt" not in options:
+                # Carry context across windows the way Whisper does within one pass.
+                options["initial_prompt"] = collected[-1]["text"]
+            result = model.transcribe(
+                np.array(audio[chunk.start : chunk.end]),
+                language=self.language,
+                verbose=None,
+                **options,
+            )
+            if self.language is None:
+                self.language = result.get("language")
+            raw = [
+                {"start": float(seg["start"]), "end": float(seg["end"]), "text": str(seg["text"]).strip()}
+                for seg in result.get("segments", [])
+            ]
+            for seg in owned_segments(chunk, raw, is_last=i == len(chunks) - 1):
+                if collected and seg["start"] < collected[-1]["end"]:
+                    seg["start"] = min(collected[-1]["end"], seg["end"])
+                collected.append(seg)
+                yield seg
+
+        _log("识别完成", self.progress_cb)
+        if self.cache is not None and cache_key is not None:
+            self.cache.put(cache_key, {"language": self.language, "segments": collected})
@@ -2,24 +2,62 @@
 
 from __future__ import annotations
 
-from typing import Callable, Iterable, List, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
 
 import torch
 from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+from transformers.modeling_outputs import BaseModelOutput
+
+from src.config import TRANSLATION_TOKEN_BUDGET
+from src.pipeline.daemon import DaemonClient
+from src.pipeline.memory import TranslationMemory, normalize_text
+from src.pipeline.models import registry
+from src.pipeline.segments import Segments, SegmentTable, segment_texts
+from src.pipeline.streaming import micro_batches
 
 ProgressFn = Optional[Callable[[str], None]]
 
 
+def _pack_by_budget(lengths: List[int], token_budget: int, max_batch: int) -> List[List[int]]:
+    """
+    Group positions of ``lengths`` (sorted longest first) into consecutive batches whose
+    padded size, ``len(batch) * longest``, stays within ``token_budget``.
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    longest = 0
+    for pos, length in enumerate(lengths):
+        width = max(longest, length, 1)
+        if current and ((len(current) + 1) * width > token_budget or len(current) >= max_batch):
+            batches.append(current)
+            current, width = [], max(length, 1)
+        current.append(pos)
+        longest = width
+    if current:
+        batches.append(current)
+    return batches
+
+
 class Translator:
     def __init__(
         self,
         model_name: str = "facebook/m2m100_418M",
         device: Optional[str] = None,
         progress_cb: ProgressFn = None,
+        memory: Optional[TranslationMemory] = None,
+        token_budget: int = TRANSLATION_TOKEN_BUDGET,
+        precision: str = "fp32",
+        num_threads: int = 0,
+        daemon: Optional[DaemonClient] = None,
     ) -> None:
         self.model_name = model_name
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
         self.progress_cb = progress_cb
+        self.memory = memory
+        self.token_budget = token_budget
+        self.precision = precision
+        self.num_threads = num_threads
+        self.daemon = daemon
         self._tokenizer: Optional[AutoTokenizer] = None
         self._model: Optional[AutoModelForSeq2SeqLM] = None
 
@@ -29,67 +67,210 @@ class Translator:
 
     def _ensure_model(self) -> None:
         if self._tokenizer is None or self._model is None:
-            self._log(f"加载翻译模型 {self.model_name} ({self.device})...")
-            self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-            self._model = AutoModelForSeq2SeqLM.from_pretrained(self.model_name)
-            self._model.to(self.device)
+            if self.num_threads > 0:
+                torch.set_num_threads(self.num_threads)
+            key = ("m2m", self.model_name, self.device, self.precision)
+            if not registry.is_loaded(key):
+                self._log(f"加载翻译模型 {self.model_name} ({self.device}, {self.precision})...")
+            self._tokenizer, self._model = registry.get(key, self._load)
+
+    def warm_up(self) -> None:
+        """Load the model now instead of on the first batch."""
+        if self.daemon is None:
+            self._ensure_model()
+
+    def _load(self) -> tuple:
+        tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        model = AutoModelForSeq2SeqLM.from_pretrained(self.model_name)
+        model.eval()
+        model = self._apply_precision(model)
+        model.to(self.device)
+        return tokenizer, model
+
+    def _apply_precision(self, model: AutoModelForSeq2SeqLM) -> AutoModelForSeq2SeqLM:
+        if self.precision == "bf16":
+            return model.to(dtype=torch.bfloat16)
+        if self.precision == "int8":
+            if self.device != "cpu":
+                self._log("int8 动态量化仅支持 CPU，改用 fp32")
+                return model
+            # Dynamic quantization: Linear weights stored as int8, activations quantized per batch.
+            return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        if self.precision != "fp32":
+            raise ValueError(f"Unknown translation precision: {self.precision}")
+        return model
+
+    @property
+    def memory_backend(self) -> str:
+        """Translation memory key; precision is part of it, so int8/bf16 output never stands in for fp32."""
+        return f"m2m:{self.model_name}:{self.precision}"
 
     def translate_texts(
         self,
         texts: Iterable[str],
         source_lang: str,
         target_lang: str,
-        max_batch: int = 6,
+        token_budget: Optional[int] = None,
+        max_batch: int = 64,
     ) -> List[str]:
+        """
+        Translate ``texts`` and return results in input order.
+
+        Identical texts are translated once. The unique texts are sorted by tokenized
+        length and packed so each batch stays within ``token_budget`` padded tokens,
+        which keeps one long line from padding a whole batch of short ones.
+        """
+        return self.translate_texts_multi(texts, source_lang, [target_lang], token_budget, max_batch)[
+            target_lang
+        ]
+
+    def translate_texts_multi(
+        self,
+        texts: Iterable[str],
+        source_lang: str,
+        target_langs: List[str],
+        token_budget: Optional[int] = None,
+        max_batch: int = 64,
+    ) -> Dict[str, List[str]]:
+        """
+        Translate ``texts`` into every language of ``target_langs``.
+
+        Batching is as in ``translate_texts``; the encoder runs once per batch and only
+        the decoder runs once per target language.
+        """
+        texts = list(texts)
+        if not texts or not target_langs:
+            return {lang: [] for lang in target_langs}
+        if self.daemon is not None:
+            return {
+                lang: self.daemon.translate_texts(
+                    texts,
+                    source_lang,
+                    lang,
+                    model_name=self.model_name,
+                    precision=self.precision,
+                    token_budget=token_budget or self.token_budget,
+                )
+                for lang in target_langs
+            }
         self._ensure_model()
         assert self._tokenizer and self._model
         self._tokenizer.src_lang = source_lang
         device = torch.device(self.device)
+        budget = token_budget or self.token_budget
 
-        outputs: List[str] = []
-        batch: List[str] = []
+        unique = list(dict.fromkeys(texts))
+        encoded = self._tokenizer(unique, truncation=True, max_length=512)["input_ids"]
+        order = sorted(range(len(unique)), key=lambda i: len(encoded[i]), reverse=True)
 
-        def flush_batch() -> None:
-            nonlocal outputs, batch
-            if not batch:
-                return
-            inputs = self._tokenizer(
-                batch,
+        translated: Dict[str, Dict[str, str]] = {lang: {} for lang in target_langs}
+        for batch in _pack_by_budget([len(encoded[i]) for i in order], budget, max_batch):
+            members = [order[j] for j in batch]
+            inputs = self._tokenizer.pad(
+                {"input_ids": [encoded[i] for i in members]},
                 return_tensors="pt",
-                padding=True,
-                truncation=True,
-                max_length=512,
             ).to(device)
-            generated_tokens = self._model.generate(
-                **inputs,
-                forced_bos_token_id=self._tokenizer.get_lang_id(target_lang),
-                max_length=512,
-            )
-            outputs.extend(self._tokenizer.batch_decode(generated_tokens, skip_special_tokens=True))
-            batch = []
-
-        for text in texts:
-            batch.append(text)
-            if len(batch) >= max_batch:
-                flush_batch()
-        flush_batch()
-        return outputs
+            with torch.no_grad():
+                hidden = self._model.get_encoder()(**inputs).last_hidden_state
+            for lang in target_langs:
+                # generate() expands encoder outputs in place for beam search, so each
+                # target gets its own wrapper around the shared hidden states.
+                generated_tokens = self._model.generate(
+                    encoder_outputs=BaseModelOutput(last_hidden_state=hidden),
+                    attention_mask=inputs["attention_mask"],
+                    forced_bos_token_id=self._tokenizer.get_lang_id(lang),
+                    max_length=512,
+                )
+                decoded = self._tokenizer.batch_decode(generated_tokens, skip_special_tokens=True)
+                for i, text in zip(members, decoded):
+                    translated[lang][unique[i]] = text
+        return {lang: [translated[lang][text] for text in texts] for lang in target_langs}
 
     def translate_segments(
         self,
-        segments: List[dict],
+        segments: Segments,
         source_lang: str,
         target_lang: str,
-    ) -> List[dict]:
-        texts = [seg["text"] for seg in segments]
-        translated = self.translate_texts(texts, source_lang, target_lang)
-        merged: List[dict] = []
-        for seg, new_text in zip(segments, translated):
-            merged.append(
-                {
-                    "start": seg["start"],
-                    "end": seg["end"],
-                    "text": new_text.strip(),
-                }
+    ) -> Segments:
+        if self.memory is None:
+            return self._translate_segments(segments, source_lang, target_lang)
+        return self.memory.translate_segments(
+            segments,
+            lambda misses, _on_segment: self._translate_segments(misses, source_lang, target_lang),
+            source_lang=source_lang,
+            target_lang=target_lang,
+            backend=self.memory_backend,
+            progress_cb=self.progress_cb,
+        )
+
+    def translate_segments_multi(
+        self,
+        segments: Segments,
+        source_lang: str,
+        target_langs: List[str],
+    ) -> Dict[str, Segments]:
+        """
+        Translate ``segments`` into several languages, sharing one encoder pass per batch.
+
+        With translation memory, only texts missing for at least one target are sent to
+        the model, and targets that miss nothing are skipped.
+        """
+        texts = segment_texts(segments)
+        if self.memory is None:
+            results = self.translate_texts_multi(texts, source_lang, target_langs)
+            return {lang: _merge(segments, results[lang]) for lang in target_langs}
+
+        backend = self.memory_backend
+        keys = {normalize_text(text) for text in texts} - {""}
+        # One lookup per target, reused below: a second one would count every hit twice and
+        # could disagree with the first if the memory is pruned in between.
+        known = {lang: self.memory.lookup(keys, source_lang, lang, backend) for lang in target_langs}
+        missing = {lang: keys - set(known[lang]) for lang in target_langs}
+        needed = [lang for lang in target_langs if missing[lang]]
+        any_missing = set().union(*missing.values())
+        pending = list(dict.fromkeys(text for text in texts if normalize_text(text) in any_missing))
+        fresh = self.translate_texts_multi(pending, source_lang, needed)
+        fresh_by_lang = {lang: dict(zip(pending, fresh[lang])) for lang in needed}
+
+        out: Dict[str, List[dict]] = {}
+        for lang in target_langs:
+            table = fresh_by_lang.get(lang, {})
+            out[lang] = self.memory.translate_segments(
+                segments,
+                lambda misses, _on_segment, table=table: _merge(misses, [table[m["text"]] for m in misses]),
+                source_lang=source_lang,
+                target_lang=lang,
+                backend=backend,
+                progress_cb=self.progress_cb,
+                known=known[lang],
             )
-        return merged
+        return out
+
+    def translate_stream(
+        self,
+        segments: Iterable[dict],
+        source_lang: str,
+        target_lang: str,
+        micro_batch: int = 16,
+    ) -> Iterator[dict]:
+        """Translate a segment stream (e.g. ``TranscriptStream``) in micro-batches, in order."""
+        for batch in micro_batches(segments, micro_batch):
+            yield from self.translate_segments(batch, source_lang, target_lang)
+
+    def _translate_segments(
+        self,
+        segments: Segments,
+        source_lang: str,
+        target_lang: str,
+    ) -> Segments:
+        return _merge(segments, self.translate_texts(segment_texts(segments), source_lang, target_lang))
+
+
+def _merge(segments: Segments, translated: List[str]) -> Segments:
+    """Copy segment timings onto their translated texts."""
+    if isinstance(segments, SegmentTable):
+        return segments.with_texts(translated)
+    return [
+        {"start": seg["start"], "end": seg["end"], "text": new_text.strip()}
+        for seg, new_text in zip(segments, translated)
+    ]
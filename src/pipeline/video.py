@@ -2,13 +2,20 @@
 
 from __future__ import annotations
 
+import collections
+import json
 import os
 import shlex
 import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Deque, Dict, List, Optional, Tuple
 
-from src.config import DEFAULT_FONT, DEFAULT_FONT_SIZE
+from src.config import DEFAULT_FONT, DEFAULT_FONT_SIZE, ENCODER_PROFILES, LANG_ISO639_2
+from src.pipeline.subtitles import load_srt, save_srt, slice_segments
 
 
 def _escape_for_subtitles(path: Path) -> str:
@@ -19,6 +26,296 @@ def _escape_for_subtitles(path: Path) -> str:
     return path.as_posix().replace(":", r"\:").replace("'", r"\\'")
 
 
+PercentFn = Optional[Callable[[float], None]]
+
+
+class CancelledError(RuntimeError):
+    """Raised when a running FFmpeg job was stopped through its cancel event."""
+
+
+def encoder_args(profile: str = "balanced", threads: int = 0) -> List[str]:
+    """Video encoder options for a profile code from ``ENCODER_PROFILES``."""
+    spec: Dict[str, str] = next((p for p in ENCODER_PROFILES if p["code"] == profile), ENCODER_PROFILES[1])
+    args = ["-c:v", spec["codec"], "-preset", spec["preset"], "-crf", spec["crf"]]
+    if threads > 0:
+        args += ["-threads", str(threads)]
+    return args
+
+
+def run_ffmpeg(
+    cmd: List[str],
+    duration: float = 0.0,
+    percent_cb: PercentFn = None,
+    cancel_event: Optional[threading.Event] = None,
+) -> Dict[str, str]:
+    """
+    Run an FFmpeg command with ``-progress pipe:1`` and report percent of ``duration``.
+
+    Returns the last progress block (``frame``, ``fps``, ``out_time_us``, ...).
+
+    Setting ``cancel_event`` terminates the process (then kills it if it does not exit)
+    and raises ``CancelledError``; the caller owns cleanup of partial outputs. The
+    grace period is short because x264 keeps flushing its lookahead after SIGTERM.
+    """
+    full = [cmd[0], "-nostdin", "-nostats", "-progress", "pipe:1", *cmd[1:]]
+    proc = subprocess.Popen(
+        full,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    stderr_tail: Deque[str] = collections.deque(maxlen=20)
+
+    def drain_stderr() -> None:
+        assert proc.stderr is not None
+        for line in proc.stderr:
+            stderr_tail.append(line.rstrip())
+
+    def watch_cancel() -> None:
+        assert cancel_event is not None
+        while proc.poll() is None:
+            if cancel_event.wait(0.2):
+                proc.terminate()
+                try:
+                    proc.wait(timeout=2)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                return
+
+    helpers = [threading.Thread(target=drain_stderr, daemon=True)]
+    if cancel_event is not None:
+        helpers.append(threading.Thread(target=watch_cancel, daemon=True))
+    for helper in helpers:
+        helper.start()
+
+    last = -1
+    stats: Dict[str, str] = {}
+    assert proc.stdout is not None
+    for line in proc.stdout:
+        key, _, value = line.strip().partition("=")
+        if key:
+            stats[key] = value
+        # out_time_ms is (despite its name) in microseconds, same as out_time_us.
+        if key in ("out_time_us", "out_time_ms") and duration > 0 and percent_cb:
+            try:
+                seconds = int(value) / 1_000_000
+            except ValueError:
+                continue
+            percent = max(0.0, min(100.0, seconds / duration * 100))
+            if int(percent) != last:
+                last = int(percent)
+                percent_cb(percent)
+        elif key == "progress" and value == "end" and percent_cb:
+            percent_cb(100.0)
+
+    returncode = proc.wait()
+    for helper in helpers:
+        helper.join(timeout=1)
+    if cancel_event is not None and cancel_event.is_set():
+        raise CancelledError("FFmpeg job cancelled")
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, full, stderr="\n".join(stderr_tail))
+    return stats
+
+
+def _subtitle_filter(subtitle_path: Path, font: str, font_size: int) -> str:
+    subtitle_arg = _escape_for_subtitles(subtitle_path)
+    style = (
+        f"Fontname={font},Fontsize={font_size},PrimaryColour=&H00FFFFFF&,"
+        f"Outline=1,BorderStyle=3,BackColour=&H50000000&"
+    )
+    return f"subtitles='{subtitle_arg}':charenc=UTF-8:force_style='{style}'"
+
+
+def probe_duration(video_path: str) -> float:
+    """Container duration in seconds via ffprobe (0.0 when unknown)."""
+    out = subprocess.run(
+        [
+            "ffprobe",
+            "-v",
+            "error",
+            "-show_entries",
+            "format=duration",
+            "-of",
+            "default=noprint_wrappers=1:nokey=1",
+            str(video_path),
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+    try:
+        return float(out)
+    except ValueError:
+        return 0.0
+
+
+@dataclass
+class MediaInfo:
+    """What ``probe_media`` found out about one input file."""
+
+    path: str
+    duration: float = 0.0
+    format_name: str = ""
+    audio_codecs: List[str] = field(default_factory=list)
+    # Cover art (attached pictures) is not counted as video.
+    video_codecs: List[str] = field(default_factory=list)
+    subtitle_streams: int = 0
+    # Why the file could not be probed at all (missing, unreadable, not media).
+    error: str = ""
+    # False when ffprobe itself is unavailable; nothing else is known then.
+    probed: bool = True
+
+    @property
+    def has_audio(self) -> bool:
+        return bool(self.audio_codecs)
+
+    @property
+    def has_video(self) -> bool:
+        return bool(self.video_codecs)
+
+
+def probe_media(video_path: str, timeout: float = 60.0) -> MediaInfo:
+    """Duration, streams and codecs of ``video_path`` from one ffprobe call (container headers only)."""
+    info = MediaInfo(path=str(video_path))
+    if not os.path.isfile(video_path):
+        info.error = "文件不存在"
+        return info
+    try:
+        proc = subprocess.run(
+            [
+                "ffprobe",
+                "-v",
+                "error",
+                "-show_entries",
+                "format=duration,format_name:stream=codec_type,codec_name,duration:stream_disposition=attached_pic",
+                "-of",
+                "json",
+                str(video_path),
+            ],
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            timeout=timeout,
+        )
+    except FileNotFoundError:
+        info.probed = False
+        return info
+    except subprocess.TimeoutExpired:
+        info.error = f"ffprobe 超过 {timeout:.0f}s 未返回"
+        return info
+    try:
+        data = json.loads(proc.stdout or "{}")
+    except ValueError:
+        data = {}
+    if proc.returncode != 0 or "format" not in data:
+        lines = proc.stderr.strip().splitlines()
+        info.error = f"无法读取媒体信息：{lines[-1] if lines else f'ffprobe 退出码 {proc.returncode}'}"
+        return info
+
+    info.format_name = data["format"].get("format_name", "")
+    durations = [data["format"].get("duration")]
+    for stream in data.get("streams", []):
+        codec = stream.get("codec_name") or "unknown"
+        kind = stream.get("codec_type")
+        if kind == "audio":
+            info.audio_codecs.append(codec)
+        elif kind == "video" and not stream.get("disposition", {}).get("attached_pic"):
+            info.video_codecs.append(codec)
+        elif kind == "subtitle":
+            info.subtitle_streams += 1
+        durations.append(stream.get("duration"))
+    # The container duration, else the first stream that reports one (e.g. raw streams).
+    for value in durations:
+        try:
+            seconds = float(value)
+        except (TypeError, ValueError):
+            continue
+        if seconds > 0:
+            info.duration = seconds
+            break
+    return info
+
+
+def probe_keyframes(video_path: str) -> List[float]:
+    """
+    Keyframe times of the first video stream on the timeline input ``-ss`` seeks on,
+    i.e. relative to the container's ``start_time`` (FFmpeg adds it to every input
+    seek). Falls back to the stream's first packet when the container reports none.
+
+    Reads packet flags only (no decoding), so it is cheap even for long files.
+    """
+    out = subprocess.run(
+        [
+            "ffprobe",
+            "-v",
+            "error",
+            "-select_streams",
+            "v:0",
+            "-show_entries",
+            "format=start_time:packet=pts_time,flags",
+            "-of",
+            "csv=print_section=1",
+            str(video_path),
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    times: List[float] = []
+    first: Optional[float] = None
+    start: Optional[float] = None
+    for line in out.splitlines():
+        section, _, rest = line.partition(",")
+        value_text, _, flags = rest.partition(",")
+        try:
+            value = float(value_text)
+        except ValueError:
+            continue
+        if section == "format":
+            start = value
+        elif section == "packet":
+            first = value if first is None else min(first, value)
+            if "K" in flags:
+                times.append(value)
+    base = start if start is not None else first or 0.0
+    return sorted({round(max(0.0, t - base), 6) for t in times})
+
+
+def plan_ranges(keyframes: List[float], duration: float, parts: int) -> List[Tuple[float, float]]:
+    """Split ``[0, duration)`` into up to ``parts`` ranges that all start on a keyframe."""
+    cuts = [0.0]
+    for i in range(1, parts):
+        ideal = duration * i / parts
+        candidates = [k for k in keyframes if cuts[-1] < k < duration]
+        if not candidates:
+            break
+        best = min(candidates, key=lambda k: abs(k - ideal))
+        if best > cuts[-1]:
+            cuts.append(best)
+    cuts.append(duration)
+    return [(a, b) for a, b in zip(cuts[:-1], cuts[1:]) if b > a]
+
+
+def _split_graph(subtitle_paths: List[Path], font: str, font_size: int) -> Tuple[str, List[str]]:
+    """
+    A filtergraph that decodes the first video stream once and renders each subtitle
+    file onto its own branch; returns the graph and the output pad labels.
+    """
+    n = len(subtitle_paths)
+    labels = [f"[v{i}]" for i in range(n)]
+    if n == 1:
+        return f"[0:v:0]{_subtitle_filter(subtitle_paths[0], font, font_size)}{labels[0]}", labels
+    branches = "".join(f"[s{i}]" for i in range(n))
+    chains = [f"[0:v:0]split={n}{branches}"]
+    for i, path in enumerate(subtitle_paths):
+        chains.append(f"[s{i}]{_subtitle_filter(path, font, font_size)}{labels[i]}")
+    return ";".join(chains), labels
+
+
 def burn_subtitles(
     video_path: str,
     srt_path: str,
@@ -26,39 +323,329 @@ def burn_subtitles(
     font: str = DEFAULT_FONT,
     font_size: int = DEFAULT_FONT_SIZE,
     progress_cb: Optional[callable] = None,
+    parallel: int = 1,
+    encoder_profile: str = "balanced",
+    threads: int = 0,
+    percent_cb: PercentFn = None,
+    cancel_event: Optional[threading.Event] = None,
+    stats: Optional[Dict[str, float]] = None,
 ) -> str:
     """
     Burn an SRT file into a video using FFmpeg.
+
+    ``encoder_profile`` picks preset/CRF from ``ENCODER_PROFILES``; ``percent_cb``
+    receives 0-100 as the encode advances and ``cancel_event`` stops it (the partial
+    output is removed and ``CancelledError`` raised).
+
+    With ``parallel`` > 1 the video is cut at keyframes into that many ranges, each
+    range is encoded by its own FFmpeg process with a time-shifted SRT slice, and the
+    parts are joined with the concat demuxer (``-c copy``) while the original audio is
+    stream-copied in one piece, so there are no audio seams or drift.
+    """
+    return burn_subtitles_multi(
+        video_path,
+        [(srt_path, output_path)],
+        font=font,
+        font_size=font_size,
+        progress_cb=progress_cb,
+        parallel=parallel,
+        encoder_profile=encoder_profile,
+        threads=threads,
+        percent_cb=percent_cb,
+        cancel_event=cancel_event,
+        stats=stats,
+    )[0]
+
+
+def burn_subtitles_multi(
+    video_path: str,
+    outputs: List[Tuple[str, str]],
+    font: str = DEFAULT_FONT,
+    font_size: int = DEFAULT_FONT_SIZE,
+    progress_cb: Optional[callable] = None,
+    parallel: int = 1,
+    encoder_profile: str = "balanced",
+    threads: int = 0,
+    percent_cb: PercentFn = None,
+    cancel_event: Optional[threading.Event] = None,
+    stats: Optional[Dict[str, float]] = None,
+    duration: float = 0.0,
+) -> List[str]:
+    """
+    Burn several SRT files into one video each, decoding the input only once.
+
+    ``outputs`` is a list of ``(srt_path, output_path)``. One FFmpeg process splits the
+    decoded video into a branch per output, each with its own subtitles filter and
+    encoder; the audio is stream-copied into every output. Options are as for
+    ``burn_subtitles``; with ``parallel`` > 1 every keyframe range is rendered to all
+    outputs in one process and each output is concatenated separately. ``stats``, when
+    given, receives ``frames`` (source frames encoded, per output). A known ``duration``
+    (e.g. from the pre-flight probe) saves probing the input again.
+    """
+    def _log(msg: str) -> None:
+        if progress_cb:
+            progress_cb(msg)
+
+    input_path = Path(video_path).resolve()
+    subtitle_paths = [Path(srt).resolve() for srt, _ in outputs]
+    targets = [Path(out).resolve() for _, out in outputs]
+    for target in targets:
+        target.parent.mkdir(parents=True, exist_ok=True)
+    if duration <= 0 and (parallel > 1 or percent_cb):
+        duration = probe_duration(str(input_path))
+
+    try:
+        if parallel > 1:
+            ranges = plan_ranges(probe_keyframes(str(input_path)), duration, parallel) if duration else []
+            if len(ranges) > 1:
+                _log(f"按关键帧切分为 {len(ranges)} 段并行压制...")
+                frames = _burn_ranges(
+                    input_path,
+                    subtitle_paths,
+                    targets,
+                    ranges,
+                    font,
+                    font_size,
+                    encoder_profile,
+                    threads,
+                    percent_cb,
+                    cancel_event,
+                )
+                if stats is not None:
+                    stats["frames"] = frames
+                _log("压制完成")
+                return [str(target) for target in targets]
+
+        graph, labels = _split_graph(subtitle_paths, font, font_size)
+        cmd = ["ffmpeg", "-y", "-v", "error", "-i", str(input_path), "-filter_complex", graph]
+        for label, target in zip(labels, targets):
+            cmd += [
+                "-map",
+                label,
+                "-map",
+                "0:a?",
+                *encoder_args(encoder_profile, threads),
+                "-c:a",
+                "copy",
+                str(target),
+            ]
+
+        if len(targets) > 1:
+            _log(f"调用 FFmpeg 一次解码同时压制 {len(targets)} 个输出...")
+        else:
+            _log("调用 FFmpeg 进行压制...")
+        result = run_ffmpeg(cmd, duration, percent_cb, cancel_event)
+        if stats is not None:
+            stats["frames"] = float(result.get("frame", 0) or 0)
+    except BaseException:
+        for target in targets:
+            if target.exists():
+                target.unlink()
+        raise
+    _log("压制完成")
+    return [str(target) for target in targets]
+
+
+# Containers whose only widely supported text subtitle codec is mov_text.
+_MP4_FAMILY = {".mp4", ".m4v", ".mov"}
+
+
+def soft_subtitle_suffix(video_path: str) -> str:
+    """Keep MP4-family inputs in MP4 (mov_text); everything else goes to MKV."""
+    return ".mp4" if Path(video_path).suffix.lower() in _MP4_FAMILY else ".mkv"
+
+
+def mux_subtitles(
+    video_path: str,
+    tracks: List[Tuple[str, str]],
+    output_path: str,
+    progress_cb: Optional[callable] = None,
+    cancel_event: Optional[threading.Event] = None,
+) -> str:
+    """
+    Attach subtitle files as selectable streams without re-encoding (``-c copy``).
+
+    ``tracks`` is a list of ``(subtitle_path, language_code)``; the first one is marked
+    default. MP4/MOV outputs get mov_text, MKV keeps SRT (or ASS for .ass inputs).
     """
     def _log(msg: str) -> None:
         if progress_cb:
             progress_cb(msg)
 
     input_path = Path(video_path).resolve()
-    subtitle_path = Path(srt_path).resolve()
     output = Path(output_path).resolve()
     output.parent.mkdir(parents=True, exist_ok=True)
+    mp4 = output.suffix.lower() in _MP4_FAMILY
 
-    subtitle_arg = _escape_for_subtitles(subtitle_path)
-    style = (
-        f"Fontname={font},Fontsize={font_size},PrimaryColour=&H00FFFFFF&,"
-        f"Outline=1,BorderStyle=3,BackColour=&H50000000&"
-    )
-    vf = f"subtitles='{subtitle_arg}':charenc=UTF-8:force_style='{style}'"
-
-    cmd = [
-        "ffmpeg",
-        "-y",
-        "-i",
-        str(input_path),
-        "-vf",
-        vf,
-        "-c:a",
-        "copy",
-        str(output),
-    ]
-
-    _log("调用 FFmpeg 进行压制...")
-    subprocess.run(cmd, check=True)
-    _log("压制完成")
+    cmd = ["ffmpeg", "-y", "-v", "error", "-i", str(input_path)]
+    for sub_path, _ in tracks:
+        cmd += ["-i", str(Path(sub_path).resolve())]
+    cmd += ["-map", "0:v?", "-map", "0:a?"]
+    for i in range(len(tracks)):
+        cmd += ["-map", f"{i + 1}:0"]
+    cmd += ["-c:v", "copy", "-c:a", "copy"]
+    for i, (sub_path, lang) in enumerate(tracks):
+        if mp4:
+            codec = "mov_text"
+        else:
+            codec = "ass" if sub_path.lower().endswith(".ass") else "srt"
+        cmd += [
+            f"-c:s:{i}",
+            codec,
+            f"-metadata:s:s:{i}",
+            f"language={LANG_ISO639_2.get(lang, 'und')}",
+            f"-disposition:s:{i}",
+            "default" if i == 0 else "0",
+        ]
+    cmd.append(str(output))
+
+    _log("封装软字幕（不重编码）...")
+    try:
+        run_ffmpeg(cmd, cancel_event=cancel_event)
+    except BaseException:
+        if output.exists():
+            output.unlink()
+        raise
+    _log("封装完成")
     return str(output)
+
+
+def _burn_ranges(
+    input_path: Path,
+    subtitle_paths: List[Path],
+    outputs: List[Path],
+    ranges: List[Tuple[float, float]],
+    font: str,
+    font_size: int,
+    encoder_profile: str,
+    threads: int,
+    percent_cb: PercentFn,
+    cancel_event: Optional[threading.Event],
+) -> float:
+    """Encode ``ranges`` in parallel and concatenate per output; returns frames per output."""
+    tracks = [load_srt(str(path)) for path in subtitle_paths]
+    threads = threads or max(1, (os.cpu_count() or len(ranges)) // len(ranges))
+    total = sum(end - start for start, end in ranges)
+    done = [0.0] * len(ranges)
+    lock = threading.Lock()
+
+    def part_progress(i: int) -> PercentFn:
+        if percent_cb is None:
+            return None
+        length = ranges[i][1] - ranges[i][0]
+
+        def report(percent: float) -> None:
+            with lock:
+                done[i] = length * percent / 100
+                overall = sum(done) / total * 100
+            percent_cb(overall)
+
+        return report
+
+    with tempfile.TemporaryDirectory(prefix=".burn-", dir=outputs[0].parent) as tmp:
+        workdir = Path(tmp)
+        # parts[j][i]: range i rendered for output j
+        parts: List[List[Path]] = [[] for _ in outputs]
+        commands: List[List[str]] = []
+        for i, (start, end) in enumerate(ranges):
+            part_srts: List[Path] = []
+            for j, segments in enumerate(tracks):
+                part_srt = workdir / f"out{j}_part{i:03d}.srt"
+                save_srt(slice_segments(segments, start, end), str(part_srt))
+                part_srts.append(part_srt)
+            graph, labels = _split_graph(part_srts, font, font_size)
+            # Input seeking lands exactly on the keyframe (``start`` is on the same
+            # start_time-relative timeline), so the part's clock starts at 0 and matches
+            # the shifted SRT slice.
+            cmd = [
+                "ffmpeg",
+                "-y",
+                "-v",
+                "error",
+                "-ss",
+                f"{start:.6f}",
+                "-i",
+                str(input_path),
+                "-filter_complex",
+                graph,
+            ]
+            for j, (label, output) in enumerate(zip(labels, outputs)):
+                part = workdir / f"out{j}_part{i:03d}{output.suffix or '.mp4'}"
+                parts[j].append(part)
+                # -t is an output option, so every output needs its own.
+                cmd += [
+                    "-map",
+                    label,
+                    "-t",
+                    f"{end - start:.6f}",
+                    "-an",
+                    *encoder_args(encoder_profile, threads),
+                    str(part),
+                ]
+            commands.append(cmd)
+
+        # A failing part stops its siblings instead of letting them encode to the end;
+        # the caller's cancel event is relayed into the same local stop event.
+        stop = threading.Event()
+        finished = threading.Event()
+
+        def relay_cancel() -> None:
+            while not finished.is_set():
+                if cancel_event is not None and cancel_event.wait(0.2):
+                    stop.set()
+                    return
+                if cancel_event is None:
+                    return
+
+        relay = threading.Thread(target=relay_cancel, daemon=True)
+        relay.start()
+        errors: List[BaseException] = []
+        frames = 0.0
+        with ThreadPoolExecutor(max_workers=len(commands)) as pool:
+            futures = [
+                pool.submit(run_ffmpeg, cmd, end - start, part_progress(i), stop)
+                for i, (cmd, (start, end)) in enumerate(zip(commands, ranges))
+            ]
+            for future in as_completed(futures):
+                try:
+                    frames += float(future.result().get("frame", 0) or 0)
+                except BaseException as exc:
+                    errors.append(exc)
+                    stop.set()
+        finished.set()
+        relay.join(timeout=1)
+        if errors:
+            # Report the part that actually failed, not the siblings it stopped.
+            raise next((e for e in errors if not isinstance(e, CancelledError)), errors[0])
+
+        for j, output in enumerate(outputs):
+            concat_list = workdir / f"out{j}_parts.txt"
+            concat_list.write_text(
+                "".join(f"file '{part.as_posix()}'\n" for part in parts[j]),
+                encoding="utf-8",
+            )
+            run_ffmpeg(
+                [
+                    "ffmpeg",
+                    "-y",
+                    "-v",
+                    "error",
+                    "-f",
+                    "concat",
+                    "-safe",
+                    "0",
+                    "-i",
+                    str(concat_list),
+                    "-i",
+                    str(input_path),
+                    "-map",
+                    "0:v:0",
+                    "-map",
+                    "1:a?",
+                    "-c",
+                    "copy",
+                    str(output),
+                ],
+                cancel_event=cancel_event,
+            )
+    return frames
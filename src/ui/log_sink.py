@@ -0,0 +1,77 @@
+"""Coalescing log/progress buffer between pipeline threads and the GUI, plus the on-disk log."""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Deque, List, Optional, Tuple, Union
+
+from src.config import LOG_DIR, LOG_FILE_BACKUPS, LOG_FILE_MAX_MB, LOG_PENDING_MAX_LINES
+
+_LOGGER_NAME = "video_trans.ui"
+
+
+def open_log_file(directory: Union[str, Path] = LOG_DIR) -> Tuple[logging.Logger, Optional[Path]]:
+    """Logger writing to ``<directory>/video-trans.log`` with size-based rotation."""
+    logger = logging.getLogger(_LOGGER_NAME)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    for handler in logger.handlers:
+        if isinstance(handler, RotatingFileHandler):
+            return logger, Path(handler.baseFilename)
+    path = Path(directory) / "video-trans.log"
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handler = RotatingFileHandler(
+            path,
+            maxBytes=LOG_FILE_MAX_MB * 1024 * 1024,
+            backupCount=LOG_FILE_BACKUPS,
+            encoding="utf-8",
+        )
+    except OSError:
+        return logger, None
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    logger.addHandler(handler)
+    return logger, path
+
+
+class LogSink:
+    """
+    Thread-safe sink for worker callbacks. ``log`` writes the line to the log file at once
+    and queues it for the view; ``progress`` keeps only the latest value. The GUI thread
+    calls ``drain`` on a timer and applies everything in one update, so a burst of
+    per-segment messages costs one repaint instead of one queued signal per line.
+    """
+
+    def __init__(self, max_pending: int = LOG_PENDING_MAX_LINES) -> None:
+        self.logger, self.path = open_log_file()
+        self._lock = threading.Lock()
+        self._pending: Deque[str] = deque(maxlen=max_pending)
+        self._dropped = 0
+        self._progress: Optional[Tuple[str, int]] = None
+
+    def log(self, text: str) -> None:
+        self.logger.info(text)
+        with self._lock:
+            if len(self._pending) == self._pending.maxlen:
+                self._dropped += 1
+            self._pending.append(text)
+
+    def progress(self, file_path: str, percent: int) -> None:
+        with self._lock:
+            self._progress = (file_path, percent)
+
+    def drain(self) -> Tuple[List[str], Optional[Tuple[str, int]]]:
+        """Queued lines (with a marker for any dropped while the view lagged) and the latest progress."""
+        with self._lock:
+            lines = list(self._pending)
+            self._pending.clear()
+            dropped, self._dropped = self._dropped, 0
+            progress, self._progress = self._progress, None
+        if dropped:
+            where = f"，完整日志见 {self.path}" if self.path else ""
+            lines.insert(0, f"……省略 {dropped} 行{where}")
+        return lines, progress
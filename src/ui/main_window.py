@@ -1,13 +1,17 @@
 from __future__ import annotations
 
 import os
+import threading
 from pathlib import Path
-from typing import List
+from typing import Dict, List
 
 from PySide6 import QtCore, QtGui, QtWidgets
 
 from src import config
-from src.ui.worker import JobOptions, PipelineWorker
+from src.pipeline.broker import FINISHED, BrokerClient, BrokerError
+from src.pipeline.models import registry
+from src.ui.log_sink import LogSink
+from src.ui.worker import BrokerMonitor, JobOptions, ModelWarmup, PipelineWorker
 
 
 class MainWindow(QtWidgets.QMainWindow):
@@ -17,10 +21,24 @@ class MainWindow(QtWidgets.QMainWindow):
         self.setMinimumSize(1080, 720)
         self._thread: QtCore.QThread | None = None
         self._worker: PipelineWorker | None = None
+        self._warmup: ModelWarmup | None = None
+        self._monitor: BrokerMonitor | None = None
+        self._queue_client: BrokerClient | None = None
+        self._queue_jobs: Dict[int, str] = {}
+        self._log_sink = LogSink()
 
         self._build_ui()
         self._apply_style()
         self._sync_backend_fields()
+        self._log_timer = QtCore.QTimer(self)
+        self._log_timer.setInterval(config.LOG_FLUSH_INTERVAL_MS)
+        self._log_timer.timeout.connect(self._flush_log)
+        self._log_timer.start()
+        if self._log_sink.path:
+            self._append_log(f"完整日志：{self._log_sink.path}")
+        if config.WARMUP_MODELS_ON_START:
+            # Fires once the event loop runs, i.e. after the window is on screen.
+            QtCore.QTimer.singleShot(0, self._start_warmup)
 
     def _build_ui(self) -> None:
         central = QtWidgets.QWidget()
@@ -37,16 +55,33 @@ class MainWindow(QtWidgets.QMainWindow):
         self.progress_bar.setFormat("%p%  已完成")
         layout.addWidget(self.progress_bar)
 
+        self.queue_label = QtWidgets.QLabel()
+        self.queue_label.setVisible(False)
+        layout.addWidget(self.queue_label)
+
         self.log_view = QtWidgets.QPlainTextEdit()
         self.log_view.setReadOnly(True)
         self.log_view.setPlaceholderText("进度信息会显示在这里...")
         self.log_view.setFixedHeight(180)
+        # Older lines drop off the top; the complete log is in the rotating log file.
+        self.log_view.setMaximumBlockCount(config.LOG_VIEW_MAX_BLOCKS)
         layout.addWidget(self.log_view)
 
+        actions = QtWidgets.QHBoxLayout()
         self.start_btn = QtWidgets.QPushButton("开始处理")
         self.start_btn.clicked.connect(self.start_processing)
         self.start_btn.setFixedHeight(46)
-        layout.addWidget(self.start_btn)
+        actions.addWidget(self.start_btn, stretch=4)
+        self.cancel_btn = QtWidgets.QPushButton("取消")
+        self.cancel_btn.clicked.connect(self._cancel_processing)
+        self.cancel_btn.setFixedHeight(46)
+        self.cancel_btn.setEnabled(False)
+        actions.addWidget(self.cancel_btn, stretch=1)
+        self.unload_btn = QtWidgets.QPushButton("释放模型")
+        self.unload_btn.clicked.connect(self._unload_models)
+        self.unload_btn.setFixedHeight(46)
+        actions.addWidget(self.unload_btn, stretch=1)
+        layout.addLayout(actions)
 
     def _build_file_section(self) -> QtWidgets.QGroupBox:
         box = QtWidgets.QGroupBox("批量文件")
@@ -88,10 +123,22 @@ class MainWindow(QtWidgets.QMainWindow):
         grid.addWidget(browse_btn, 0, 3)
 
         grid.addWidget(QtWidgets.QLabel("目标语言"), 1, 0)
-        self.target_combo = QtWidgets.QComboBox()
-        for lang in config.LANG_OPTIONS:
-            self.target_combo.addItem(lang["label"], lang["code"])
-        grid.addWidget(self.target_combo, 1, 1)
+        # Multi-select: every checked language is produced from a single transcription.
+        self.target_btn = QtWidgets.QToolButton()
+        self.target_btn.setPopupMode(QtWidgets.QToolButton.InstantPopup)
+        self.target_btn.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Preferred)
+        target_menu = QtWidgets.QMenu(self.target_btn)
+        self.target_actions: List[QtGui.QAction] = []
+        for i, lang in enumerate(config.LANG_OPTIONS):
+            action = target_menu.addAction(lang["label"])
+            action.setData(lang["code"])
+            action.setCheckable(True)
+            action.setChecked(i == 0)
+            action.toggled.connect(self._sync_target_label)
+            self.target_actions.append(action)
+        self.target_btn.setMenu(target_menu)
+        self._sync_target_label()
+        grid.addWidget(self.target_btn, 1, 1)
 
         grid.addWidget(QtWidgets.QLabel("源语言"), 1, 2)
         self.source_combo = QtWidgets.QComboBox()
@@ -118,6 +165,54 @@ class MainWindow(QtWidgets.QMainWindow):
         self.translation_edit = QtWidgets.QLineEdit(config.DEFAULT_TRANSLATION_MODEL)
         grid.addWidget(self.translation_edit, 3, 1, 1, 3)
 
+        grid.addWidget(QtWidgets.QLabel("翻译精度"), 9, 0)
+        self.precision_combo = QtWidgets.QComboBox()
+        for mode in config.TRANSLATION_PRECISIONS:
+            self.precision_combo.addItem(mode["label"], mode["code"])
+        grid.addWidget(self.precision_combo, 9, 1)
+
+        grid.addWidget(QtWidgets.QLabel("CPU 线程"), 9, 2)
+        self.threads_spin = QtWidgets.QSpinBox()
+        self.threads_spin.setRange(0, os.cpu_count() or 64)
+        self.threads_spin.setSpecialValueText("自动")
+        grid.addWidget(self.threads_spin, 9, 3)
+
+        grid.addWidget(QtWidgets.QLabel("LM 并发请求"), 10, 0)
+        self.lm_concurrency_spin = QtWidgets.QSpinBox()
+        self.lm_concurrency_spin.setRange(1, 16)
+        self.lm_concurrency_spin.setValue(config.LMSTUDIO_CONCURRENCY)
+        grid.addWidget(self.lm_concurrency_spin, 10, 1)
+
+        grid.addWidget(QtWidgets.QLabel("识别并行进程"), 10, 2)
+        self.asr_workers_spin = QtWidgets.QSpinBox()
+        self.asr_workers_spin.setRange(0, os.cpu_count() or 16)
+        self.asr_workers_spin.setSpecialValueText("不切分")
+        grid.addWidget(self.asr_workers_spin, 10, 3)
+
+        grid.addWidget(QtWidgets.QLabel("压制并行段数"), 11, 0)
+        self.burn_workers_spin = QtWidgets.QSpinBox()
+        self.burn_workers_spin.setRange(1, os.cpu_count() or 16)
+        self.burn_workers_spin.setToolTip("大于 1 时按关键帧切段并行编码，再无损拼接")
+        grid.addWidget(self.burn_workers_spin, 11, 1)
+
+        grid.addWidget(QtWidgets.QLabel("编码档位"), 11, 2)
+        self.encoder_combo = QtWidgets.QComboBox()
+        for profile in config.ENCODER_PROFILES:
+            self.encoder_combo.addItem(f"{profile['label']}（{profile['preset']} / CRF {profile['crf']}）", profile["code"])
+        self.encoder_combo.setCurrentIndex(1)
+        grid.addWidget(self.encoder_combo, 11, 3)
+
+        self.resume_cb = QtWidgets.QCheckBox("断点续传")
+        self.resume_cb.setChecked(True)
+        self.resume_cb.setToolTip("按输出目录中的检查点跳过已完成的步骤；取消勾选则全部重新处理")
+        grid.addWidget(self.resume_cb, 12, 0)
+
+        grid.addWidget(QtWidgets.QLabel("任务队列"), 12, 2)
+        self.broker_edit = QtWidgets.QLineEdit()
+        self.broker_edit.setPlaceholderText(f"host:{config.BROKER_PORT}，留空则在本机处理")
+        self.broker_edit.setToolTip("填写后任务提交到多机队列，由各机器上的 worker 处理；输入与输出目录须为共享路径")
+        grid.addWidget(self.broker_edit, 12, 3)
+
         grid.addWidget(QtWidgets.QLabel("LM Studio Endpoint"), 4, 0)
         self.lm_endpoint_edit = QtWidgets.QLineEdit(config.DEFAULT_LMSTUDIO_ENDPOINT)
         grid.addWidget(self.lm_endpoint_edit, 4, 1, 1, 3)
@@ -147,10 +242,28 @@ class MainWindow(QtWidgets.QMainWindow):
         self.keep_source_srt_cb.setChecked(True)
         self.burn_cb = QtWidgets.QCheckBox("烧录字幕到视频")
         self.burn_cb.setChecked(True)
+        self.subtitle_mode_combo = QtWidgets.QComboBox()
+        for mode in config.SUBTITLE_MODES:
+            self.subtitle_mode_combo.addItem(mode["label"], mode["code"])
+        self.subtitle_mode_combo.setToolTip("软字幕：以字幕流封装（MP4 用 mov_text，其他输出 MKV），不重编码视频")
+        self.burn_cb.toggled.connect(self.subtitle_mode_combo.setEnabled)
+        self.cache_cb = QtWidgets.QCheckBox("复用转写缓存")
+        self.cache_cb.setChecked(True)
+        self.memory_cb = QtWidgets.QCheckBox("启用翻译记忆")
+        self.memory_cb.setChecked(True)
+        self.stream_asr_cb = QtWidgets.QCheckBox("边识别边翻译")
+        self.daemon_cb = QtWidgets.QCheckBox("使用模型守护进程")
+        self.daemon_cb.setToolTip("需先运行 python -m src.pipeline.daemon；不可用时自动回退本地加载")
+        self.stream_asr_cb.setToolTip("按窗口输出识别结果并立即翻译；与识别并行进程同时设置时以并行进程为准")
 
         grid.addWidget(self.export_srt_cb, 7, 0)
         grid.addWidget(self.keep_source_srt_cb, 7, 1)
         grid.addWidget(self.burn_cb, 7, 2)
+        grid.addWidget(self.cache_cb, 7, 3)
+        grid.addWidget(self.memory_cb, 8, 0)
+        grid.addWidget(self.stream_asr_cb, 8, 1)
+        grid.addWidget(self.daemon_cb, 8, 2)
+        grid.addWidget(self.subtitle_mode_combo, 8, 3)
 
         return box
 
@@ -171,7 +284,7 @@ class MainWindow(QtWidgets.QMainWindow):
                           border: none; border-radius: 6px; padding: 8px 12px; }
             QPushButton:hover { background: qlineargradient(x1:0,y1:0,x2:1,y2:1, stop:0 #1d4ed8, stop:1 #1e40af); }
             QPushButton:disabled { background: #334155; color: #9ca3af; }
-            QListWidget, QLineEdit, QPlainTextEdit, QComboBox, QSpinBox {
+            QListWidget, QLineEdit, QPlainTextEdit, QComboBox, QSpinBox, QToolButton {
                 background-color: #111827; border: 1px solid #1f2937; border-radius: 6px;
                 padding: 6px; selection-background-color: #2563eb;
             }
@@ -212,62 +325,204 @@ class MainWindow(QtWidgets.QMainWindow):
         if not output_dir:
             self._append_log("请设置输出目录。")
             return
+        targets = self._selected_targets()
+        if not targets:
+            self._append_log("请至少选择一个目标语言。")
+            return
 
-        opts = JobOptions(
-            target_lang=self.target_combo.currentData(),
-            source_lang=self.source_combo.currentData() or None,
-            model_size=self.model_combo.currentData(),
-            output_dir=Path(output_dir),
-            burn_subtitles=self.burn_cb.isChecked(),
-            export_srt=self.export_srt_cb.isChecked(),
-            keep_source_srt=self.keep_source_srt_cb.isChecked(),
-            font=self.font_edit.text().strip() or config.DEFAULT_FONT,
-            font_size=self.font_size.value(),
-            translation_model=self.translation_edit.text().strip() or config.DEFAULT_TRANSLATION_MODEL,
-            translation_backend=self.backend_combo.currentData(),
-            lm_endpoint=self.lm_endpoint_edit.text().strip() or config.DEFAULT_LMSTUDIO_ENDPOINT,
-            lm_model=self.lm_model_edit.text().strip() or config.DEFAULT_LMSTUDIO_MODEL,
-            domain=self.domain_edit.text().strip(),
-        )
+        opts = self._collect_options(targets, Path(output_dir))
+        broker = self.broker_edit.text().strip()
+        if broker:
+            self._submit_to_queue(broker, files, opts)
+            return
 
         self.start_btn.setEnabled(False)
+        self.unload_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(True)
         self.progress_bar.setValue(0)
         self._append_log("开始任务...")
 
         self._thread = QtCore.QThread()
-        self._worker = PipelineWorker(files, opts)
+        self._worker = PipelineWorker(files, opts, sink=self._log_sink)
         self._worker.moveToThread(self._thread)
 
         self._thread.started.connect(self._worker.run)
-        self._worker.progress.connect(self._append_log)
-        self._worker.file_progress.connect(self._on_file_progress)
         self._worker.error.connect(self._on_error)
         self._worker.finished.connect(self._on_finished)
 
         self._thread.start()
 
-    def _on_file_progress(self, file_path: str, percent: int) -> None:
-        self.progress_bar.setValue(percent)
+    def _submit_to_queue(self, address: str, files: List[str], opts: JobOptions) -> None:
+        try:
+            client = BrokerClient(address, timeout=5.0)
+            ids = client.submit(files, opts)
+        except (OSError, BrokerError, ValueError) as exc:
+            self._append_log(f"无法提交到任务队列 {address}：{exc}")
+            return
+        self._queue_client = client
+        self._queue_jobs = {job_id: "queued" for job_id in ids}
+        self.start_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(True)
+        self.progress_bar.setValue(0)
+        self.queue_label.setText("等待队列状态...")
+        self.queue_label.setVisible(True)
+        self._append_log(f"已提交 {len(ids)} 个任务到 {address}（任务号 {', '.join(map(str, ids))}）")
+
+        self._monitor = BrokerMonitor(client, ids)
+        self._monitor.status.connect(self._on_queue_status)
+        self._monitor.finished.connect(self._on_queue_finished)
+        # Polling is a blocking socket call every few seconds; a daemon thread is enough.
+        threading.Thread(target=self._monitor.run, name="broker-monitor", daemon=True).start()
+
+    def _on_queue_status(self, status: dict) -> None:
+        if "error" in status:
+            self.queue_label.setText(f"任务队列暂时不可达：{status['error']}")
+            return
+        counts: Dict[str, int] = {}
+        for job in status["jobs"]:
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+            previous = self._queue_jobs.get(job["id"])
+            if previous == job["status"]:
+                continue
+            self._queue_jobs[job["id"]] = job["status"]
+            name = Path(job["file"]).name
+            if job["status"] == "leased":
+                self._append_log(f"{name}：由 {job['worker']} 处理（第 {job['attempts']} 次）")
+            elif job["status"] == "done":
+                self._append_log(f"{name}：完成，输出 {len(job.get('outputs') or [])} 个文件")
+            elif job["status"] == "failed":
+                self._append_log(f"{name}：失败\n{job.get('error') or ''}")
+            elif job["status"] == "cancelled":
+                self._append_log(f"{name}：已取消")
+        finished = sum(counts.get(name, 0) for name in FINISHED)
+        total = len(self._queue_jobs) or 1
+        self.progress_bar.setValue(int(finished * 100 / total))
+        self.queue_label.setText(
+            f"排队 {counts.get('queued', 0)} · 处理中 {counts.get('leased', 0)} · "
+            f"完成 {counts.get('done', 0)} · 失败 {counts.get('failed', 0)} · 已取消 {counts.get('cancelled', 0)}"
+            f" · 处理机器 {len(status.get('workers', []))}"
+        )
+
+    def _on_queue_finished(self) -> None:
+        self._append_log("队列任务全部结束")
+        self.start_btn.setEnabled(True)
+        self.cancel_btn.setEnabled(False)
+        self._monitor = None
+        self._queue_client = None
+
+    def _collect_options(self, targets: List[str], output_dir: Path) -> JobOptions:
+        return JobOptions(
+            target_lang=targets,
+            source_lang=self.source_combo.currentData() or None,
+            model_size=self.model_combo.currentData(),
+            output_dir=output_dir,
+            burn_subtitles=self.burn_cb.isChecked(),
+            subtitle_mode=self.subtitle_mode_combo.currentData(),
+            export_srt=self.export_srt_cb.isChecked(),
+            keep_source_srt=self.keep_source_srt_cb.isChecked(),
+            font=self.font_edit.text().strip() or config.DEFAULT_FONT,
+            font_size=self.font_size.value(),
+            translation_model=self.translation_edit.text().strip() or config.DEFAULT_TRANSLATION_MODEL,
+            translation_backend=self.backend_combo.currentData(),
+            lm_endpoint=self.lm_endpoint_edit.text().strip() or config.DEFAULT_LMSTUDIO_ENDPOINT,
+            lm_model=self.lm_model_edit.text().strip() or config.DEFAULT_LMSTUDIO_MODEL,
+            domain=self.domain_edit.text().strip(),
+            lm_concurrency=self.lm_concurrency_spin.value(),
+            use_cache=self.cache_cb.isChecked(),
+            use_translation_memory=self.memory_cb.isChecked(),
+            translation_precision=self.precision_combo.currentData(),
+            cpu_threads=self.threads_spin.value(),
+            asr_workers=self.asr_workers_spin.value(),
+            stream_asr=self.stream_asr_cb.isChecked(),
+            burn_workers=self.burn_workers_spin.value(),
+            encoder_profile=self.encoder_combo.currentData(),
+            resume=self.resume_cb.isChecked(),
+            use_daemon=self.daemon_cb.isChecked(),
+        )
+
+    def _start_warmup(self) -> None:
+        # Only the model fields matter here; targets and output directory are not used.
+        targets = self._selected_targets() or [self.target_actions[0].data()]
+        options = self._collect_options(targets, Path(self.output_edit.text().strip()))
+        self._warmup = ModelWarmup(options, sink=self._log_sink)
+        self._append_log("后台预加载模型...")
+        # A plain daemon thread: a model load cannot be interrupted, and it must not keep
+        # the application from exiting. Its messages reach the view through the log sink.
+        threading.Thread(target=self._warmup.run, name="model-warmup", daemon=True).start()
+
+    def _flush_log(self) -> None:
+        lines, progress = self._log_sink.drain()
+        if lines:
+            self.log_view.appendPlainText("\n".join(lines))
+            self.log_view.verticalScrollBar().setValue(self.log_view.verticalScrollBar().maximum())
+        if progress is not None:
+            self.progress_bar.setValue(progress[1])
+        if self._worker is not None:
+            # Weighted by media duration; the ETA counts down between progress updates.
+            eta = self._worker.eta_seconds()
+            remaining = "估算中" if eta is None else _format_eta(eta)
+            self.progress_bar.setFormat(f"%p%  已完成 · 剩余 {remaining}")
 
     def _on_error(self, message: str) -> None:
         self._append_log(f"错误：\n{message}")
 
     def _on_finished(self) -> None:
         self._append_log("全部处理完成")
+        self._flush_log()
+        self.progress_bar.setFormat("%p%  已完成")
         self.start_btn.setEnabled(True)
+        self.unload_btn.setEnabled(True)
+        self.cancel_btn.setEnabled(False)
         if self._thread:
             self._thread.quit()
             self._thread.wait()
             self._thread = None
         self._worker = None
 
+    def _cancel_processing(self) -> None:
+        if self._queue_client is not None:
+            try:
+                self._queue_client.cancel(list(self._queue_jobs))
+            except (OSError, BrokerError) as exc:
+                self._append_log(f"取消队列任务失败：{exc}")
+                return
+            self.cancel_btn.setEnabled(False)
+            self._append_log("已请求取消队列任务，处理中的任务会在下次心跳时停止...")
+            return
+        if self._worker is None:
+            return
+        # Called directly rather than via a queued slot: the worker thread is busy in run().
+        self._worker.cancel()
+        self.cancel_btn.setEnabled(False)
+        self._append_log("正在取消，当前步骤结束后停止...")
+
+    def _unload_models(self) -> None:
+        count = registry.unload()
+        self._append_log(f"已释放 {count} 个已加载模型" if count else "当前没有已加载的模型")
+
     def _append_log(self, text: str) -> None:
-        self.log_view.appendPlainText(text)
-        self.log_view.verticalScrollBar().setValue(self.log_view.verticalScrollBar().maximum())
+        # Through the sink too, so GUI messages keep their order with the worker's.
+        self._log_sink.log(text)
+
+    def _selected_targets(self) -> List[str]:
+        return [action.data() for action in self.target_actions if action.isChecked()]
+
+    def _sync_target_label(self) -> None:
+        labels = [action.text() for action in self.target_actions if action.isChecked()]
+        self.target_btn.setText("、".join(labels) if labels else "请选择")
 
     def _sync_backend_fields(self) -> None:
         use_lm = self.backend_combo.currentData() == "lmstudio"
         self.translation_edit.setEnabled(not use_lm)
+        self.precision_combo.setEnabled(not use_lm)
         self.lm_endpoint_edit.setEnabled(use_lm)
         self.lm_model_edit.setEnabled(use_lm)
+        self.lm_concurrency_spin.setEnabled(use_lm)
         self.domain_edit.setEnabled(True)
+
+
+def _format_eta(seconds: float) -> str:
+    if seconds < 60:
+        return "不到 1 分钟"
+    minutes = int(seconds // 60)
+    return f"约 {minutes} 分钟" if minutes < 60 else f"约 {minutes // 60} 小时 {minutes % 60} 分钟"
@@ -0,0 +1,76 @@
+"""Shared fixtures: the pipeline with its ML stages replaced by instant stand-ins."""
+
+from __future__ import annotations
+
+import sys
+import types
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+SEGMENTS = [
+    {"start": 0.5, "end": 2.0, "text": "hello"},
+    {"start": 3.0, "end": 5.0, "text": "world"},
+]
+
+
+class _Translator:
+    def __init__(self, **kwargs):
+        pass
+
+    def translate_segments_multi(self, segments, source_lang, target_langs):
+        return {lang: segments.with_texts(f"{lang}:{text}" for text in segments.texts) for lang in target_langs}
+
+
+@pytest.fixture
+def stub_models(monkeypatch):
+    """Whisper, M2M100 and audio decoding replaced, so runs need neither torch nor FFmpeg."""
+    translator = types.ModuleType("src.pipeline.translator")
+    translator.Translator = _Translator
+    transcriber = types.ModuleType("src.pipeline.transcriber")
+    transcriber.transcribe_video = lambda audio, **kwargs: {"language": "en", "segments": [dict(s) for s in SEGMENTS]}
+    monkeypatch.setitem(sys.modules, "src.pipeline.translator", translator)
+    monkeypatch.setitem(sys.modules, "src.pipeline.transcriber", transcriber)
+
+    import src.pipeline.audio as audio
+
+    monkeypatch.setattr(audio, "extract_audio", lambda path, progress_cb=None: np.zeros(16000 * 6, dtype=np.float32))
+
+
+@pytest.fixture
+def videos(tmp_path):
+    """Two placeholder input files (never decoded while ``stub_models`` is active)."""
+    paths = []
+    for name in ("a.mp4", "b.mp4"):
+        path = tmp_path / "in" / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(b"\0" * 16)
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture
+def make_options(tmp_path):
+    """``JobOptions`` for a quick run into ``tmp_path/out``: tiny model, no probe, cache, memory or report."""
+    from src.pipeline.runner import JobOptions
+
+    def make(**overrides):
+        defaults = dict(
+            target_lang=["zh", "ja"],
+            source_lang=None,
+            model_size="tiny",
+            output_dir=tmp_path / "out",
+            burn_subtitles=False,
+            preflight=False,
+            use_cache=False,
+            use_translation_memory=False,
+            write_report=False,
+        )
+        return JobOptions(**{**defaults, **overrides})
+
+    return make
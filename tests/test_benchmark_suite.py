@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from benchmarks import suite
+from benchmarks.suite import SUITE_VERSION, compare, incompatible, run_stage
+from src.pipeline.metrics import StageEvent
+
+PARAMS = {
+    "seconds": 30,
+    "repeat": 3,
+    "whisper_model": "tiny",
+    "m2m_model": "facebook/m2m100_418M",
+    "translate_segments": 120,
+    "srt_segments": 20000,
+    "lm_latency": 0.05,
+    "threshold": 0.2,
+    "stages": "srt_write",
+}
+
+
+def _baseline(**params):
+    return {"suite_version": SUITE_VERSION, "params": {**PARAMS, **params}, "stages": {"srt_write": {"seconds": 1.0}}}
+
+
+def test_baseline_must_match_the_workload():
+    assert incompatible(_baseline(threshold=0.5, stages="encode"), PARAMS) == []
+    assert incompatible(dict(_baseline(), suite_version=0), PARAMS)
+    mismatches = incompatible(_baseline(srt_segments=10, lm_latency=0.0), PARAMS)
+    assert [m.split()[1] for m in mismatches] == ["--srt-segments", "--lm-latency"]
+
+
+def test_compare_flags_only_real_slowdowns():
+    baseline = _baseline()
+    assert compare({"srt_write": {"seconds": 1.1}}, baseline, 0.2, 0.05) == []
+    assert compare({"srt_write": {"seconds": 1.5}}, baseline, 0.2, 0.05)
+    assert compare({"srt_write": {"skipped": "x"}}, baseline, 0.2, 0.05) == []
+
+
+def test_prepare_is_outside_the_timing(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(suite, "time", type("Clock", (), {"perf_counter": staticmethod(lambda: now[0])}))
+
+    def prepare():
+        now[0] += 100.0
+
+    def stage(event: StageEvent) -> None:
+        now[0] += 1.0
+
+    result = run_stage("srt_write", stage, 3, prepare)
+    assert result["runs"] == [1.0, 1.0, 1.0]
+    assert run_stage("asr", stage, 1, lambda: __import__("not_installed_here"))["skipped"]
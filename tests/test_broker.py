@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import sys
+import threading
+
+import pytest
+
+from src.pipeline.broker import BrokerClient, BrokerServer, BrokerWorker, JobQueue
+
+
+@pytest.fixture
+def broker(tmp_path):
+    queue = JobQueue(str(tmp_path / "broker.sqlite3"))
+    server = BrokerServer(queue, ("127.0.0.1", 0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield queue, BrokerClient(f"127.0.0.1:{server.server_address[1]}")
+    server.shutdown()
+    server.server_close()
+
+
+def _work_once(client):
+    lines = []
+    BrokerWorker(client, worker_id="test-worker", log=lines.append).run(once=True)
+    return lines
+
+
+def test_worker_completes_job(stub_models, videos, make_options, broker):
+    queue, client = broker
+    ids = client.submit(videos[:1], make_options(target_lang=["zh"]))
+    _work_once(client)
+    job = client.status(ids)["jobs"][0]
+    assert job["status"] == "done"
+    assert any(path.endswith("a_zh.srt") for path in job["outputs"])
+
+
+def test_worker_fails_job_when_run_aborts(stub_models, videos, make_options, broker, monkeypatch):
+    monkeypatch.setitem(sys.modules, "src.pipeline.translator", None)
+    queue, client = broker
+    ids = client.submit(videos[:1], make_options(target_lang=["zh"]))
+    _work_once(client)
+    job = client.status(ids)["jobs"][0]
+    assert job["status"] == "failed"
+    assert job["error"]
+    assert job["outputs"] == []
+
+
+def test_worker_trusts_run_result_over_failed_list(stub_models, videos, make_options, broker, monkeypatch):
+    from src.pipeline.runner import PipelineRunner
+
+    def aborted(self):
+        self._emit_error("CUDA out of memory")
+        return False
+
+    monkeypatch.setattr(PipelineRunner, "run", aborted)
+    queue, client = broker
+    ids = client.submit(videos[:1], make_options(target_lang=["zh"]))
+    _work_once(client)
+    job = client.status(ids)["jobs"][0]
+    assert job["status"] == "failed"
+    assert "out of memory" in job["error"]
+
+
+def test_token_is_checked(tmp_path):
+    from src.pipeline.broker import BrokerError
+
+    queue = JobQueue(str(tmp_path / "broker.sqlite3"))
+    server = BrokerServer(queue, ("127.0.0.1", 0), token="s3cret")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    address = f"127.0.0.1:{server.server_address[1]}"
+    try:
+        with pytest.raises(BrokerError, match="token"):
+            BrokerClient(address, token="").status()
+        with pytest.raises(BrokerError, match="token"):
+            BrokerClient(address, token="guess").cancel()
+        assert BrokerClient(address, token="s3cret").status()["jobs"] == []
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_serve_refuses_open_address_without_token(monkeypatch, tmp_path):
+    from src.pipeline import broker as broker_module
+
+    monkeypatch.setattr(broker_module, "BROKER_TOKEN", "")
+    with pytest.raises(SystemExit) as exc:
+        broker_module.main(["serve", "--host", "0.0.0.0", "--port", "0", "--db", str(tmp_path / "q.db")])
+    assert exc.value.code == 2
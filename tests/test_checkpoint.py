@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+from src.pipeline.checkpoint import CheckpointStore, FileCheckpoint, fingerprint
+from src.pipeline.runner import PipelineRunner
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "a.mp4"
+    path.write_bytes(b"video")
+    return path
+
+
+def _done(tmp_path, source, name="out.srt", body="1\n"):
+    ck = FileCheckpoint(tmp_path / "ck", source)
+    artifact = tmp_path / name
+    ck.begin("transcribe", "fp1", [artifact])
+    artifact.write_text(body, encoding="utf-8")
+    ck.complete("transcribe", "fp1", {"srt": artifact}, language="en")
+    return artifact
+
+
+def test_fingerprint_ignores_keyword_order():
+    assert fingerprint(a=1, b=[2, 3]) == fingerprint(b=[2, 3], a=1)
+    assert fingerprint(a=1) != fingerprint(a=2)
+
+
+def test_completed_stage_survives_reopen(tmp_path, source):
+    artifact = _done(tmp_path, source)
+    ck = FileCheckpoint(tmp_path / "ck", source)
+    assert ck.is_done("transcribe", "fp1")
+    assert not ck.is_done("transcribe", "fp2")
+    assert ck.extra("transcribe") == {"language": "en"}
+    assert ck.artifact_paths("transcribe") == [artifact.resolve()]
+
+
+def test_running_stage_is_discarded_with_its_outputs(tmp_path, source):
+    ck = FileCheckpoint(tmp_path / "ck", source)
+    partial = tmp_path / "partial.mp4"
+    ck.begin("burn", "fp", [partial])
+    partial.write_bytes(b"half")  # crash here
+    reopened = FileCheckpoint(tmp_path / "ck", source)
+    assert reopened.discarded == [partial.resolve()]
+    assert not partial.exists()
+    assert not reopened.is_done("burn", "fp")
+
+
+def test_changed_source_resets_every_stage(tmp_path, source):
+    _done(tmp_path, source)
+    source.write_bytes(b"another video")
+    assert not FileCheckpoint(tmp_path / "ck", source).is_done("transcribe", "fp1")
+
+
+def test_edited_artifact_invalidates_touched_one_does_not(tmp_path, source):
+    artifact = _done(tmp_path, source)
+    st = artifact.stat()
+    os.utime(artifact, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert FileCheckpoint(tmp_path / "ck", source).is_done("transcribe", "fp1")
+    artifact.write_text("2\n", encoding="utf-8")  # same size, new content
+    assert not FileCheckpoint(tmp_path / "ck", source).is_done("transcribe", "fp1")
+    artifact.unlink()
+    assert not FileCheckpoint(tmp_path / "ck", source).is_done("transcribe", "fp1")
+
+
+def test_unreadable_or_old_state_starts_over(tmp_path, source):
+    _done(tmp_path, source)
+    state = tmp_path / "ck" / "state.json"
+    record = json.loads(state.read_text(encoding="utf-8"))
+    state.write_text(json.dumps(dict(record, version=0)), encoding="utf-8")
+    assert not FileCheckpoint(tmp_path / "ck", source).is_done("transcribe", "fp1")
+    state.write_text("{not json", encoding="utf-8")
+    assert not FileCheckpoint(tmp_path / "ck", source).is_done("transcribe", "fp1")
+
+
+def test_store_keys_by_resolved_path(tmp_path, source):
+    store = CheckpointStore(tmp_path / "out")
+    assert store.open(source).dir == store.open(str(source.resolve())).dir
+    assert store.open(source).dir.parent == tmp_path / "out" / ".checkpoints"
+
+
+def test_rerun_resumes_from_checkpoints(stub_models, videos, make_options, monkeypatch):
+    assert PipelineRunner(videos, make_options(target_lang=["zh"])).run()
+
+    def no_transcribe(audio, **kwargs):
+        raise AssertionError("transcribed again")
+
+    monkeypatch.setattr(sys.modules["src.pipeline.transcriber"], "transcribe_video", no_transcribe)
+    translated = []
+    translator = sys.modules["src.pipeline.translator"].Translator
+    original = translator.translate_segments_multi
+
+    def spy(self, segments, source_lang, target_langs):
+        translated.extend(target_langs)
+        return original(self, segments, source_lang, target_langs)
+
+    monkeypatch.setattr(translator, "translate_segments_multi", spy)
+    runner = PipelineRunner(videos, make_options())
+    assert runner.run() and not runner.failed
+    # Only the newly added language is translated.
+    assert translated == ["ja", "ja"]
+    outputs = runner.outputs[str(Path(videos[0]).resolve())]
+    assert sorted(Path(p).name for p in outputs) == ["a_ja.srt", "a_source.srt", "a_zh.srt"]
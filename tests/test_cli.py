@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import json
+import sys
+
+from src import cli
+from src.pipeline.runner import PipelineRunner
+
+
+def _run(capsys, videos, tmp_path, *extra):
+    code = cli.main(
+        [
+            *videos,
+            "--target-lang",
+            "zh",
+            "--output-dir",
+            str(tmp_path / "out"),
+            "--no-burn-subtitles",
+            "--no-preflight",
+            "--no-use-cache",
+            "--no-use-translation-memory",
+            "--no-write-report",
+            *extra,
+        ]
+    )
+    events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    return code, events
+
+
+def _summary(events):
+    return next(e for e in events if e["event"] == "summary")
+
+
+def test_batch_succeeds(stub_models, videos, tmp_path, capsys):
+    code, events = _run(capsys, videos, tmp_path)
+    assert code == 0
+    assert _summary(events)["ok"] == 2
+    assert (tmp_path / "out" / "a_zh.srt").read_text(encoding="utf-8").count("zh:") == 2
+
+
+def test_transcribe_failure_exits_nonzero(stub_models, videos, tmp_path, capsys, monkeypatch):
+    def boom(self, job):
+        raise RuntimeError("decoder exploded")
+
+    monkeypatch.setattr(PipelineRunner, "_transcribe_stage", boom)
+    code, events = _run(capsys, videos, tmp_path)
+    assert code == 1
+    summary = _summary(events)
+    assert summary["ok"] == 0 and len(summary["failed"]) == 2
+
+
+def test_aborted_run_fails_every_file(stub_models, videos, tmp_path, capsys, monkeypatch):
+    # What a missing torch looks like to run(): the translator import fails before any file starts.
+    monkeypatch.setitem(sys.modules, "src.pipeline.translator", None)
+    code, events = _run(capsys, videos, tmp_path)
+    assert code == 1
+    assert any(e["event"] == "error" for e in events)
+    summary = _summary(events)
+    assert summary["ok"] == 0 and len(summary["failed"]) == 2
+    assert not (tmp_path / "out" / "a_zh.srt").exists()
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import os
+import socket
+import threading
+
+import pytest
+
+from src.pipeline.daemon import DaemonClient, DaemonRunningError, ModelDaemon
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix sockets")
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / "daemon.sock")
+
+
+def test_stale_socket_is_replaced(socket_path):
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(socket_path)
+    stale.close()  # file stays behind, nobody listening
+    server = ModelDaemon(socket_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        assert DaemonClient(socket_path, timeout=5).available()
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join(5)
+    assert not os.path.exists(socket_path)
+
+
+def test_running_daemon_is_left_alone(socket_path):
+    server = ModelDaemon(socket_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with pytest.raises(DaemonRunningError):
+            ModelDaemon(socket_path)
+        assert DaemonClient(socket_path, timeout=5).available()
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join(5)
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import types
+
+import pytest
+
+from src.pipeline import broker
+from src.pipeline.broker import JobQueue
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = types.SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(broker, "time", types.SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    q = JobQueue(str(tmp_path / "q.sqlite3"), lease_seconds=60, max_attempts=2)
+    yield q
+    q.close()
+
+
+def _job(queue, job_id):
+    return queue.status([job_id])["jobs"][0]
+
+
+def test_lease_in_submission_order(queue):
+    first, second = queue.submit(["/a.mp4", "/b.mp4"], {"target_lang": ["zh"]})
+    job = queue.lease("w1")
+    assert job["id"] == first and job["attempt"] == 1 and job["options"] == {"target_lang": ["zh"]}
+    assert queue.lease("w2")["id"] == second
+    assert queue.lease("w3") is None
+
+
+def test_heartbeat_extends_lease(queue, clock):
+    (job_id,) = queue.submit(["/a.mp4"], {})
+    queue.lease("w1")
+    clock.value += 50
+    assert queue.heartbeat(job_id, "w1")
+    clock.value += 50  # 100 s after the lease, 50 s after the heartbeat
+    assert _job(queue, job_id)["status"] == "leased"
+    assert not queue.heartbeat(job_id, "someone-else")
+
+
+def test_expired_lease_requeues_then_fails_at_max_attempts(queue, clock):
+    (job_id,) = queue.submit(["/a.mp4"], {})
+    queue.lease("w1")
+    clock.value += 61
+    job = queue.lease("w2")
+    assert job["id"] == job_id and job["attempt"] == 2
+    assert not queue.heartbeat(job_id, "w1")  # the old worker has lost it
+    clock.value += 61
+    assert queue.lease("w3") is None
+    job = _job(queue, job_id)
+    assert job["status"] == "failed" and "w2" in job["error"]
+
+
+def test_release_does_not_use_up_an_attempt(queue):
+    (job_id,) = queue.submit(["/a.mp4"], {})
+    for _ in range(3):  # more than max_attempts
+        assert queue.lease("w1")["attempt"] == 1
+        assert queue.release(job_id, "w1")
+    assert _job(queue, job_id)["status"] == "queued"
+
+
+def test_complete_only_by_lease_holder(queue):
+    (job_id,) = queue.submit(["/a.mp4"], {})
+    queue.lease("w1")
+    assert not queue.complete(job_id, "w2", True)
+    assert queue.complete(job_id, "w1", True, outputs=["/out/a_zh.srt"])
+    job = _job(queue, job_id)
+    assert job["status"] == "done" and job["outputs"] == ["/out/a_zh.srt"]
+    assert not queue.complete(job_id, "w1", False)  # finished jobs stay finished
+
+
+def test_failure_is_final(queue):
+    (job_id,) = queue.submit(["/a.mp4"], {})
+    queue.lease("w1")
+    queue.complete(job_id, "w1", False, error="boom")
+    assert queue.lease("w1") is None
+    assert _job(queue, job_id)["error"] == "boom"
+
+
+def test_cancel_stops_heartbeats(queue):
+    ids = queue.submit(["/a.mp4", "/b.mp4"], {})
+    queue.lease("w1")
+    assert queue.cancel([ids[0]]) == 1
+    assert not queue.heartbeat(ids[0], "w1")
+    assert queue.cancel() == 1  # the remaining queued job
+    assert queue.status()["counts"] == {"cancelled": 2}
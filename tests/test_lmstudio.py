@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import json
+import time
+
+import pytest
+
+from benchmarks.mock_lmstudio import MockLmStudio
+from src.pipeline.lmstudio import LmStudioTranslator, _parse_indexed, _read_event_stream
+from src.pipeline.segments import SegmentTable
+
+SEGMENTS = [{"start": float(i), "end": i + 1.0, "text": f"line {i}"} for i in range(12)]
+
+
+class _EventResponse:
+    def __init__(self, chunks):
+        self._lines = []
+        for chunk in chunks:
+            self._lines += [b"data: " + json.dumps(chunk, ensure_ascii=False).encode("utf-8"), b""]
+        self._lines += [b": keep-alive", b"data: [DONE]", b"data: " + json.dumps(_delta("after done")).encode()]
+
+    def iter_lines(self):
+        return iter(self._lines)
+
+
+def _delta(text):
+    return {"choices": [{"delta": {"content": text}}]}
+
+
+def _translator(mock, **kwargs):
+    kwargs.setdefault("backoff", 0.0)
+    return LmStudioTranslator(mock.endpoint, "mock", **kwargs)
+
+
+def test_parse_indexed_tolerates_spacing_and_fullwidth_pipe():
+    content = "1|你好\n 2 ｜ 世界 \n2|duplicate\n9|out of range\n0|zero\n3|\nnot numbered"
+    assert _parse_indexed(content, 3) == {0: "你好", 1: "世界"}
+
+
+def test_parse_indexed_falls_back_to_line_order():
+    assert _parse_indexed("un\n\ndeux\n", 2) == {0: "un", 1: "deux"}
+    assert _parse_indexed("un\ndeux\n", 3) == {}
+    assert _parse_indexed("un\ndeux", 2, positional=False) == {}
+
+
+def test_event_stream_reports_whole_lines():
+    resp = _EventResponse([_delta("1|he"), {"choices": []}, _delta("llo\n2|"), _delta("wörld\n\n3|"), _delta("末行")])
+    lines = []
+    assert _read_event_stream(resp, lines.append) == "1|hello\n2|wörld\n\n3|末行"
+    assert lines == ["1|hello", "2|wörld", "3|末行"]
+
+
+@pytest.mark.parametrize("stream", [True, False])
+def test_translates_in_order(stream):
+    with MockLmStudio(stream=stream) as mock:
+        translator = _translator(mock, batch_size=5, concurrency=3)
+        out = translator.translate_segments(SEGMENTS, "en", "zh")
+    assert [seg["text"] for seg in out] == [f"[tr] line {i}" for i in range(12)]
+    assert [seg["start"] for seg in out] == [seg["start"] for seg in SEGMENTS]
+    assert mock.requests == 3
+
+
+def test_table_stays_a_table():
+    with MockLmStudio() as mock:
+        out = _translator(mock).translate_segments(SegmentTable.from_dicts(SEGMENTS), "en", "zh")
+    assert isinstance(out, SegmentTable)
+    assert out.texts[3] == "[tr] line 3"
+
+
+def test_failed_requests_are_retried():
+    with MockLmStudio(fail_rate=0.5, seed=3) as mock:
+        out = _translator(mock, batch_size=3, max_retries=20).translate_segments(SEGMENTS, "en", "zh")
+    assert mock.failures > 0
+    assert [seg["text"] for seg in out] == [f"[tr] line {i}" for i in range(12)]
+
+
+def test_retries_give_up():
+    with MockLmStudio(fail_rate=1.0) as mock:
+        with pytest.raises(Exception, match="503"):
+            _translator(mock, max_retries=2).translate_segments(SEGMENTS, "en", "zh")
+    assert mock.requests == 3
+
+
+def test_dropped_lines_are_repaired():
+    logs = []
+    with MockLmStudio(drop_rate=0.3, seed=1) as mock:
+        translator = _translator(mock, progress_cb=logs.append, repair_rounds=10)
+        out = translator.translate_segments(SEGMENTS, "en", "zh")
+    assert [seg["text"] for seg in out] == [f"[tr] line {i}" for i in range(12)]
+    assert any("补译" in line for line in logs)
+
+
+def test_unrepaired_lines_are_left_blank():
+    with MockLmStudio(drop_rate=1.0) as mock:
+        seen = {}
+        out = _translator(mock, repair_rounds=1).translate_segments(
+            SEGMENTS[:3], "en", "zh", on_segment=lambda i, seg: seen.setdefault(i, seg["text"])
+        )
+    assert [seg["text"] for seg in out] == ["", "", ""]
+    assert seen == {0: "", 1: "", 2: ""}
+    assert mock.requests == 2
+
+
+def test_streamed_lines_arrive_before_the_completion_ends():
+    with MockLmStudio(chunk_delay=0.05) as mock:
+        translator = _translator(mock)
+        started = time.monotonic()
+        arrived = [
+            (position, seg["text"], time.monotonic() - started)
+            for position, seg in translator.iter_translate_segments(SEGMENTS[:4], "en", "zh")
+        ]
+        total = time.monotonic() - started
+    assert [(p, t) for p, t, _ in arrived] == [(i, f"[tr] line {i}") for i in range(4)]
+    # ~8 chunks of 7 characters at 50ms each; the first line is complete after three.
+    assert arrived[0][2] < total / 2
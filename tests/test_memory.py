@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from src.pipeline.memory import TranslationMemory, normalize_text
+from src.pipeline.segments import SegmentTable
+
+SEGMENTS = [
+    {"start": 0.0, "end": 1.0, "text": "Thanks for watching."},
+    {"start": 1.0, "end": 2.0, "text": "New line"},
+    {"start": 2.0, "end": 3.0, "text": "Thanks  for\twatching."},
+    {"start": 3.0, "end": 4.0, "text": "   "},
+]
+
+
+@pytest.fixture
+def memory(tmp_path):
+    return TranslationMemory(str(tmp_path / "tm.sqlite3"), max_entries=100)
+
+
+def _rows(memory):
+    return sqlite3.connect(memory.path).execute("SELECT COUNT(*) FROM tm").fetchone()[0]
+
+
+def _fake_backend(calls):
+    def translate(misses, on_segment):
+        calls.append([m["text"] for m in misses])
+        out = [dict(m, text=f"<{m['text']}>") for m in misses]
+        for pos, seg in enumerate(out):
+            if on_segment:
+                on_segment(pos, seg)
+        return out
+
+    return translate
+
+
+def test_normalize_folds_width_and_whitespace():
+    assert normalize_text("  Ｈｅｌｌｏ \n world ") == "Hello world"
+
+
+def test_lookup_is_scoped_by_language_backend_and_domain(memory):
+    memory.store([("hi", "你好")], "en", "zh", "m2m:x")
+    assert memory.lookup(["hi"], "en", "zh", "m2m:x") == {"hi": "你好"}
+    assert memory.lookup(["hi"], "en", "ja", "m2m:x") == {}
+    assert memory.lookup(["hi"], "en", "zh", "lmstudio:y") == {}
+    assert memory.lookup(["hi"], "en", "zh", "m2m:x", domain="legal") == {}
+
+
+def test_misses_are_deduplicated_and_remembered(memory):
+    calls = []
+    out = memory.translate_segments(SEGMENTS, _fake_backend(calls), "en", "zh", "b")
+    assert calls == [["Thanks for watching.", "New line"]]
+    assert [s["text"] for s in out] == ["<Thanks for watching.>", "<New line>", "<Thanks for watching.>", ""]
+
+    again = memory.translate_segments(SEGMENTS, _fake_backend(calls), "en", "zh", "b")
+    assert len(calls) == 1
+    assert again == out
+
+
+def test_table_in_table_out(memory):
+    table = SegmentTable.from_dicts(SEGMENTS)
+    out = memory.translate_segments(table, _fake_backend([]), "en", "zh", "b")
+    assert isinstance(out, SegmentTable)
+    assert out.start is table.start
+    assert out.texts[1] == "<New line>"
+
+
+def test_on_segment_sees_every_position(memory):
+    memory.store([(normalize_text("New line"), "cached")], "en", "zh", "b")
+    seen = {}
+    memory.translate_segments(
+        SEGMENTS, _fake_backend([]), "en", "zh", "b", on_segment=lambda i, seg: seen.__setitem__(i, seg["text"])
+    )
+    assert seen == {0: "<Thanks for watching.>", 1: "cached", 2: "<Thanks for watching.>", 3: ""}
+
+
+def test_known_skips_the_lookup(memory, monkeypatch):
+    monkeypatch.setattr(memory, "lookup", lambda *a, **k: pytest.fail("lookup repeated"))
+    calls = []
+    out = memory.translate_segments(
+        SEGMENTS, _fake_backend(calls), "en", "zh", "b", known={"Thanks for watching.": "谢谢观看"}
+    )
+    assert calls == [["New line"]]
+    assert out[2]["text"] == "谢谢观看"
+
+
+def test_prune_keeps_the_most_recently_used(memory):
+    memory.store([(f"old {i}", "x") for i in range(60)], "en", "zh", "b")
+    memory.lookup(["old 0"], "en", "zh", "b")  # touched, so it survives
+    memory.store([(f"new {i}", "x") for i in range(60)], "en", "zh", "b")
+    assert _rows(memory) == 90
+    assert memory.lookup(["old 0", "old 1", "new 59"], "en", "zh", "b") == {"old 0": "x", "new 59": "x"}
+
+
+def test_store_does_not_count_rows_below_the_limit(memory, monkeypatch):
+    pruned = []
+    monkeypatch.setattr(memory, "prune", lambda: pruned.append(1) or 0)
+    for i in range(100):
+        memory.store([(f"line {i}", "x")], "en", "zh", "b")
+    assert pruned == []
+    memory.store([("one more", "x")], "en", "zh", "b")
+    assert pruned == [1]
+
+
+def test_row_count_is_read_on_open(memory):
+    memory.store([(f"line {i}", "x") for i in range(95)], "en", "zh", "b")
+    reopened = TranslationMemory(memory.path, max_entries=100)
+    reopened.store([(f"more {i}", "x") for i in range(10)], "en", "zh", "b")
+    assert _rows(reopened) == 90
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+from src.pipeline import metrics
+from src.pipeline.metrics import RunMetrics
+
+
+def test_report_keeps_own_and_child_peaks_apart(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "peak_rss_mb", lambda: 100.0)
+    monkeypatch.setattr(metrics, "peak_child_rss_mb", lambda: 300.0)
+    run = RunMetrics()
+    with run.stage("asr", "a.mp4", audio_seconds=10.0):
+        pass
+    report = json.loads(run.write_report(tmp_path)["json"].read_text(encoding="utf-8"))
+    assert report["peak_rss_mb"] == 100.0
+    assert report["peak_child_rss_mb"] == 300.0
+    assert run.summary_lines()[-1].endswith("峰值内存 100 MB（单个子进程峰值 300 MB）")
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="no RUSAGE_CHILDREN")
+def test_child_peak_is_measured_separately():
+    subprocess.run([sys.executable, "-c", "b = bytearray(64 * 1024 * 1024)"], check=True)
+    assert metrics.peak_child_rss_mb() >= 64
+
+
+def test_runs_started_together_get_their_own_report(tmp_path):
+    first, second = RunMetrics(), RunMetrics()
+    second.started = first.started
+    paths = [run.write_report(tmp_path) for run in (first, second)]
+    assert paths[0]["json"] != paths[1]["json"] and paths[0]["csv"] != paths[1]["csv"]
+    assert sorted(p.suffix for p in tmp_path.iterdir()) == [".csv", ".csv", ".json", ".json"]
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.pipeline import preflight
+from src.pipeline.metrics import StageEvent
+from src.pipeline.preflight import BatchProgress, longest_first, reject_reason
+from src.pipeline.video import MediaInfo
+
+RATES = {"transcribe": 0.1, "translate": 0.05, "output": 0.2}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(preflight, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_fraction_is_weighted_by_duration(clock):
+    progress = BatchProgress({"a": 100.0, "b": 300.0}, RATES)
+    assert progress.fraction() == 0.0
+    progress.complete("a")
+    assert progress.fraction() == pytest.approx(0.25)
+    progress.advance_media("b", "transcribe", 150.0)
+    # b's transcribe share is 0.1 / 0.35 of its 75%.
+    assert progress.fraction() == pytest.approx(0.25 + 0.75 * 0.5 * 0.1 / 0.35)
+
+
+def test_unknown_duration_counts_as_average(clock):
+    progress = BatchProgress({"a": 100.0, "b": 300.0, "c": 0.0}, RATES)
+    progress.complete("c")
+    assert progress.fraction() == pytest.approx(200.0 / 600.0)
+
+
+def test_reaching_a_thread_finishes_the_earlier_ones(clock):
+    progress = BatchProgress({"a": 100.0}, RATES)
+    progress.advance("a", "output", 0.0)
+    assert progress.fraction() == pytest.approx(0.15 / 0.35)
+
+
+def test_eta_needs_a_timed_stage(clock):
+    progress = BatchProgress({"a": 100.0, "b": 300.0}, RATES)
+    assert progress.eta() is None
+    progress.record(StageEvent("asr", "a", seconds=20.0))
+    # transcribe measured at 0.2 s per media second; b still needs every thread:
+    # its transcribe (60) plus its translate (15) and output (60) after that.
+    assert progress.eta() == pytest.approx(135.0)
+    clock[0] += 10
+    assert progress.eta() == pytest.approx(125.0)
+    progress.complete("a")
+    progress.complete("b")
+    assert progress.eta() == 0.0
+    assert progress.fraction() == 1.0
+
+
+def test_output_time_counts_once_the_group_ends(clock):
+    progress = BatchProgress({"a": 100.0, "b": 100.0}, RATES)
+    progress.record(StageEvent("srt_write", "a", seconds=1.0))
+    assert progress._timed["output"] == set()
+    progress.record(StageEvent("encode", "a", seconds=9.0))
+    assert progress._rate("output") == pytest.approx(0.1)
+    progress.record(StageEvent("translate", "x", seconds=5.0))  # not in this batch
+    progress.record(StageEvent("asr", "b", seconds=5.0, ok=False))
+    assert progress._timed["translate"] == progress._timed["transcribe"] == set()
+
+
+def test_fraction_never_goes_down(clock):
+    progress = BatchProgress({"a": 100.0, "b": 100.0}, RATES)
+    progress.advance("a", "transcribe", 1.0)
+    before = progress.fraction()
+    assert before == pytest.approx(0.1 / 0.7)
+    # Transcription turns out nearly free, so the finished part now weighs almost nothing.
+    progress.record(StageEvent("asr", "a", seconds=0.1))
+    assert progress.fraction() == before
+
+
+def test_reject_and_order():
+    assert reject_reason(MediaInfo("x", error="文件不存在"), True) == "文件不存在"
+    assert reject_reason(MediaInfo("x", video_codecs=["h264"]), False)
+    assert reject_reason(MediaInfo("x", audio_codecs=["aac"]), True)
+    assert reject_reason(MediaInfo("x", audio_codecs=["aac"]), False) == ""
+    assert reject_reason(MediaInfo("x", probed=False), True) == ""
+    infos = {"a": MediaInfo("a", duration=10), "b": MediaInfo("b", duration=0), "c": MediaInfo("c", duration=99)}
+    assert longest_first(["a", "b", "c", "d"], infos) == ["c", "a", "b", "d"]
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+from src.pipeline.runner import PipelineRunner
+
+
+def _run(videos, options, **callbacks):
+    errors = []
+    runner = PipelineRunner(videos, options, error_cb=errors.append, **callbacks)
+    return runner, runner.run(), errors
+
+
+def test_all_files_processed(stub_models, videos, make_options):
+    runner, ok, errors = _run(videos, make_options())
+    assert ok and not runner.failed and not errors
+    for video in videos:
+        names = sorted(Path(p).name for p in runner.outputs[str(Path(video).resolve())])
+        stem = Path(video).stem
+        assert names == sorted([f"{stem}_ja.srt", f"{stem}_zh.srt", f"{stem}_source.srt"])
+
+
+def test_one_failing_file_does_not_fail_the_rest(stub_models, videos, make_options, monkeypatch):
+    original = PipelineRunner._translate_stage
+
+    def translate(self, job):
+        if job.file_path.endswith("a.mp4"):
+            raise RuntimeError("bad file")
+        return original(self, job)
+
+    monkeypatch.setattr(PipelineRunner, "_translate_stage", translate)
+    runner, ok, errors = _run(videos, make_options())
+    assert not ok
+    assert runner.failed == [str(Path(videos[0]).resolve())]
+    assert len(errors) == 1 and "bad file" in errors[0]
+
+
+def test_aborted_run_marks_unfinished_files_failed(stub_models, videos, make_options, monkeypatch):
+    monkeypatch.setitem(sys.modules, "src.pipeline.translator", None)
+    runner, ok, errors = _run(videos, make_options())
+    assert not ok
+    assert sorted(runner.failed) == sorted(str(Path(v).resolve()) for v in videos)
+    assert errors
+
+
+def test_cancelled_files_are_not_failures(stub_models, videos, make_options):
+    runner = PipelineRunner(videos, make_options())
+    runner.cancel()
+    assert runner.run() is False
+    assert runner.failed == [] and runner.outputs == {}
+
+
+def test_progress_reaches_100(stub_models, videos, make_options):
+    seen = []
+    _run(videos, make_options(), file_progress_cb=lambda path, percent: seen.append(percent))
+    assert seen == sorted(seen) and seen[-1] == 100
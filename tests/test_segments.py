@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+import numpy as np
+import pytest
+
+from src.pipeline.segments import SegmentTable
+
+srt = pytest.importorskip("srt")
+
+
+def _table(*rows):
+    return SegmentTable.from_dicts([{"start": s, "end": e, "text": t} for s, e, t in rows])
+
+
+def _compose(table):
+    subs = [
+        srt.Subtitle(index=0, start=timedelta(seconds=s), end=timedelta(seconds=e), content=t)
+        for s, e, t in zip(table.start.tolist(), table.end.tolist(), table.texts)
+    ]
+    return srt.compose(subs)
+
+
+def test_to_srt_matches_srt_compose():
+    table = _table(
+        (5.0, 6.5, "third"),
+        (0.0, 1.2345, "first\n\nwith a blank line"),
+        (1.5, 1.5, "zero length"),
+        (2.0, 3.0, "   "),
+        (3723.0004, 3724.9996, "past an hour"),
+        (1.5, 2.5, "\nsecond"),
+    )
+    assert table.to_srt() == _compose(table)
+
+
+def test_to_srt_round_trips_random_timings():
+    rng = np.random.default_rng(0)
+    start = np.sort(rng.uniform(0, 7200, 200))
+    table = SegmentTable(start, start + rng.uniform(0.001, 8, 200), [f"line {i}" for i in range(200)])
+    assert table.to_srt() == _compose(table)
+
+
+def test_to_ass_escapes_and_drops_empty():
+    ass = _table((0.0, 1.005, "a {b}\nc"), (2.0, 2.0, "gone"), (3.0, 4.0, " ")).to_ass("Arial", 48)
+    assert "Style: Default,Arial,48," in ass
+    events = [line for line in ass.splitlines() if line.startswith("Dialogue:")]
+    assert events == ["Dialogue: 0,0:00:00.00,0:00:01.00,Default,,0,0,0,,a \\{b\\}\\Nc"]
+
+
+def test_merge_gaps_joins_close_segments():
+    table = _table((0.0, 1.0, "a "), (1.1, 2.0, "b"), (2.5, 3.0, "c"), (3.25, 3.5, "d"))
+    assert table.merge_gaps(200).to_dicts() == [
+        {"start": 0.0, "end": 2.0, "text": "a b"},
+        {"start": 2.5, "end": 3.0, "text": "c"},
+        {"start": 3.25, "end": 3.5, "text": "d"},
+    ]
+    assert table.merge_gaps(10) is table
+
+
+def test_merge_gaps_keeps_the_longest_end():
+    merged = _table((0.0, 5.0, "long"), (1.0, 2.0, "inside")).merge_gaps(100)
+    assert merged.to_dicts() == [{"start": 0.0, "end": 5.0, "text": "long inside"}]
+
+
+def test_split_by_cps_breaks_at_words_in_proportion():
+    table = _table((0.0, 2.0, "one two three four"), (2.0, 10.0, "slow"))
+    split = table.split_by_cps(5)
+    assert split.texts == ["one two", "three four", "slow"]
+    assert split.start.tolist()[0] == 0.0 and split.end.tolist()[1] == 2.0
+    assert split.end[0] == split.start[1]
+    assert split.end[0] == pytest.approx(2.0 * 7 / 17)  # len('one two') / (7 + 10)
+    assert split[2] == {"start": 2.0, "end": 10.0, "text": "slow"}
+
+
+def test_split_by_cps_without_spaces_and_zero_length():
+    split = _table((0.0, 1.0, "一二三四五六"), (1.0, 1.0, "x" * 50)).split_by_cps(3)
+    assert split.texts == ["一二三", "四五六", "x" * 50]
+    assert split.end[0] == pytest.approx(0.5)
+    assert _table((0.0, 10.0, "fine")).split_by_cps(3).texts == ["fine"]
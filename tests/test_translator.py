@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from src.pipeline.memory import TranslationMemory, normalize_text  # noqa: E402
+from src.pipeline.translator import Translator  # noqa: E402
+
+SEGMENTS = [
+    {"start": 0.0, "end": 1.0, "text": "hello"},
+    {"start": 1.0, "end": 2.0, "text": "world"},
+    {"start": 2.0, "end": 3.0, "text": "hello"},
+]
+
+
+@pytest.fixture
+def translator(tmp_path, monkeypatch):
+    memory = TranslationMemory(str(tmp_path / "tm.sqlite3"))
+    translator = Translator(device="cpu", memory=memory)
+    calls = []
+
+    def fake_multi(texts, source_lang, target_langs):
+        calls.append((list(texts), list(target_langs)))
+        return {lang: [f"{lang}:{text}" for text in texts] for lang in target_langs}
+
+    monkeypatch.setattr(translator, "translate_texts_multi", fake_multi)
+    translator.calls = calls
+    return translator
+
+
+def test_multi_sends_only_misses_and_skips_complete_targets(translator):
+    backend = translator.memory_backend
+    translator.memory.store([(normalize_text("hello"), "zh:HELLO")], "en", "zh", backend)
+    translator.memory.store([("hello", "ja:HELLO"), ("world", "ja:WORLD")], "en", "ja", backend)
+
+    out = translator.translate_segments_multi(SEGMENTS, "en", ["zh", "ja"])
+
+    assert translator.calls == [(["world"], ["zh"])]
+    assert [s["text"] for s in out["zh"]] == ["zh:HELLO", "zh:world", "zh:HELLO"]
+    assert [s["text"] for s in out["ja"]] == ["ja:HELLO", "ja:WORLD", "ja:HELLO"]
+
+
+def test_multi_looks_up_memory_once_per_target(translator, monkeypatch):
+    lookups = []
+    original = translator.memory.lookup
+
+    def counting(sources, source_lang, target_lang, backend, domain=""):
+        lookups.append(target_lang)
+        return original(sources, source_lang, target_lang, backend, domain)
+
+    monkeypatch.setattr(translator.memory, "lookup", counting)
+    translator.translate_segments_multi(SEGMENTS, "en", ["zh", "ja"])
+    assert sorted(lookups) == ["ja", "zh"]
+
+
+def test_memory_is_kept_per_precision(translator):
+    int8 = f"m2m:{translator.model_name}:int8"
+    translator.memory.store([("hello", "zh:int8"), ("world", "zh:int8")], "en", "zh", int8)
+    assert translator.precision == "fp32"
+
+    out = translator.translate_segments_multi(SEGMENTS, "en", ["zh"])
+
+    assert translator.calls == [(["hello", "world"], ["zh"])]
+    assert [s["text"] for s in out["zh"]] == ["zh:hello", "zh:world", "zh:hello"]
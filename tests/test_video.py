@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.pipeline import video
+
+
+def _ffprobe(monkeypatch, stdout):
+    calls = []
+
+    def run(cmd, **kwargs):
+        calls.append(cmd)
+        return SimpleNamespace(stdout=stdout, returncode=0)
+
+    monkeypatch.setattr(video.subprocess, "run", run)
+    return calls
+
+
+def test_keyframes_are_relative_to_container_start(monkeypatch):
+    # Audio starts at 1.4s, video at 1.5s: -ss 0 is 1.4s, so the second keyframe is 2.1s in.
+    calls = _ffprobe(
+        monkeypatch,
+        "packet,1.500000,K__\npacket,1.533333,___\npacket,3.500000,K__\nformat,1.400000\n",
+    )
+    assert video.probe_keyframes("a.mp4") == pytest.approx([0.1, 2.1])
+    assert "format=start_time:packet=pts_time,flags" in calls[0]
+
+
+def test_keyframes_fall_back_to_first_packet(monkeypatch):
+    _ffprobe(monkeypatch, "packet,0.080000,___\npacket,0.040000,K__\npacket,2.040000,K_D\nformat,N/A\n")
+    assert video.probe_keyframes("a.mp4") == pytest.approx([0.0, 2.0])